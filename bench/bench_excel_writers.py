@@ -0,0 +1,85 @@
+"""
+Benchmark de los writers de Excel: modo normal (openpyxl clásico, como estaban
+antes) vs write_only (excel_out actual). Cada variante corre en un proceso
+aparte para medir su pico de RSS sin contaminarse.
+
+Uso (desde la raíz del repo):
+    python -m bench.bench_excel_writers --rows 1000000
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Font, PatternFill
+
+from src.app.excel_out import export_eventos_xlsx
+
+def _rows(n: int):
+    base = date(2025, 1, 1)
+    estados = ("Entrada", "Salida")
+    for i in range(n):
+        pin = str(1000 + i % 500)
+        d = base + timedelta(days=(i // 1000) % 365)
+        yield (pin, f"Empleado {pin}", d.isoformat(), dtime(6 + i % 12, i % 60).strftime("%H:%M:%S"), estados[i % 2])
+
+def _legacy_export_eventos_xlsx(path_out: str, rows):
+    # copia del writer previo (Workbook normal, todo en memoria hasta save)
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Eventos"
+    ws.append(["ID", "Empleado", "Fecha", "Hora", "Estado"])
+    for r in rows:
+        ws.append(list(r))
+    for cell in ws[1]:
+        cell.font = Font(bold=True)
+        cell.fill = PatternFill("solid", fgColor="DDDDDD")
+        cell.alignment = Alignment(horizontal="center")
+    wb.save(path_out)
+
+def _peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB, macOS bytes
+    return rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+def _child(variant: str, n: int) -> dict:
+    writer = _legacy_export_eventos_xlsx if variant == "legacy" else export_eventos_xlsx
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "eventos.xlsx")
+        t0 = time.perf_counter()
+        writer(out, _rows(n))
+        wall = time.perf_counter() - t0
+        size = os.path.getsize(out)
+    return {"variant": variant, "rows": n, "wall_s": round(wall, 3),
+            "peak_rss_mb": _peak_rss_mb(), "file_mb": round(size / 1e6, 2)}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--child", choices=["legacy", "write_only"])
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.child, args.rows)))
+        return
+
+    for variant in ("legacy", "write_only"):
+        res = subprocess.run(
+            [sys.executable, "-m", "bench.bench_excel_writers", "--rows", str(args.rows), "--child", variant],
+            capture_output=True, text=True, check=True,
+        )
+        r = json.loads(res.stdout)
+        print(f"{r['variant']:<11} rows={r['rows']:>9}  wall={r['wall_s']:>8.2f}s  "
+              f"peak_rss={r['peak_rss_mb'] or 0:>8.1f}MB  file={r['file_mb']}MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Split diurnas/nocturnas/dominicales: motor Python vs motor NumPy (split_batch)
+y vs el memo por forma de turno (split_memo).
+
+Primero comprueba que los motores den lo mismo (diferencial) sobre casos
+fijos (cruce de medianoche, varios días, domingos) y sobre intervalos
+aleatorios; luego mide el tiempo del motor NumPy sobre N intervalos y el
+del memo sobre turnos fijos (tres turnos con minutos de tolerancia).
+
+Uso (desde la raíz del repo):
+    python -m bench.bench_split --n 2000000
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from src.app import split_memo
+from src.app.payroll import _split_span_secs, _to_epoch, perfil_general, split_hours_types_any_span
+from src.app.split_batch import split_hours_types_batch, to_epoch_seconds
+
+TOL = 1e-9
+
+CASOS_FIJOS = [
+    # mismo día
+    (datetime(2025, 12, 1, 7, 0), datetime(2025, 12, 1, 14, 0)),
+    # cruza medianoche lunes -> martes
+    (datetime(2025, 12, 1, 22, 0), datetime(2025, 12, 2, 6, 15)),
+    # sábado -> domingo
+    (datetime(2025, 12, 6, 22, 0), datetime(2025, 12, 7, 6, 0)),
+    # domingo -> lunes
+    (datetime(2025, 12, 7, 18, 0), datetime(2025, 12, 8, 7, 30)),
+    # varios días, incluye un domingo completo
+    (datetime(2025, 12, 5, 13, 0), datetime(2025, 12, 9, 2, 0)),
+    # termina exacto a medianoche
+    (datetime(2025, 12, 3, 19, 0), datetime(2025, 12, 4, 0, 0)),
+    # vacío e invertido
+    (datetime(2025, 12, 3, 8, 0), datetime(2025, 12, 3, 8, 0)),
+    (datetime(2025, 12, 3, 9, 0), datetime(2025, 12, 3, 8, 0)),
+    # antes de 1970 (divmod negativo)
+    (datetime(1969, 12, 31, 20, 0), datetime(1970, 1, 1, 8, 0)),
+]
+
+def _aleatorios(n: int, seed: int = 7):
+    rnd = random.Random(seed)
+    base = datetime(2024, 1, 1)
+    out = []
+    for _ in range(n):
+        s = base + timedelta(seconds=rnd.randrange(0, 2 * 365 * 86400))
+        dur = rnd.choice([rnd.randrange(0, 16 * 3600), rnd.randrange(0, 5 * 86400)])
+        out.append((s, s + timedelta(seconds=dur)))
+    return out
+
+def check(intervals) -> int:
+    starts = to_epoch_seconds([a for a, _ in intervals])
+    ends = to_epoch_seconds([b for _, b in intervals])
+    d, n, o = split_hours_types_batch(starts, ends)
+
+    fallos = 0
+    for k, (a, b) in enumerate(intervals):
+        ref = split_hours_types_any_span(a, b)
+        got = (d[k], n[k], o[k])
+        if any(abs(x - y) > TOL for x, y in zip(ref, got)):
+            fallos += 1
+            if fallos <= 10:
+                print(f"DIFF {a} -> {b}: python={ref} numpy={got}")
+    return fallos
+
+def check_memo(intervals) -> int:
+    memo = split_memo.memo_para(perfil_general())
+    fallos = 0
+    for a, b in intervals:
+        s, e = _to_epoch(a), _to_epoch(b)
+        if memo.split(s, e) != _split_span_secs(s, e):
+            fallos += 1
+            if fallos <= 10:
+                print(f"DIFF {a} -> {b}: python={_split_span_secs(s, e)} memo={memo.split(s, e)}")
+    return fallos
+
+def _turnos_fijos(n: int, seed: int = 7):
+    """Turnos 06:00-14:15 / 14:00-22:15 / 22:00-06:15 con +-5 min y segundos."""
+    rnd = random.Random(seed)
+    base = _to_epoch(datetime(2025, 1, 1))
+    out = []
+    for _ in range(n):
+        inicio = base + rnd.randrange(365) * 86400 + rnd.choice((6, 14, 22)) * 3600
+        out.append((inicio + rnd.randint(-300, 300), inicio + 8 * 3600 + 900 + rnd.randint(-300, 300)))
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=2_000_000, help="intervalos para medir el motor NumPy")
+    ap.add_argument("--check-n", type=int, default=50_000, help="intervalos aleatorios para el diferencial")
+    args = ap.parse_args()
+
+    fallos = check(CASOS_FIJOS) + check(_aleatorios(args.check_n))
+    print(f"diferencial: {len(CASOS_FIJOS) + args.check_n} intervalos, {fallos} diferencias")
+    fallos_memo = check_memo(CASOS_FIJOS) + check_memo(_aleatorios(args.check_n))
+    print(f"diferencial memo: {len(CASOS_FIJOS) + args.check_n} intervalos, {fallos_memo} diferencias")
+    fallos += fallos_memo
+    if fallos:
+        sys.exit(1)
+
+    muestra = _aleatorios(min(args.n, 200_000))
+    t0 = time.perf_counter()
+    for a, b in muestra:
+        split_hours_types_any_span(a, b)
+    t_py = (time.perf_counter() - t0) / len(muestra) * args.n
+
+    rng = np.random.default_rng(7)
+    base = int(to_epoch_seconds([datetime(2024, 1, 1)])[0])
+    starts = base + rng.integers(0, 2 * 365 * 86400, args.n)
+    ends = starts + rng.integers(0, 16 * 3600, args.n)
+    t0 = time.perf_counter()
+    split_hours_types_batch(starts, ends)
+    t_np = time.perf_counter() - t0
+
+    print(f"python (extrapolado) n={args.n}: {t_py:.2f}s")
+    print(f"numpy               n={args.n}: {t_np:.3f}s")
+
+    # turnos fijos: python directo vs memo (en frío)
+    turnos = _turnos_fijos(min(args.n, 300_000))
+    perfil = perfil_general()
+    t0 = time.perf_counter()
+    for a, b in turnos:
+        _split_span_secs(a, b, perfil)
+    t_dir = time.perf_counter() - t0
+    split_memo.invalidar()
+    memo = split_memo.memo_para(perfil)
+    t0 = time.perf_counter()
+    for a, b in turnos:
+        memo.split(a, b)
+    t_memo = time.perf_counter() - t0
+    info = memo.info()
+    print(f"turnos fijos n={len(turnos)}: python {t_dir:.3f}s, memo {t_memo:.3f}s "
+          f"({info['hits']} aciertos, {info['misses']} fallos, {info['formas']} formas)")
+
+if __name__ == "__main__":
+    main()
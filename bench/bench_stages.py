@@ -0,0 +1,181 @@
+"""
+Benchmark por etapas del cálculo de nómina sobre cargas sintéticas
+(bench.workload), a varios tamaños.
+
+Etapas: generar, export_clean_xlsx, read_clean_events, build_work_intervals,
+split_hours_types_any_span, calcular_horas_desde_excel, calcular_horas_stream,
+export_resumen_xlsx.
+
+Cada etapa se mide dos veces: una sin instrumentar (tiempo) y otra bajo
+tracemalloc (pico de memoria Python asignada por la etapa). Cada tamaño
+corre en un proceso aparte, así el pico de RSS tampoco se mezcla.
+
+Uso (desde la raíz del repo):
+    python -m bench.bench_stages --sizes 1000 100000 1000000 --save bench/baseline_stages.json
+    python -m bench.bench_stages --sizes 1000 100000 --baseline bench/baseline_stages.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+
+from bench.workload import generar_aprox, filas_limpias
+
+PERIODO = (2025, 12, 1)
+INICIO = date(2025, 12, 1)
+MARGEN = 3
+
+# una etapa es más lenta que la línea base si supera este factor
+TOLERANCIA = 1.25
+# por debajo de esto el ruido domina: no se compara
+MIN_SEG = 0.05
+
+def _peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+def _medir(fn, memoria: bool) -> tuple[object, dict]:
+    t0 = time.perf_counter()
+    out = fn()
+    r = {"wall_s": round(time.perf_counter() - t0, 4)}
+    if memoria:
+        del out
+        tracemalloc.start()
+        out = fn()
+        r["peak_alloc_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        tracemalloc.stop()
+    return out, r
+
+def _child(n: int, memoria: bool) -> dict:
+    from src.app import payroll
+    from src.app.excel_out import export_clean_xlsx, export_resumen_xlsx
+    from src.app.streaming import calcular_horas_stream
+
+    start_m, end_m, _ = payroll._quincena_range(*PERIODO, MARGEN)
+    etapas = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        limpio = os.path.join(tmp, "limpio.xlsx")
+        resumen = os.path.join(tmp, "resumen.xlsx")
+
+        eventos, etapas["generar"] = _medir(lambda: generar_aprox(n, inicio=INICIO), memoria)
+
+        _, etapas["export_clean_xlsx"] = _medir(
+            lambda: export_clean_xlsx(limpio, filas_limpias(eventos)), memoria)
+        etapas["export_clean_xlsx"]["file_mb"] = round(os.path.getsize(limpio) / 1e6, 2)
+
+        events, etapas["read_clean_events"] = _medir(
+            lambda: payroll.read_clean_events(limpio, start_m, end_m), memoria)
+
+        intervals, etapas["build_work_intervals"] = _medir(
+            lambda: payroll.build_work_intervals(events), memoria)
+
+        spans = [(payroll._from_epoch(i.start), payroll._from_epoch(i.end)) for i in intervals]
+        _, etapas["split_hours_types_any_span"] = _medir(
+            lambda: [payroll.split_hours_types_any_span(a, b) for a, b in spans], memoria)
+
+        res, etapas["calcular_horas_desde_excel"] = _medir(
+            lambda: payroll.calcular_horas_desde_excel(limpio, *PERIODO, MARGEN), memoria)
+        quincena_rows, diario_rows, rango = res
+
+        por_ts = sorted(events, key=lambda e: e.ts)
+        _, etapas["calcular_horas_stream"] = _medir(
+            lambda: calcular_horas_stream(por_ts, [PERIODO], MARGEN), memoria)
+
+        _, etapas["export_resumen_xlsx"] = _medir(
+            lambda: export_resumen_xlsx(resumen, quincena_rows, diario_rows,
+                                        payroll.escribir_hoja_resumen, payroll.escribir_hoja_diario),
+            memoria)
+
+    return {
+        "eventos": len(eventos),
+        "intervalos": len(intervals),
+        "filas_diario": len(diario_rows),
+        "peak_rss_mb": _peak_rss_mb(),
+        "etapas": etapas,
+    }
+
+def _comparar(actual: dict, base: dict) -> int:
+    """Imprime la razón actual/base por etapa. Devuelve cuántas etapas empeoraron."""
+    peores = 0
+    for size, r in actual["resultados"].items():
+        b = base.get("resultados", {}).get(size)
+        if not b:
+            print(f"[{size}] sin línea base")
+            continue
+        for etapa, m in r["etapas"].items():
+            mb = b["etapas"].get(etapa)
+            if not mb or max(m["wall_s"], mb["wall_s"]) < MIN_SEG:
+                continue
+            ratio = m["wall_s"] / mb["wall_s"] if mb["wall_s"] else float("inf")
+            marca = ""
+            if ratio > TOLERANCIA:
+                marca = "  <- REGRESION"
+                peores += 1
+            print(f"[{size}] {etapa:<28} {mb['wall_s']:>9.3f}s -> {m['wall_s']:>9.3f}s  x{ratio:.2f}{marca}")
+    return peores
+
+def _git_rev() -> str | None:
+    try:
+        res = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    except OSError:
+        return None
+    return res.stdout.strip() or None
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    ap.add_argument("--sin-memoria", action="store_true", help="no medir con tracemalloc (más rápido)")
+    ap.add_argument("--save", help="guardar resultados JSON en esta ruta")
+    ap.add_argument("--baseline", help="JSON de una corrida anterior contra el cual comparar")
+    ap.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.child, not args.sin_memoria)))
+        return
+
+    resultados = {}
+    for n in args.sizes:
+        cmd = [sys.executable, "-m", "bench.bench_stages", "--child", str(n)]
+        if args.sin_memoria:
+            cmd.append("--sin-memoria")
+        r = json.loads(subprocess.run(cmd, capture_output=True, text=True, check=True).stdout)
+        resultados[str(n)] = r
+
+        print(f"== {n} (eventos={r['eventos']} intervalos={r['intervalos']} "
+              f"peak_rss={r['peak_rss_mb'] or 0:.1f}MB)")
+        for etapa, m in r["etapas"].items():
+            mem = f"  peak_alloc={m['peak_alloc_mb']:>8.1f}MB" if "peak_alloc_mb" in m else ""
+            print(f"   {etapa:<28} {m['wall_s']:>9.3f}s{mem}")
+
+    actual = {
+        "git": _git_rev(),
+        "python": platform.python_version(),
+        "maquina": platform.platform(),
+        "resultados": resultados,
+    }
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(actual, f, indent=2)
+        print(f"guardado: {args.save}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            base = json.load(f)
+        if _comparar(actual, base):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Microbenchmark de timeparse: parse_*_generic valor a valor vs parse_dates /
+parse_times (detección de formato por columna + fast path).
+
+Columnas de prueba: seriales Excel (float), fechas ISO / dd/mm/aaaa, horas
+24 h y horas en 12 h al estilo español ("7:05 a. m."), cada formato en su
+columna, y columnas mixtas (formatos intercalados al azar): ahí el fast
+path elegido con el primer texto falla en parte de las celdas y esas pasan
+por el genérico. Antes de medir comprueba que ambos caminos devuelvan
+exactamente lo mismo.
+
+Uso (desde la raíz del repo):
+    python -m bench.bench_timeparse --n 200000
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from src.app.timeparse import parse_date_generic, parse_time_generic, parse_dates, parse_times
+
+def _columnas(n: int, seed: int = 11) -> dict:
+    rnd = random.Random(seed)
+    base = date(2025, 1, 1)
+    fechas = [base + timedelta(days=rnd.randrange(365)) for _ in range(n)]
+    horas = [(rnd.randrange(24), rnd.randrange(60), rnd.randrange(60)) for _ in range(n)]
+
+    def h12(h, m, s, estilo):
+        suf = "a" if h < 12 else "p"
+        return f"{(h % 12) or 12}:{m:02d}:{s:02d} " + estilo.format(suf)
+
+    def fecha_mixta(f):
+        formato = rnd.randrange(3)
+        if formato == 0:
+            return datetime.combine(f, datetime.min.time())  # celda de fecha de openpyxl
+        return f.isoformat() if formato == 1 else f.strftime("%d/%m/%Y")
+
+    def hora_mixta(h, m, s):
+        formato = rnd.randrange(3)
+        if formato == 0:
+            return (h * 3600 + m * 60 + s) / 86400
+        return f"{h:02d}:{m:02d}:{s:02d}" if formato == 1 else h12(h, m, s, "{}. m.")
+
+    return {
+        "fecha ISO": (parse_date_generic, parse_dates, [f.isoformat() for f in fechas]),
+        "fecha dd/mm/aaaa": (parse_date_generic, parse_dates, [f.strftime("%d/%m/%Y") for f in fechas]),
+        "hora serial Excel": (parse_time_generic, parse_times,
+                              [(h * 3600 + m * 60 + s) / 86400 for h, m, s in horas]),
+        "hora 24h": (parse_time_generic, parse_times, [f"{h:02d}:{m:02d}:{s:02d}" for h, m, s in horas]),
+        "hora 12h español": (parse_time_generic, parse_times,
+                             [h12(h, m, s, rnd.choice(["{}. m.", "{}.m."])) for h, m, s in horas]),
+        "fecha mixta": (parse_date_generic, parse_dates, [fecha_mixta(f) for f in fechas]),
+        "hora mixta": (parse_time_generic, parse_times, [hora_mixta(*t) for t in horas]),
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000)
+    args = ap.parse_args()
+
+    for nombre, (generic, bulk, valores) in _columnas(args.n).items():
+        t0 = time.perf_counter()
+        ref = [generic(v) for v in valores]
+        t_gen = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        got = bulk(valores)
+        t_bulk = time.perf_counter() - t0
+
+        if ref != got:
+            print(f"{nombre}: RESULTADOS DISTINTOS")
+            sys.exit(1)
+        print(f"{nombre:<18} n={args.n}  genérico={t_gen:6.3f}s  bulk={t_bulk:6.3f}s  x{t_gen / t_bulk:4.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Descarga de los relojes contra el simulador local (bench.zk_sim), a varios
+tamaños de log.
+
+Por cada tamaño levanta un simulador (proceso aparte) y corre en otro
+proceso la ingesta real de PROD, zkteco_prod.descargar_eventos_multi con
+un EventStore vacío, dos veces:
+- en frío: descarga todo el log (disable -> get_attendance -> enable),
+  guarda en el almacén y lee la ventana de dias_atras
+- sin cambios: mismo número de registros, no descarga
+
+Reporta tiempo, registros/s y cuánto estuvo bloqueado el reloj (medido
+por el simulador entre CMD_DISABLEDEVICE y CMD_ENABLEDEVICE). El plazo y
+los reintentos son los de la configuración (ZK_PLAZO_SEG, ZK_REINTENTOS)
+salvo que se indiquen.
+
+Uso (desde la raíz del repo):
+    python -m bench.bench_zk --registros 10000 100000
+    python -m bench.bench_zk --registros 100000 --latencia-ms 20 --perdida 0.01 --cortes 0.002
+    python -m bench.bench_zk --registros 1000000 --plazo 3600
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HOST = "127.0.0.1"
+
+def _leer_stats(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _child(args) -> dict:
+    from src.app.config import ZkDevice, load_settings
+    from src.app.event_store import EventStore
+    from src.app.zkteco_prod import descargar_eventos_multi
+
+    settings = load_settings()
+    dev = ZkDevice("sim", "00-00-00-00-00-00", HOST.rsplit(".", 1)[0] + ".")
+    store = EventStore(os.path.join(args.tmp, "eventos.db"))
+
+    def corrida():
+        antes = _leer_stats(args.stats)
+        t0 = time.perf_counter()
+        eventos, cobertura = descargar_eventos_multi(
+            [dev], settings.dias_atras, store, lambda d: HOST,
+            timeout=args.timeout or settings.zk_timeout,
+            reintentos=args.reintentos or settings.zk_reintentos,
+            plazo_seg=args.plazo or settings.zk_plazo_seg,
+            ventana_dup_seg=settings.zk_ventana_dup_seg,
+        )
+        seg = time.perf_counter() - t0
+        despues = _leer_stats(args.stats)
+        bloqueos = despues.get("bloqueos_seg", [])[len(antes.get("bloqueos_seg", [])):]
+        return {"seg": seg, "resultado": cobertura["sim"], "eventos": len(eventos),
+                "bloqueo_seg": sum(bloqueos), "bloqueos": len(bloqueos),
+                "sin_cerrar": despues.get("bloqueos_sin_cerrar", 0) - antes.get("bloqueos_sin_cerrar", 0)}
+
+    frio = corrida()
+    guardados = store.conn.execute("SELECT COUNT(*) FROM marcaciones").fetchone()[0]
+    sin_cambios = corrida()
+    return {"frio": frio, "sin_cambios": sin_cambios, "guardados": guardados}
+
+def _medir(n: int, args) -> dict:
+    tmp = tempfile.mkdtemp(prefix=f"bench_zk_{n}_")
+    stats = os.path.join(tmp, "sim.json")
+    sim_cmd = [sys.executable, "-m", "bench.zk_sim", "--host", HOST, "--registros", str(n),
+               "--latencia-ms", str(args.latencia_ms), "--ancho-banda-mbps", str(args.ancho_banda_mbps),
+               "--perdida", str(args.perdida), "--cortes", str(args.cortes), "--estadisticas", stats]
+    if args.udp:
+        sim_cmd.append("--solo-udp")
+    sim = subprocess.Popen(sim_cmd, stdout=subprocess.PIPE, text=True)
+    try:
+        linea = sim.stdout.readline()  # "[SIM] ..." cuando ya escucha
+        if not linea.startswith("[SIM]"):
+            raise RuntimeError(f"el simulador no arrancó ({n} registros)")
+
+        cmd = [sys.executable, "-m", "bench.bench_zk", "--child", "--tmp", tmp, "--stats", stats,
+               "--plazo", str(args.plazo), "--reintentos", str(args.reintentos), "--timeout", str(args.timeout)]
+        plazo = (args.plazo or 180) * 2 + 60
+        try:
+            out = subprocess.run(cmd, capture_output=True, text=True, timeout=plazo, check=True).stdout
+        except subprocess.TimeoutExpired:
+            return {"error": f"sin respuesta en {plazo}s"}
+        except subprocess.CalledProcessError as e:
+            return {"error": (e.stderr or "").strip().splitlines()[-1:]}
+        res = json.loads(out.strip().splitlines()[-1])
+    finally:
+        sim.terminate()
+        sim.wait()
+    s = _leer_stats(stats)
+    res["sim"] = {k: s.get(k) for k in ("sesiones", "cortes", "paquetes_perdidos", "bytes_enviados")}
+    return res
+
+def _fila(n: int, r: dict) -> str:
+    if "error" in r:
+        return f"{n:>10} {'ERROR: ' + str(r['error'])}"
+    f, s, sim = r["frio"], r["sin_cambios"], r["sim"]
+    tasa = n / f["seg"] if f["seg"] else 0
+    return (f"{n:>10} {f['seg']:>9.2f} {tasa:>10.0f} {f['bloqueo_seg']:>9.2f} {s['seg']:>10.3f} "
+            f"{sim['sesiones']:>8} {sim['cortes']:>6} {sim['paquetes_perdidos']:>8}  {f['resultado']}")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--registros", type=int, nargs="+", default=[10_000, 30_000, 100_000])
+    ap.add_argument("--latencia-ms", type=float, default=0.0)
+    ap.add_argument("--ancho-banda-mbps", type=float, default=0.0, help="0 = sin límite")
+    ap.add_argument("--perdida", type=float, default=0.0)
+    ap.add_argument("--cortes", type=float, default=0.0)
+    ap.add_argument("--udp", action="store_true", help="simulador sin TCP (pyzk cae a UDP)")
+    ap.add_argument("--plazo", type=float, default=0, help="plazo por reloj (0 = ZK_PLAZO_SEG)")
+    ap.add_argument("--reintentos", type=int, default=0, help="0 = ZK_REINTENTOS")
+    ap.add_argument("--timeout", type=int, default=0, help="0 = ZK_TIMEOUT")
+    ap.add_argument("--json", help="guardar los resultados")
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--tmp", help=argparse.SUPPRESS)
+    ap.add_argument("--stats", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args)), flush=True)
+        return
+
+    print(f"{'registros':>10} {'frío s':>9} {'reg/s':>10} {'bloqueo s':>9} {'sin camb s':>10} "
+          f"{'sesiones':>8} {'cortes':>6} {'perdidos':>8}  resultado")
+    resultados = {}
+    for n in args.registros:
+        resultados[n] = _medir(n, args)
+        print(_fila(n, resultados[n]), flush=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Modo daemon contra relojes falsos (en proceso, sin red).
+
+Dos relojes con la interfaz de pyzk que usa daemon.py (connect,
+read_sizes / records, disable / enable_device, get_attendance,
+live_capture con end_live_capture, disconnect). Escenario:
+- historial: el almacén ya tiene parte del log de un reloj (corrida batch
+  anterior) y nada del otro -> backfill al conectar
+- marcaciones en vivo repartidas entre los dos relojes (con dobles toques
+  entre relojes, ver bench.workload)
+- un reloj se cae a mitad del día: lo marcado mientras tanto sólo queda en
+  su log y entra por backfill al reconectar
+- una marcación que llega tarde (anterior a la última del empleado)
+
+Al final compara el resumen en curso del daemon con el cálculo batch del
+motor stream sobre lo que quedó en el almacén (fusionar_eventos, como la
+corrida normal). Sale con 1 si difieren.
+
+Uso (desde la raíz del repo):
+    python -m bench.daemon_fake --empleados 60
+"""
+import argparse
+import dataclasses
+import os
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from bench.workload import generar
+from src.app.config import ZkDevice, load_settings
+from src.app.daemon import Daemon
+from src.app.event_store import EventStore
+from src.app.metrics import Metricas
+from src.app.payroll import make_event
+from src.app.streaming import calcular_horas_stream
+from src.app.zkteco_prod import fila_marcacion, fusionar_eventos
+
+HOY = date(2025, 12, 20)
+RELOJES = ("porteria", "planta2")
+_PUNCH = {"Entrada": 0, "Salida": 1, "Descanso": 2}
+
+@dataclasses.dataclass
+class Marca:
+    """Attendance de pyzk (lo que lee fila_marcacion)."""
+    user_id: str
+    timestamp: datetime
+    status: int
+    punch: int
+
+def marca(ev) -> Marca:
+    return Marca(ev["pin"], ev["timestamp"], 1, _PUNCH[ev["estado"]])
+
+class RelojFalso:
+    """Un reloj: su log, la conexión (una a la vez) y fallas a pedido."""
+
+    def __init__(self, nombre: str, log=None):
+        self.nombre = nombre
+        self.log = list(log or [])
+        self.caido = False
+        self.end_live_capture = False
+        self.records = 0
+        self._lock = threading.Lock()
+        self._vivo = None  # cola de la captura en vivo activa
+
+    # --- lado del daemon (como pyzk) ---
+
+    def connect(self):
+        if self.caido:
+            raise ConnectionRefusedError(f"{self.nombre}: sin respuesta")
+        return self
+
+    def read_sizes(self):
+        self._vivo_ok()
+        with self._lock:
+            self.records = len(self.log)
+
+    def disable_device(self):
+        self._vivo_ok()
+
+    def enable_device(self):
+        pass
+
+    def get_attendance(self):
+        self._vivo_ok()
+        with self._lock:
+            return list(self.log)
+
+    def live_capture(self, new_timeout=10):
+        cola = queue.Queue()
+        with self._lock:
+            self._vivo = cola
+        try:
+            while not self.end_live_capture:
+                self._vivo_ok()
+                try:
+                    yield cola.get(timeout=min(new_timeout, 0.05))
+                except queue.Empty:
+                    yield None
+        finally:
+            with self._lock:
+                self._vivo = None
+
+    def disconnect(self):
+        with self._lock:
+            self._vivo = None
+
+    def _vivo_ok(self):
+        if self.caido:
+            raise ConnectionResetError(f"{self.nombre}: conexión perdida")
+
+    # --- lado del escenario ---
+
+    def marcar(self, m: Marca):
+        with self._lock:
+            self.log.append(m)
+            if self._vivo is not None and not self.caido:
+                self._vivo.put(m)
+
+def _esperar(store_path: str, relojes, daemon: Daemon, plazo: float) -> bool:
+    """Hasta que el almacén tenga los registros de cada reloj y la cola esté vacía."""
+    fin = time.monotonic() + plazo
+    while time.monotonic() < fin:
+        with EventStore(store_path) as st:
+            al_dia = all(st.estado_sync(r.nombre)[1] == len(r.log) for r in relojes)
+        if al_dia and daemon.cola.empty():
+            return True
+        time.sleep(0.2)
+    return False
+
+def _referencia(store_path: str, periodos, settings, desde: datetime, nombres):
+    """Cálculo batch (stream) sobre el almacén, como la corrida normal."""
+    with EventStore(store_path) as st:
+        todos = st.eventos(desde=desde)
+    streams = [[ev for ev in todos if ev["device"] == r] for r in RELOJES]
+    eventos = [make_event(nombres[ev["pin"]], ev["timestamp"], ev["estado"], pin=ev["pin"])
+               for ev in fusionar_eventos(streams, settings.zk_ventana_dup_seg)]
+    return calcular_horas_stream(eventos, periodos, settings.margen_dias_quincena), len(todos)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--empleados", type=int, default=60)
+    ap.add_argument("--seed", type=int, default=3)
+    ap.add_argument("--ritmo", type=float, default=0.002, help="segundos entre marcaciones en vivo")
+    args = ap.parse_args()
+
+    rnd = random.Random(args.seed)
+    eventos = generar(args.empleados, 24, inicio=date(2025, 11, 26), seed=args.seed)
+    for ev in eventos:
+        ev["device"] = rnd.choice(RELOJES)
+
+    corte_hist = datetime(2025, 12, 10)
+    corte_store = datetime(2025, 12, 5)
+    historia = [ev for ev in eventos if ev["timestamp"] < corte_hist]
+    vivo = [ev for ev in eventos if ev["timestamp"] >= corte_hist]
+
+    tmp = tempfile.mkdtemp(prefix="daemon_fake_")
+    base = load_settings()
+    settings = dataclasses.replace(
+        base, app_mode="PROD", local_out=os.path.join(tmp, "out"), state_dir=os.path.join(tmp, "state"),
+        zk_devices=tuple(ZkDevice(r, "00-00-00-00-00-00", "127.0.0.") for r in RELOJES),
+        daemon_reporte_min=0.05, daemon_conciliar_min=0.02,
+    )
+    store_path = os.path.join(settings.state_dir, "eventos.db")
+
+    relojes = {r: RelojFalso(r, [marca(ev) for ev in historia if ev["device"] == r]) for r in RELOJES}
+    # corrida batch anterior: el almacén tiene el log de porteria hasta corte_store
+    with EventStore(store_path) as st:
+        previo = [ev for ev in historia if ev["device"] == "porteria" and ev["timestamp"] < corte_store]
+        st.agregar("porteria", (fila_marcacion(marca(ev)) for ev in previo), len(previo))
+
+    nombres = {ev["pin"]: ev["nombre"] for ev in eventos}
+    metricas = Metricas("PROD")
+    d = Daemon(settings, conectar=lambda dev: relojes[dev.nombre].connect(), metricas=metricas,
+               nombres=lambda pins: {p: nombres[p] for p in pins}, hoy=lambda: HOY, timeout_vivo=1)
+    hilo = threading.Thread(target=d.ejecutar, name="daemon")
+    t0 = time.perf_counter()
+    hilo.start()
+
+    # en vivo; porteria se cae entre el 40 % y el 60 % de las marcaciones
+    caida, vuelta = int(len(vivo) * 0.4), int(len(vivo) * 0.6)
+    for i, ev in enumerate(vivo):
+        if i == caida:
+            relojes["porteria"].caido = True
+        elif i == vuelta:
+            relojes["porteria"].caido = False
+        relojes[ev["device"]].marcar(marca(ev))
+        time.sleep(args.ritmo)
+
+    # llega tarde: una Salida anterior a la última marcación del empleado
+    ultimo = vivo[-1]
+    tarde = {"pin": ultimo["pin"], "timestamp": ultimo["timestamp"] - timedelta(hours=3),
+             "estado": "Salida", "device": "planta2"}
+    relojes["planta2"].marcar(marca(tarde))
+
+    al_dia = _esperar(store_path, relojes.values(), d, plazo=30)
+    time.sleep(settings.daemon_reporte_min * 60 * 2)  # al menos un resumen más
+    d.detener()
+    hilo.join()
+    dt = time.perf_counter() - t0
+
+    periodos = d.periodos()
+    desde = datetime.combine(date(2025, 11, 28), datetime.min.time())
+    ref, en_store = _referencia(store_path, periodos, settings, desde, nombres)
+    c = metricas.contadores
+    print(f"{len(eventos) + 1} marcaciones ({len(vivo) + 1} en vivo), {en_store} en el almacén, {dt:.1f}s")
+    print(f"vivo={c.get('marcaciones_vivo', 0)} backfill={c.get('marcaciones_backfill', 0)} "
+          f"reconexiones={c.get('reconexiones', 0)} reconstrucciones={c.get('reconstrucciones', 0)} "
+          f"reportes={c.get('reportes', 0)}")
+
+    fallas = 0
+    if not al_dia:
+        print("FALLA: el almacén no alcanzó los registros de los relojes")
+        fallas += 1
+    for p in periodos:
+        q_d, dia_d, _ = d.reporte(p, {k: nombres[k] for k in d.acc.diario})
+        q_r, dia_r, _ = ref[p]
+        y, m, q = p
+        ok = (q_d == q_r and dia_d == dia_r)
+        xlsx = os.path.join(settings.local_out, f"Resumen_Horas_{y}-{m:02d}-Q{q}_EN_CURSO.xlsx")
+        print(f"{y}-{m:02d}-Q{q}: {len(q_r)} empleados, {len(dia_r)} días -> "
+              f"{'OK' if ok else 'DIFIERE'}; xlsx {'OK' if os.path.exists(xlsx) else 'FALTA'}")
+        fallas += (not ok) + (not os.path.exists(xlsx))
+    for clave in ("reconexiones", "marcaciones_backfill", "reconstrucciones"):
+        if not c.get(clave):
+            print(f"FALLA: el escenario no ejercitó {clave}")
+            fallas += 1
+    if fallas:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Motor stream (streaming.calcular_horas_stream) vs una referencia por fuerza
+bruta: cada minuto trabajado se clasifica por separado (diurno 06-19,
+nocturno, dominical = domingo o festivo) y se acredita al día en que
+ocurrió.
+
+Casos fijos (pausas Descanso con regreso, Descanso sin regreso antes de la
+Salida, turnos que cruzan medianoche y el borde de la quincena, Entrada y
+Salida con el mismo timestamp, Entradas repetidas) y streams aleatorios de
+marcaciones al minuto. Compara por (empleado, fecha) total, diurnas,
+nocturnas, dominicales y descanso; sale con 1 si algo difiere.
+
+Uso (desde la raíz del repo):
+    python -m bench.stream_ref --streams 200
+"""
+import argparse
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+from src.app import calendario
+from src.app.payroll import DAY, _day_of_date, _quincena_range, _weekday_of_day, make_event
+from src.app.streaming import calcular_horas_stream
+
+PERIODO = (2025, 12, 1)
+MARGEN = 3
+MINUTO = 60
+DIUR = (6 * 3600, 19 * 3600)
+
+def _festivo(dia: int) -> bool:
+    d = date(1970, 1, 1) + timedelta(days=dia)
+    return d in calendario.festivos(d.year)
+
+def referencia(eventos, periodo, margen) -> dict:
+    """{(empleado, fecha iso): [total, diurnas, nocturnas, dominicales, descanso]} en segundos."""
+    lo_m, hi_m = (_day_of_date(x) for x in _quincena_range(*periodo, margen)[:2])
+    lo, hi = (_day_of_date(x) for x in _quincena_range(*periodo, 0)[:2])
+
+    por_emp = {}
+    for e in sorted(eventos, key=lambda e: e.ts):
+        if lo_m <= e.ts // DAY <= hi_m:
+            por_emp.setdefault(e.nombre, []).append(e)
+
+    out = {}
+    for nombre, es in por_emp.items():
+        trabajo, descanso = [], []
+        estado, inicio, pausa, pausas = "fuera", None, None, []
+        for e in es:
+            if e.estado == "Entrada":
+                if estado == "pausa":
+                    pausas.append((pausa, e.ts))
+                    estado = "dentro"
+                else:
+                    estado, inicio, pausas = "dentro", e.ts, []
+            elif e.estado == "Salida":
+                if estado == "fuera":
+                    continue
+                # una pausa sin regreso no se descuenta
+                for t in range(inicio, e.ts, MINUTO):
+                    (descanso if any(a <= t < b for a, b in pausas) else trabajo).append(t)
+                estado = "fuera"
+            elif estado == "dentro":
+                estado, pausa = "pausa", e.ts
+            elif estado == "pausa":
+                pausas.append((pausa, e.ts))
+                estado = "dentro"
+
+        for t in trabajo:
+            dia = t // DAY
+            if lo <= dia <= hi:
+                r = out.setdefault((nombre, dia), [0] * 5)
+                r[0] += MINUTO
+                if _weekday_of_day(dia) == 6 or _festivo(dia):
+                    r[3] += MINUTO
+                elif DIUR[0] <= t % DAY < DIUR[1]:
+                    r[1] += MINUTO
+                else:
+                    r[2] += MINUTO
+        for t in descanso:
+            dia = t // DAY
+            if lo <= dia <= hi:
+                out.setdefault((nombre, dia), [0] * 5)[4] += MINUTO
+
+    base = date(1970, 1, 1)
+    return {(n, (base + timedelta(days=d)).isoformat()): [round(x / 3600, 2) for x in v]
+            for (n, d), v in out.items()}
+
+def motor(eventos, periodo, margen) -> dict:
+    _, diario, _ = calcular_horas_stream(sorted(eventos, key=lambda e: e.ts), [periodo], margen)[periodo]
+    # Empleado, Fecha, Día, Total, Diurnas, Nocturnas, Dominicales, Base Día, Extras, Descanso
+    return {(r[0], r[1]): [r[3], r[4], r[5], r[6], r[9]] for r in diario}
+
+def _ev(nombre, texto, estado):
+    return make_event(nombre, datetime.strptime(texto, "%Y-%m-%d %H:%M"), estado)
+
+CASOS_FIJOS = {
+    "descanso con regreso": [
+        ("2025-12-02 07:00", "Entrada"), ("2025-12-02 12:00", "Descanso"),
+        ("2025-12-02 13:00", "Descanso"), ("2025-12-02 17:00", "Salida")],
+    "regreso marcado como Entrada": [
+        ("2025-12-03 07:00", "Entrada"), ("2025-12-03 12:00", "Descanso"),
+        ("2025-12-03 12:45", "Entrada"), ("2025-12-03 16:00", "Salida")],
+    "descanso sin regreso": [
+        ("2025-12-04 07:00", "Entrada"), ("2025-12-04 10:00", "Descanso"),
+        ("2025-12-04 11:00", "Descanso"), ("2025-12-04 14:00", "Descanso"),
+        ("2025-12-04 16:00", "Salida")],
+    "cruza medianoche con pausa": [
+        ("2025-12-05 21:00", "Entrada"), ("2025-12-05 23:30", "Descanso"),
+        ("2025-12-06 00:30", "Descanso"), ("2025-12-06 06:00", "Salida")],
+    "sábado a domingo": [("2025-12-06 22:00", "Entrada"), ("2025-12-07 06:00", "Salida")],
+    "festivo (8 de diciembre)": [("2025-12-07 20:00", "Entrada"), ("2025-12-08 09:00", "Salida")],
+    "borde inicial de la quincena": [("2025-11-30 22:00", "Entrada"), ("2025-12-01 06:00", "Salida")],
+    "borde final de la quincena": [("2025-12-15 22:00", "Entrada"), ("2025-12-16 06:00", "Salida")],
+    "mismo timestamp": [("2025-12-09 08:00", "Entrada"), ("2025-12-09 08:00", "Salida")],
+    "entrada repetida": [
+        ("2025-12-10 06:00", "Entrada"), ("2025-12-10 07:00", "Entrada"),
+        ("2025-12-10 15:00", "Salida"), ("2025-12-10 16:00", "Salida")],
+}
+
+def _aleatorio(rnd: random.Random):
+    eventos = []
+    for k in range(3):
+        t = datetime(2025, 11, 27) + timedelta(minutes=rnd.randint(0, 600))
+        for _ in range(rnd.randint(5, 40)):
+            t += timedelta(minutes=rnd.randint(0, 900))
+            estado = rnd.choice(["Entrada", "Salida", "Descanso", "Entrada", "Salida"])
+            eventos.append(make_event(f"emp{k}", t, estado))
+    return eventos
+
+def comparar(nombre: str, eventos, mostrar: bool) -> bool:
+    ref, got = referencia(eventos, PERIODO, MARGEN), motor(eventos, PERIODO, MARGEN)
+    if ref == got:
+        return True
+    if mostrar:
+        print(f"DIFF {nombre}:")
+        for k in sorted(set(ref) | set(got)):
+            if ref.get(k) != got.get(k):
+                print(f"  {k}: referencia={ref.get(k)} stream={got.get(k)}")
+    return False
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--streams", type=int, default=200, help="streams aleatorios")
+    ap.add_argument("--seed", type=int, default=5)
+    args = ap.parse_args()
+
+    fallos = 0
+    for nombre, marcas in CASOS_FIJOS.items():
+        fallos += not comparar(nombre, [_ev("fijo", t, e) for t, e in marcas], True)
+    todos = [_ev(n, t, e) for n, marcas in CASOS_FIJOS.items() for t, e in marcas]
+    fallos += not comparar("casos fijos juntos", todos, True)
+    print(f"casos fijos: {len(CASOS_FIJOS)}, {fallos} diferencias")
+
+    rnd = random.Random(args.seed)
+    fallos_rnd = 0
+    for i in range(args.streams):
+        fallos_rnd += not comparar(f"stream {i}", _aleatorio(rnd), fallos_rnd < 3)
+    print(f"aleatorios: {args.streams} streams, {fallos_rnd} con diferencias")
+
+    if fallos + fallos_rnd:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
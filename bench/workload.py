@@ -0,0 +1,111 @@
+"""
+Generador sintético (con semilla) de marcaciones realistas para benchmarks.
+
+N empleados x D días, cada empleado con un turno fijo (mañana, tarde,
+noche que cruza medianoche o partido), con:
+- domingos trabajados sólo por una parte del personal
+- marcaciones faltantes (entrada o salida)
+- dobles toques (la misma marcación repetida segundos después)
+- descansos a mitad de turno (salida y regreso), alguno sin marcar el regreso
+
+Uso (desde la raíz del repo):
+    python -m bench.workload --eventos 100000 --out /tmp/eventos_limpios.xlsx
+"""
+import argparse
+import random
+from datetime import date, datetime, timedelta
+
+# (hora, minuto de entrada, horas de jornada)
+TURNOS = [
+    (6, 0, 8),     # mañana
+    (14, 0, 8),    # tarde
+    (22, 0, 8),    # noche: cruza medianoche
+    (9, 30, 9),    # administrativo
+]
+
+P_FALTA_DIA = 0.08       # no vino
+P_SIN_ENTRADA = 0.02
+P_SIN_SALIDA = 0.03
+P_DOBLE_TOQUE = 0.04
+P_DESCANSO = 0.30
+P_DESCANSO_SIN_REGRESO = 0.05
+P_TRABAJA_DOMINGO = 0.25
+
+# marcaciones promedio por empleado y día con las probabilidades de arriba
+EVENTOS_POR_DIA = 2.15
+
+def generar(empleados: int, dias: int, inicio: date = date(2025, 12, 1), seed: int = 1):
+    """
+    Devuelve una lista de dicts {pin, nombre, timestamp, estado} en el orden
+    en que los descargaría el reloj (por timestamp).
+    """
+    rnd = random.Random(seed)
+    eventos = []
+
+    for e in range(empleados):
+        pin = str(1000 + e)
+        nombre = f"Empleado {pin}"
+        hora, minuto, jornada = rnd.choice(TURNOS)
+        domingos = rnd.random() < P_TRABAJA_DOMINGO
+
+        def marca(ts, estado):
+            eventos.append({"pin": pin, "nombre": nombre, "timestamp": ts, "estado": estado})
+
+        for d in range(dias):
+            dia = inicio + timedelta(days=d)
+            if dia.weekday() == 6 and not domingos:
+                continue
+            if rnd.random() < P_FALTA_DIA:
+                continue
+
+            entrada = (datetime.combine(dia, datetime.min.time())
+                       + timedelta(hours=hora, minutes=minuto + rnd.randint(-15, 15),
+                                   seconds=rnd.randint(0, 59)))
+            salida = entrada + timedelta(hours=jornada, minutes=rnd.randint(-10, 90),
+                                         seconds=rnd.randint(0, 59))
+
+            if rnd.random() >= P_SIN_ENTRADA:
+                marca(entrada, "Entrada")
+                if rnd.random() < P_DOBLE_TOQUE:
+                    marca(entrada + timedelta(seconds=rnd.randint(1, 5)), "Entrada")
+            if rnd.random() < P_DESCANSO:
+                pausa = entrada + timedelta(hours=jornada / 2, minutes=rnd.randint(-30, 30))
+                marca(pausa, "Descanso")
+                if rnd.random() >= P_DESCANSO_SIN_REGRESO:
+                    marca(pausa + timedelta(minutes=rnd.randint(15, 60), seconds=rnd.randint(0, 59)), "Descanso")
+            if rnd.random() >= P_SIN_SALIDA:
+                marca(salida, "Salida")
+                if rnd.random() < P_DOBLE_TOQUE:
+                    marca(salida + timedelta(seconds=rnd.randint(1, 5)), "Salida")
+
+    eventos.sort(key=lambda ev: ev["timestamp"])
+    return eventos
+
+def generar_aprox(n_eventos: int, dias: int = 16, inicio: date = date(2025, 12, 1), seed: int = 1):
+    """generar() con tantos empleados como hagan falta para ~n_eventos marcaciones."""
+    empleados = max(1, round(n_eventos / (dias * EVENTOS_POR_DIA)))
+    return generar(empleados, dias, inicio, seed)
+
+def filas_limpias(eventos):
+    """Eventos -> filas (Nombre, Fecha, Hora, Estado) de excel_out.export_clean_xlsx."""
+    for ev in eventos:
+        ts = ev["timestamp"]
+        yield (ev["nombre"], ts.date(), ts.time(), ev["estado"])
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--eventos", type=int, default=100_000)
+    ap.add_argument("--dias", type=int, default=16)
+    ap.add_argument("--inicio", type=date.fromisoformat, default=date(2025, 12, 1))
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--out", required=True, help="xlsx de eventos limpios a generar")
+    args = ap.parse_args()
+
+    from src.app.excel_out import export_clean_xlsx
+
+    eventos = generar_aprox(args.eventos, args.dias, args.inicio, args.seed)
+    export_clean_xlsx(args.out, filas_limpias(eventos))
+    print(f"{len(eventos)} eventos -> {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,494 @@
+"""
+Simulador local de un reloj ZKTeco: protocolo ZK sobre TCP y UDP.
+
+Responde lo que pyzk usa en zkteco_prod y en el modo daemon:
+- CMD_CONNECT / CMD_EXIT
+- CMD_DISABLEDEVICE / CMD_ENABLEDEVICE: mide cuánto queda bloqueado el reloj
+- CMD_GET_FREE_SIZES (read_sizes): registros en el log
+- 1503 / 1504 / CMD_FREE_DATA (read_with_buffer): el log por chunks
+- CMD_CANCELCAPTURE / CMD_STARTVERIFY / CMD_REG_EVENT y el envío de
+  eventos a la sesión registrada (live_capture)
+
+El log son N registros de 40 bytes (formato ZK8, user_id de texto; no hay
+usuarios cargados), generados con semilla y terminando ahora.
+
+Fallas inyectables:
+- latencia por respuesta y ancho de banda
+- pérdida de paquetes. En TCP cada segmento perdido cuesta una
+  retransmisión (RTO_SEG); en UDP el datagrama no llega
+- cortes de conexión: probabilidad por comando recibido
+
+Con --vivo-por-seg genera marcaciones nuevas: entran al log y se envían a
+las sesiones en captura. Las estadísticas (sesiones, bytes, bloqueos) se
+escriben en JSON con --estadisticas.
+
+pyzk siempre se conecta al 4370. Para varios relojes en Linux, use una IP
+de loopback por reloj: --host 127.0.0.2, 127.0.0.3, ...
+
+Uso (desde la raíz del repo):
+    python -m bench.zk_sim --registros 100000 --latencia-ms 5 --perdida 0.01
+"""
+import argparse
+import json
+import os
+import queue
+import random
+import signal
+import socket
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
+
+from zk import const
+
+CMD_PREPARE_BUFFER = 1503   # read_with_buffer de pyzk (no están en zk.const)
+CMD_READ_BUFFER = 1504
+
+TAM_REGISTRO = 40           # '<H24sB4sB8s': uid, user_id, status, hora, punch
+UDP_DATOS = 1024            # bytes de cada CMD_DATA por UDP (lo que espera pyzk)
+MSS = 1460
+RTO_SEG = 0.2               # retransmisión TCP (mínimo de Linux)
+CAPACIDAD = 1_000_000       # registros que "admite" el reloj (read_sizes)
+
+# -------------------------
+# formato
+# -------------------------
+
+def checksum(buf: bytes) -> int:
+    """El de zkemsdk (igual que pyzk): suma de palabras, complemento, módulo 0xFFFF."""
+    if len(buf) % 2:
+        buf += b"\x00"
+    s = sum(struct.unpack(f"<{len(buf) // 2}H", buf))
+    if s > const.USHRT_MAX:
+        s = (s - 1) % const.USHRT_MAX + 1
+    return (-s - 1) % const.USHRT_MAX
+
+def paquete(cmd: int, sesion: int, reply: int, datos: bytes = b"") -> bytes:
+    chk = checksum(struct.pack("<4H", cmd, 0, sesion, reply) + datos)
+    return struct.pack("<4H", cmd, chk, sesion, reply) + datos
+
+def cabecera_tcp(p: bytes) -> bytes:
+    return struct.pack("<HHI", const.MACHINE_PREPARE_DATA_1, const.MACHINE_PREPARE_DATA_2, len(p)) + p
+
+def hora_zk(dt: datetime) -> int:
+    """EncodeTime de zkemsdk (lo que decodifica pyzk en get_attendance)."""
+    return (((dt.year % 100) * 12 * 31 + (dt.month - 1) * 31 + dt.day - 1) * 86400
+            + (dt.hour * 60 + dt.minute) * 60 + dt.second)
+
+def registro(uid: int, pin: str, dt: datetime, status: int, punch: int) -> bytes:
+    return struct.pack("<H24sB4sB8s", uid, pin.encode(), status, struct.pack("<I", hora_zk(dt)), punch, b"")
+
+def evento_vivo(pin: str, dt: datetime, status: int, punch: int) -> bytes:
+    """Evento de live_capture: '<24sBB6s20s' (hora como 6 bytes)."""
+    hora = bytes([dt.year - 2000, dt.month, dt.day, dt.hour, dt.minute, dt.second])
+    return struct.pack("<24sBB6s20s", pin.encode(), status, punch, hora, b"")
+
+def generar_log(n: int, dias: int = 30, empleados: int = 0, seed: int = 1,
+                hasta: datetime | None = None) -> bytearray:
+    """n registros repartidos en los últimos `dias` días, en orden de hora."""
+    hasta = hasta or datetime.now().replace(microsecond=0)
+    inicio = (hasta - timedelta(days=dias)).replace(hour=0, minute=0, second=0)
+    empleados = empleados or max(1, n // (dias * 2))
+    rnd = random.Random(seed)
+    paso = (hasta - inicio).total_seconds() / max(n, 1)
+    pines = [str(1000 + e).encode() for e in range(empleados)]
+    medianoche: dict[int, int] = {}   # día relativo -> hora_zk de su 00:00
+    out = bytearray(n * TAM_REGISTRO)
+    for i in range(n):
+        dia, sod = divmod(int(i * paso), 86400)
+        h = medianoche.get(dia)
+        if h is None:
+            h = medianoche[dia] = hora_zk(inicio + timedelta(days=dia))
+        e = rnd.randrange(empleados)
+        struct.pack_into("<H24sB4sB8s", out, i * TAM_REGISTRO, e + 1, pines[e], 1,
+                         struct.pack("<I", h + sod), rnd.randrange(2), b"")
+    return out
+
+# -------------------------
+# reloj
+# -------------------------
+
+class Reloj:
+    """Log, fallas y estadísticas compartidas por todas las sesiones."""
+
+    def __init__(self, log: bytearray, latencia: float = 0.0, ancho_banda: float = 0.0,
+                 perdida: float = 0.0, cortes: float = 0.0, seed: int = 1,
+                 estadisticas: str | None = None):
+        self.log = log
+        self.n = len(log) // TAM_REGISTRO
+        self.vivo: dict[int, bytes] = {}   # índice en el log -> evento de live_capture
+        self.latencia = latencia
+        self.ancho_banda = ancho_banda     # bytes/seg (0 = sin límite)
+        self.perdida = perdida
+        self.cortes = cortes
+        self.estadisticas = estadisticas
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self._lock_archivo = threading.Lock()
+        self.stats = {"registros": self.n, "sesiones": 0, "cortes": 0, "paquetes_perdidos": 0,
+                      "bytes_enviados": 0, "eventos_vivo": 0, "bloqueos_seg": [], "bloqueos_sin_cerrar": 0}
+
+    def azar(self) -> float:
+        with self._lock:
+            return self._rnd.random()
+
+    def contar(self, clave: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[clave] += n
+
+    def bloqueo(self, seg: float | None) -> None:
+        """Fin de un disable_device: enable (seg) o la sesión terminó bloqueada (None)."""
+        with self._lock:
+            if seg is None:
+                self.stats["bloqueos_sin_cerrar"] += 1
+            else:
+                self.stats["bloqueos_seg"].append(round(seg, 6))
+        self.guardar()
+
+    def marcar(self, pin: str, dt: datetime, status: int = 1, punch: int = 0) -> None:
+        """Marcación nueva: al log y a las sesiones en captura."""
+        with self._lock:
+            self.log += registro(self.n + 1, pin, dt, status, punch)
+            self.vivo[self.n] = evento_vivo(pin, dt, status, punch)
+            self.n += 1
+            self.stats["registros"] = self.n
+
+    def copia_log(self) -> tuple[int, bytes]:
+        with self._lock:
+            return self.n, bytes(self.log[:self.n * TAM_REGISTRO])
+
+    def guardar(self) -> None:
+        if not self.estadisticas:
+            return
+        with self._lock:
+            datos = json.dumps(self.stats)
+        tmp = self.estadisticas + ".tmp"
+        with self._lock_archivo:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(datos)
+            os.replace(tmp, self.estadisticas)
+
+    def demora_envio(self, n_bytes: int, tcp: bool) -> float:
+        """Ancho de banda + retransmisiones TCP de los segmentos perdidos."""
+        seg = n_bytes / self.ancho_banda if self.ancho_banda else 0.0
+        if tcp and self.perdida:
+            perdidos = sum(self.azar() < self.perdida for _ in range(-(-n_bytes // MSS)))
+            if perdidos:
+                self.contar("paquetes_perdidos", perdidos)
+                seg += perdidos * RTO_SEG
+        return seg
+
+# -------------------------
+# transportes
+# -------------------------
+
+class _Corte(Exception):
+    pass
+
+class TransporteTCP:
+    tcp = True
+
+    def __init__(self, reloj: Reloj, sock: socket.socket):
+        self.reloj = reloj
+        self.sock = sock
+
+    def _leer(self, n: int) -> bytes:
+        partes = []
+        while n:
+            b = self.sock.recv(n)
+            if not b:
+                raise _Corte()
+            partes.append(b)
+            n -= len(b)
+        return b"".join(partes)
+
+    def recibir(self, timeout: float | None) -> bytes | None:
+        self.sock.settimeout(timeout)
+        try:
+            top = self.sock.recv(8, socket.MSG_PEEK)
+        except socket.timeout:
+            return None
+        if not top:
+            raise _Corte()
+        self.sock.settimeout(None)
+        _, _, largo = struct.unpack("<HHI", self._leer(8))
+        return self._leer(largo)
+
+    def enviar(self, paquetes: list[bytes]) -> None:
+        datos = b"".join(cabecera_tcp(p) for p in paquetes)
+        demora = self.reloj.demora_envio(len(datos), tcp=True)
+        if demora:
+            time.sleep(demora)
+        self.sock.sendall(datos)
+        self.reloj.contar("bytes_enviados", len(datos))
+
+    def cerrar(self) -> None:
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+class TransporteUDP:
+    tcp = False
+
+    def __init__(self, reloj: Reloj, sock: socket.socket, direccion):
+        self.reloj = reloj
+        self.sock = sock
+        self.direccion = direccion
+        self.entrada: "queue.Queue[bytes | None]" = queue.Queue()
+
+    def recibir(self, timeout: float | None) -> bytes | None:
+        try:
+            p = self.entrada.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if p is None:
+            raise _Corte()
+        return p
+
+    def enviar(self, paquetes: list[bytes]) -> None:
+        demora = self.reloj.demora_envio(sum(len(p) for p in paquetes), tcp=False)
+        if demora:
+            time.sleep(demora)
+        for p in paquetes:
+            if self.reloj.perdida and self.reloj.azar() < self.reloj.perdida:
+                self.reloj.contar("paquetes_perdidos")
+                continue
+            self.sock.sendto(p, self.direccion)
+            self.reloj.contar("bytes_enviados", len(p))
+
+    def cerrar(self) -> None:
+        self.entrada.put(None)
+
+# -------------------------
+# sesión (igual para TCP y UDP)
+# -------------------------
+
+class Sesion:
+    def __init__(self, reloj: Reloj, transporte):
+        self.reloj = reloj
+        self.t = transporte
+        self.sesion = 0
+        self.buffer: bytes | None = None
+        self.bloqueado_desde: float | None = None
+        self.vivo = False
+        self.enviados = 0          # próximo índice del log a enviar en vivo
+        self.esperando_ack = False
+
+    def ejecutar(self) -> None:
+        try:
+            while True:
+                if self.vivo and not self.esperando_ack and self.enviados < self.reloj.n:
+                    self._empujar()
+                p = self.t.recibir(0.05 if self.vivo else None)
+                if p is None:
+                    continue
+                cmd, _, _, reply = struct.unpack_from("<4H", p)
+                if cmd == const.CMD_ACK_OK:
+                    self.esperando_ack = False   # ack de un evento en vivo
+                    continue
+                if self.reloj.cortes and self.reloj.azar() < self.reloj.cortes:
+                    self.reloj.contar("cortes")
+                    return
+                if self.reloj.latencia:
+                    time.sleep(self.reloj.latencia)
+                respuesta = self._atender(cmd, p[8:], reply)
+                self.t.enviar(respuesta)
+                if cmd == const.CMD_EXIT:
+                    return
+        except (_Corte, OSError):
+            pass
+        finally:
+            if self.bloqueado_desde is not None:
+                self.reloj.bloqueo(None)
+            self.t.cerrar()
+            self.reloj.guardar()
+
+    def _ok(self, reply: int, datos: bytes = b"", cmd: int = const.CMD_ACK_OK) -> list[bytes]:
+        return [paquete(cmd, self.sesion, reply, datos)]
+
+    def _atender(self, cmd: int, datos: bytes, reply: int) -> list[bytes]:
+        if cmd == const.CMD_CONNECT:
+            self.sesion = 1 + int(self.reloj.azar() * (const.USHRT_MAX - 2))
+            self.reloj.contar("sesiones")
+            return self._ok(reply)
+        if cmd == const.CMD_DISABLEDEVICE:
+            if self.bloqueado_desde is None:
+                self.bloqueado_desde = time.perf_counter()
+            return self._ok(reply)
+        if cmd == const.CMD_ENABLEDEVICE:
+            if self.bloqueado_desde is not None:
+                self.reloj.bloqueo(time.perf_counter() - self.bloqueado_desde)
+                self.bloqueado_desde = None
+            return self._ok(reply)
+        if cmd == const.CMD_GET_FREE_SIZES:
+            n = self.reloj.n
+            campos = [0] * 20
+            campos[8], campos[16], campos[19] = n, CAPACIDAD, max(CAPACIDAD - n, 0)
+            campos[14], campos[15] = 3000, 3000   # huellas / usuarios (capacidad)
+            return self._ok(reply, struct.pack("<20i", *campos) + struct.pack("<3i", 0, 0, 0))
+        if cmd == CMD_PREPARE_BUFFER:
+            _, comando, _fct, _ext = struct.unpack("<bhii", datos[:11])
+            if comando == const.CMD_ATTLOG_RRQ:
+                n, log = self.reloj.copia_log()
+                self.buffer = struct.pack("<I", n * TAM_REGISTRO) + log
+            elif comando == const.CMD_USERTEMP_RRQ:
+                self.buffer = struct.pack("<I", 0)
+            else:
+                return self._ok(reply, cmd=const.CMD_ACK_ERROR)
+            return self._ok(reply, struct.pack("<BII", 0, len(self.buffer), 0))
+        if cmd == CMD_READ_BUFFER:
+            inicio, tam = struct.unpack("<ii", datos[:8])
+            trozo = (self.buffer or b"")[inicio:inicio + tam]
+            if self.t.tcp:
+                return [paquete(const.CMD_PREPARE_DATA, self.sesion, reply, struct.pack("<II", len(trozo), 0)),
+                        paquete(const.CMD_DATA, self.sesion, reply, trozo),
+                        paquete(const.CMD_ACK_OK, self.sesion, reply)]
+            return ([paquete(const.CMD_PREPARE_DATA, self.sesion, reply, struct.pack("<I", len(trozo)))]
+                    + [paquete(const.CMD_DATA, self.sesion, reply, trozo[i:i + UDP_DATOS])
+                       for i in range(0, len(trozo), UDP_DATOS)]
+                    + [paquete(const.CMD_ACK_OK, self.sesion, reply)])
+        if cmd == const.CMD_FREE_DATA:
+            self.buffer = None
+            return self._ok(reply)
+        if cmd in (const.CMD_CANCELCAPTURE, const.CMD_STARTVERIFY, const.CMD_EXIT):
+            return self._ok(reply)
+        if cmd == const.CMD_REG_EVENT:
+            (flags,) = struct.unpack("<I", datos[:4])
+            self.vivo = bool(flags & const.EF_ATTLOG)
+            self.enviados = self.reloj.n
+            self.esperando_ack = False
+            return self._ok(reply)
+        return self._ok(reply, cmd=const.CMD_ACK_UNKNOWN)
+
+    def _empujar(self) -> None:
+        """Siguiente marcación nueva a la sesión en captura (espera su ACK)."""
+        evento = self.reloj.vivo.get(self.enviados)
+        self.enviados += 1
+        if evento is None:
+            return
+        self.esperando_ack = True
+        self.t.enviar([paquete(const.CMD_REG_EVENT, self.sesion, 0, evento)])
+        self.reloj.contar("eventos_vivo")
+
+# -------------------------
+# servidor
+# -------------------------
+
+class Simulador:
+    """Escucha TCP y UDP en (host, puerto); una sesión (hilo) por cliente."""
+
+    def __init__(self, reloj: Reloj, host: str = "127.0.0.1", puerto: int = 4370,
+                 tcp: bool = True, udp: bool = True):
+        self.reloj = reloj
+        self.tcp = self.udp = None
+        if tcp:
+            self.tcp = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.tcp.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.tcp.bind((host, puerto))
+            self.tcp.listen(16)
+        if udp:
+            self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.udp.bind((host, puerto))
+        self.direccion = (self.tcp or self.udp).getsockname()
+        self._udp_sesiones: dict = {}
+        self._parar = threading.Event()
+
+    def iniciar(self) -> "Simulador":
+        if self.tcp:
+            threading.Thread(target=self._aceptar, name="zk-tcp", daemon=True).start()
+        if self.udp:
+            threading.Thread(target=self._udp, name="zk-udp", daemon=True).start()
+        return self
+
+    def detener(self) -> None:
+        self._parar.set()
+        for s in (self.tcp, self.udp):
+            if s is not None:
+                s.close()
+        self.reloj.guardar()
+
+    def _aceptar(self) -> None:
+        while not self._parar.is_set():
+            try:
+                sock, _ = self.tcp.accept()
+            except OSError:
+                return
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            s = Sesion(self.reloj, TransporteTCP(self.reloj, sock))
+            threading.Thread(target=s.ejecutar, name="zk-sesion", daemon=True).start()
+
+    def _udp(self) -> None:
+        cortadas = set()
+        while not self._parar.is_set():
+            try:
+                p, direccion = self.udp.recvfrom(65535)
+            except OSError:
+                return
+            if direccion in cortadas:
+                continue
+            t = self._udp_sesiones.get(direccion)
+            if t is None:
+                t = self._udp_sesiones[direccion] = TransporteUDP(self.reloj, self.udp, direccion)
+                s = Sesion(self.reloj, t)
+
+                def correr(s=s, direccion=direccion):
+                    s.ejecutar()
+                    # una sesión cortada no vuelve a responder: pyzk agota su timeout
+                    cortadas.add(direccion)
+                    self._udp_sesiones.pop(direccion, None)
+                threading.Thread(target=correr, name="zk-sesion-udp", daemon=True).start()
+            t.entrada.put(p)
+
+def _marcaciones_vivo(reloj: Reloj, por_seg: float, empleados: int, parar: threading.Event, seed: int):
+    rnd = random.Random(seed + 7)
+    while not parar.wait(rnd.expovariate(por_seg)):
+        reloj.marcar(str(1000 + rnd.randrange(empleados)), datetime.now().replace(microsecond=0),
+                     punch=rnd.randrange(2))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--puerto", type=int, default=4370)
+    ap.add_argument("--registros", type=int, default=100_000)
+    ap.add_argument("--dias", type=int, default=30, help="días que cubre el log")
+    ap.add_argument("--empleados", type=int, default=0, help="0 = según registros")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--latencia-ms", type=float, default=0.0, help="demora de cada respuesta")
+    ap.add_argument("--ancho-banda-mbps", type=float, default=0.0, help="0 = sin límite")
+    ap.add_argument("--perdida", type=float, default=0.0, help="probabilidad por segmento / datagrama")
+    ap.add_argument("--cortes", type=float, default=0.0, help="probabilidad de corte por comando")
+    ap.add_argument("--vivo-por-seg", type=float, default=0.0, help="marcaciones nuevas por segundo")
+    ap.add_argument("--sin-udp", action="store_true")
+    ap.add_argument("--solo-udp", action="store_true", help="sin TCP (pyzk cae a UDP)")
+    ap.add_argument("--estadisticas", help="JSON de estadísticas (se reescribe en cada sesión)")
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    empleados = args.empleados or max(1, args.registros // (args.dias * 2))
+    log = generar_log(args.registros, args.dias, empleados, args.seed)
+    reloj = Reloj(log, latencia=args.latencia_ms / 1000, ancho_banda=args.ancho_banda_mbps * 125_000,
+                  perdida=args.perdida, cortes=args.cortes, seed=args.seed, estadisticas=args.estadisticas)
+    sim = Simulador(reloj, args.host, args.puerto, tcp=not args.solo_udp, udp=not args.sin_udp).iniciar()
+    reloj.guardar()
+
+    parar = threading.Event()
+    if args.vivo_por_seg > 0:
+        threading.Thread(target=_marcaciones_vivo, args=(reloj, args.vivo_por_seg, empleados, parar, args.seed),
+                         daemon=True).start()
+    signal.signal(signal.SIGTERM, lambda *_: parar.set())
+    host, puerto = sim.direccion
+    protocolos = "/".join(p for p, activo in (("TCP", sim.tcp), ("UDP", sim.udp)) if activo)
+    print(f"[SIM] {host}:{puerto} ({protocolos}), {reloj.n} registros "
+          f"generados en {time.perf_counter() - t0:.1f}s", flush=True)
+    try:
+        parar.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        parar.set()
+        sim.detener()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Archivo binario de marcaciones, de registros de ancho fijo, ordenado por
+timestamp y leído con numpy.memmap (sin parsear nada).
+
+Formato (little endian):
+- cabecera de 16 bytes: MAGIC (8) + versión (u4) + tamaño de registro (u4)
+- registros REC (16 bytes): ts (i8, segundos epoch hora local), pin (u4,
+  índice en la tabla de PIN), estado (u1, ESTADOS), device (u1, índice en
+  la tabla de dispositivos), 2 bytes de relleno
+
+Las tablas de PIN y dispositivos van en un JSON al lado (<archivo>.json),
+sólo crecen: un índice nunca cambia de significado.
+"""
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+from .paths import ensure_dir
+from .payroll import _from_epoch, _to_epoch
+
+MAGIC = b"ZKEVLOG\x00"
+VERSION = 1
+HEADER = 16
+
+REC = np.dtype({
+    "names": ["ts", "pin", "estado", "device"],
+    "formats": ["<i8", "<u4", "u1", "u1"],
+    "offsets": [0, 8, 12, 13],
+    "itemsize": 16,
+})
+_CAMPOS = ("ts", "pin", "estado", "device")
+
+ESTADOS = ("Entrada", "Salida", "Descanso")
+_CODIGO = {e: i for i, e in enumerate(ESTADOS)}
+
+class EventArchive:
+    """
+    Log binario de marcaciones (ver cabecera del módulo).
+
+    agregar() mezcla eventos nuevos: los duplicados exactos se descartan y,
+    si lo que queda es posterior al último registro (el caso normal aunque
+    la ventana de descarga repita días ya archivados), sólo se anexa. Si
+    algo cae antes, el archivo se rearma en un temporal y se reemplaza
+    con os.replace: nunca queda truncado a medias.
+    leer() devuelve una vista memmap (sin copiar) del rango pedido.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.meta_path = path + ".json"
+        self.pins: list[str] = []
+        self.devices: list[str] = []
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            self.pins, self.devices = meta["pins"], meta["devices"]
+        if os.path.exists(path):
+            self._validar_cabecera()
+
+    # -------------------------
+    # formato
+    # -------------------------
+
+    def _validar_cabecera(self) -> None:
+        with open(self.path, "rb") as f:
+            cab = f.read(HEADER)
+        if len(cab) != HEADER or cab[:8] != MAGIC:
+            raise ValueError(f"{self.path} no es un archivo de marcaciones")
+        version = int.from_bytes(cab[8:12], "little")
+        size = int.from_bytes(cab[12:16], "little")
+        if version != VERSION or size != REC.itemsize:
+            raise ValueError(f"{self.path}: versión {version} / registro {size} no soportados")
+
+    def _crear(self) -> None:
+        ensure_dir(os.path.dirname(self.path))
+        with open(self.path, "wb") as f:
+            f.write(MAGIC + VERSION.to_bytes(4, "little") + REC.itemsize.to_bytes(4, "little"))
+
+    def _guardar_meta(self) -> None:
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"pins": self.pins, "devices": self.devices}, f)
+        os.replace(tmp, self.meta_path)
+
+    def __len__(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        return (os.path.getsize(self.path) - HEADER) // REC.itemsize
+
+    def _mapa(self) -> np.ndarray:
+        n = len(self)
+        if n == 0:
+            return np.zeros(0, dtype=REC)
+        return np.memmap(self.path, dtype=REC, mode="r", offset=HEADER, shape=(n,))
+
+    # -------------------------
+    # escritura
+    # -------------------------
+
+    def _indice(self, tabla: list[str], cache: dict[str, int], valor: str) -> int:
+        i = cache.get(valor)
+        if i is None:
+            i = cache[valor] = len(tabla)
+            tabla.append(valor)
+        return i
+
+    def agregar(self, eventos) -> int:
+        """
+        eventos: iterable de dicts {pin, timestamp, estado, device} (como
+        EventStore.eventos). Devuelve cuántos registros nuevos entraron.
+        """
+        pin_idx = {p: i for i, p in enumerate(self.pins)}
+        dev_idx = {d: i for i, d in enumerate(self.devices)}
+
+        filas = [
+            (_to_epoch(ev["timestamp"]),
+             self._indice(self.pins, pin_idx, str(ev["pin"])),
+             _CODIGO.get(ev["estado"], _CODIGO["Descanso"]),
+             self._indice(self.devices, dev_idx, ev.get("device") or "default"))
+            for ev in eventos
+        ]
+        if not filas:
+            return 0
+        if len(self.devices) > 256:
+            raise ValueError("El archivo de marcaciones admite hasta 256 dispositivos")
+
+        nuevos = np.zeros(len(filas), dtype=REC)
+        nuevos["ts"], nuevos["pin"], nuevos["estado"], nuevos["device"] = zip(*filas)
+
+        # las tablas primero: un registro nunca apunta a un índice que no existe
+        self._guardar_meta()
+        if not os.path.exists(self.path):
+            self._crear()
+
+        actual = self._mapa()
+        n_actual = len(actual)
+        desde = int(nuevos["ts"].min())
+        corte = int(np.searchsorted(actual["ts"], desde, side="left")) if n_actual else 0
+        cola = np.array(actual[corte:])  # copia: el archivo puede reemplazarse
+        del actual
+
+        antes = len(cola)
+        todo = np.concatenate([cola, nuevos])
+        # orden por (ts, pin, estado, device) y sin duplicados exactos
+        todo = todo[np.lexsort([todo[c] for c in reversed(_CAMPOS)])]
+        distinto = np.ones(len(todo), dtype=bool)
+        distinto[1:] = np.any([todo[c][1:] != todo[c][:-1] for c in _CAMPOS], axis=0)
+        todo = todo[distinto]
+
+        # concatenate/indexar puede compactar el dtype (sin relleno): se rearma en REC
+        salida = np.zeros(len(todo), dtype=REC)
+        for c in _CAMPOS:
+            salida[c] = todo[c]
+
+        if len(salida) == antes:
+            return 0
+        if np.array_equal(salida[:antes], cola):
+            # todo lo nuevo va después del último registro: se anexa (sobre
+            # un registro incompleto de una escritura cortada, si lo hay)
+            with open(self.path, "r+b") as f:
+                f.seek(HEADER + n_actual * REC.itemsize)
+                f.write(salida[antes:].tobytes())
+                f.truncate()
+        else:
+            self._reescribir(corte, salida)
+        return len(salida) - antes
+
+    def _reescribir(self, corte: int, cola: np.ndarray) -> None:
+        """Registros [0, corte) del archivo + cola, en un temporal que reemplaza al archivo."""
+        tmp = self.path + ".tmp"
+        with open(self.path, "rb") as src, open(tmp, "wb") as dst:
+            restante = HEADER + corte * REC.itemsize
+            while restante:
+                bloque = src.read(min(restante, 1 << 20))
+                if not bloque:
+                    raise ValueError(f"{self.path}: archivo más corto de lo esperado")
+                dst.write(bloque)
+                restante -= len(bloque)
+            dst.write(cola.tobytes())
+        os.replace(tmp, self.path)
+
+    # -------------------------
+    # lectura
+    # -------------------------
+
+    def leer(self, desde: datetime | None = None, hasta: datetime | None = None) -> np.ndarray:
+        """Registros con desde <= ts <= hasta: vista memmap, sin copia."""
+        m = self._mapa()
+        i = int(np.searchsorted(m["ts"], _to_epoch(desde), side="left")) if desde else 0
+        j = int(np.searchsorted(m["ts"], _to_epoch(hasta), side="right")) if hasta else len(m)
+        return m[i:j]
+
+    def eventos(self, desde: datetime | None = None, hasta: datetime | None = None) -> list[dict]:
+        """Igual que EventStore.eventos, leyendo del archivo binario."""
+        r = self.leer(desde, hasta)
+        return [
+            {"pin": self.pins[p], "timestamp": _from_epoch(ts), "estado": ESTADOS[e], "device": self.devices[d]}
+            for ts, p, e, d in zip(r["ts"].tolist(), r["pin"].tolist(),
+                                   r["estado"].tolist(), r["device"].tolist())
+        ]
@@ -0,0 +1,113 @@
+"""
+Calendario de tipos de día (Colombia), precalculado por año.
+
+Cada día se clasifica como ORDINARIO, SABADO, DOMINGO o FESTIVO. Festivos:
+- fijos: 1 ene, 1 may, 20 jul, 7 ago, 8 dic, 25 dic
+- Ley Emiliani (51 de 1983), se trasladan al lunes siguiente: 6 ene,
+  19 mar, 29 jun, 15 ago, 12 oct, 1 nov, 11 nov
+- según la Pascua: jueves y viernes santo; Ascensión, Corpus Christi y
+  Sagrado Corazón (trasladados a lunes: Pascua + 43, + 64, + 71)
+
+La tabla de un año se construye una vez (lru_cache) y todas se concatenan
+en un bytes indexado por día ordinal epoch (días desde 1970-01-01,
+como payroll): tipo_dia() es una resta y un índice.
+"""
+from __future__ import annotations
+
+import threading
+from datetime import date, timedelta
+from functools import lru_cache
+
+ORDINARIO, SABADO, DOMINGO, FESTIVO = 0, 1, 2, 3
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+_FIJOS = [(1, 1), (5, 1), (7, 20), (8, 7), (12, 8), (12, 25)]
+_EMILIANI = [(1, 6), (3, 19), (6, 29), (8, 15), (10, 12), (11, 1), (11, 11)]
+# desplazamientos desde el domingo de Pascua
+_PASCUA_FIJOS = [-3, -2]          # jueves y viernes santo
+_PASCUA_LUNES = [43, 64, 71]      # Ascensión, Corpus Christi, Sagrado Corazón (ya en lunes)
+
+def pascua(year: int) -> date:
+    """Domingo de Pascua (algoritmo gregoriano anónimo / Meeus)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    mes, dia = divmod(h + l - 7 * m + 114, 31)
+    return date(year, mes, dia + 1)
+
+def _lunes_siguiente(d: date) -> date:
+    return d + timedelta(days=(7 - d.weekday()) % 7)
+
+@lru_cache(maxsize=None)
+def festivos(year: int) -> frozenset:
+    """Fechas festivas de year."""
+    out = {date(year, m, d) for m, d in _FIJOS}
+    out |= {_lunes_siguiente(date(year, m, d)) for m, d in _EMILIANI}
+    p = pascua(year)
+    out |= {p + timedelta(days=n) for n in _PASCUA_FIJOS + _PASCUA_LUNES}
+    return frozenset(out)
+
+@lru_cache(maxsize=None)
+def tabla_anio(year: int) -> bytes:
+    """Tipo de cada día de year, desde el 1 de enero."""
+    inicio = date(year, 1, 1)
+    n = (date(year + 1, 1, 1) - inicio).days
+    fest = festivos(year)
+    tipos = bytearray(n)
+    for i in range(n):
+        d = inicio + timedelta(days=i)
+        if d in fest:
+            tipos[i] = FESTIVO
+        elif d.weekday() == 6:
+            tipos[i] = DOMINGO
+        elif d.weekday() == 5:
+            tipos[i] = SABADO
+    return bytes(tipos)
+
+# tabla plana de varios años consecutivos: (día del primer 1 de enero, tipos).
+# Se reemplaza entera (una asignación) al extenderla: los lectores no toman lock.
+_lock = threading.Lock()
+_plano = (0, b"")
+_anios = (0, -1)  # (primero, último) cubiertos
+
+def _asegurar(dia: int) -> None:
+    global _plano, _anios
+    year = date.fromordinal(dia + _EPOCH_ORDINAL).year
+    with _lock:
+        primero, ultimo = _anios
+        if primero <= year <= ultimo:
+            return
+        if ultimo < primero:
+            primero = ultimo = year
+        primero, ultimo = min(primero, year), max(ultimo, year)
+        tabla = b"".join(tabla_anio(y) for y in range(primero, ultimo + 1))
+        _plano = (date(primero, 1, 1).toordinal() - _EPOCH_ORDINAL, tabla)
+        _anios = (primero, ultimo)
+
+def tipo_dia(dia: int) -> int:
+    """Tipo del día ordinal epoch dia (ORDINARIO / SABADO / DOMINGO / FESTIVO)."""
+    inicio, tabla = _plano
+    i = dia - inicio
+    if not 0 <= i < len(tabla):
+        _asegurar(dia)
+        inicio, tabla = _plano
+        i = dia - inicio
+    return tabla[i]
+
+def es_dominical(dia: int) -> bool:
+    """Domingo o festivo: todas sus horas son dominicales."""
+    return tipo_dia(dia) >= DOMINGO
+
+def tabla_rango(dia_desde: int, dia_hasta: int) -> bytes:
+    """Tipos de los días [dia_desde, dia_hasta] (para los motores por lotes)."""
+    _asegurar(dia_desde)
+    _asegurar(dia_hasta)
+    inicio, tabla = _plano
+    return tabla[dia_desde - inicio:dia_hasta - inicio + 1]
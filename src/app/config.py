@@ -1,18 +1,42 @@
 from dataclasses import dataclass
 import os
 
+@dataclass(frozen=True)
+class ZkDevice:
+    nombre: str
+    mac: str
+    net_prefix: str | None
+
 @dataclass(frozen=True)
 class Settings:
     app_mode: str               # DEMO o PROD
     local_out: str
+    state_dir: str
     tesoreria_out: str
     dias_atras: int
     margen_dias_quincena: int
+    guardar_eventos_limpios: bool   # Excel Eventos_Limpios sólo para depuración
+    split_engine: str               # python, memo (python con memo por forma de turno) o numpy
+    motor_calculo: str              # intervalos (por día de inicio) o stream (una pasada, con descansos)
+    payroll_workers: int            # procesos para el cálculo por empleado (1 = en proceso)
+    perfil_calculo: bool            # guarda un .pstats (cProfile) de la etapa de cálculo
+    perfiles_turno: str | None      # JSON de perfiles de turno por empleado (ver perfiles.py)
 
     # PROD:
     zk_mac: str | None
     zk_net_prefix: str | None
     zktime_db_path: str | None
+    zk_discovery_workers: int
+    zk_cache_ttl_horas: float
+    zk_devices: tuple[ZkDevice, ...]
+    zk_timeout: int                 # timeout de socket pyzk (seg)
+    zk_reintentos: int
+    zk_plazo_seg: float             # plazo total por reloj
+    zk_ventana_dup_seg: int         # duplicados entre relojes
+    entrega_reintentos: int         # intentos por archivo al publicar en tesorería
+    entrega_plazo_seg: float        # cuánto esperar al final de la corrida por las entregas
+    daemon_reporte_min: float       # --daemon: cada cuánto se reescribe el resumen en curso
+    daemon_conciliar_min: float     # --daemon: cada cuánto se compara el log del reloj (backfill)
 
 def _getenv(name: str, default: str | None = None) -> str | None:
     v = os.getenv(name, default)
@@ -21,24 +45,62 @@ def _getenv(name: str, default: str | None = None) -> str | None:
     v = str(v).strip()
     return v if v else None
 
+def _parse_devices(raw: str | None, zk_mac: str | None, zk_net_prefix: str | None) -> tuple[ZkDevice, ...]:
+    """
+    ZK_DEVICES="porteria=AA-BB-CC-DD-EE-FF;planta2=11-22-33-44-55-66@192.168.2."
+    Sin ZK_DEVICES se usa el reloj único de ZK_MAC / ZK_NET_PREFIX ("default").
+    """
+    if not raw:
+        return (ZkDevice("default", zk_mac, zk_net_prefix),) if zk_mac else ()
+
+    devices = []
+    for item in raw.split(";"):
+        item = item.strip()
+        if not item:
+            continue
+        nombre, _, resto = item.partition("=")
+        mac, _, prefix = resto.partition("@")
+        if not nombre.strip() or not mac.strip():
+            raise RuntimeError(f"ZK_DEVICES inválido: '{item}' (formato nombre=MAC[@prefijo])")
+        devices.append(ZkDevice(nombre.strip(), mac.strip(), prefix.strip() or zk_net_prefix))
+    return tuple(devices)
+
 def load_settings() -> Settings:
     app_mode = (_getenv("APP_MODE", "DEMO") or "DEMO").upper()
 
     local_out = _getenv("LOCAL_OUT", r".\output") or r".\output"
     tesoreria_out = _getenv("TESORERIA_OUT", local_out) or local_out
+    state_dir = _getenv("STATE_DIR", r".\state") or r".\state"
 
     dias_atras = int(_getenv("DIAS_ATRAS", "17") or "17")
     margen = int(_getenv("MARGEN_DIAS_QUINCENA", "3") or "3")
+    split_engine = (_getenv("SPLIT_ENGINE", "python") or "python").lower()
+    motor_calculo = (_getenv("MOTOR_CALCULO", "intervalos") or "intervalos").lower()
+    payroll_workers = int(_getenv("PAYROLL_WORKERS", "1") or "1")
+    perfil_calculo = (_getenv("PROFILE_CALCULO", "0") or "0").lower() in ("1", "true", "si", "sí")
+    perfiles_turno = _getenv("PERFILES_TURNO")
+    guardar_eventos_limpios = (_getenv("GUARDAR_EVENTOS_LIMPIOS", "0") or "0").lower() in ("1", "true", "si", "sí")
 
     zk_mac = _getenv("ZK_MAC")
     zk_net_prefix = _getenv("ZK_NET_PREFIX")
     zktime_db_path = _getenv("ZKTIME_DB_PATH")
-    
+    zk_discovery_workers = int(_getenv("ZK_DISCOVERY_WORKERS", "64") or "64")
+    zk_cache_ttl_horas = float(_getenv("ZK_CACHE_TTL_HORAS", "720") or "720")
+    zk_devices = _parse_devices(_getenv("ZK_DEVICES"), zk_mac, zk_net_prefix)
+    zk_timeout = int(_getenv("ZK_TIMEOUT", "5") or "5")
+    zk_reintentos = int(_getenv("ZK_REINTENTOS", "3") or "3")
+    zk_plazo_seg = float(_getenv("ZK_PLAZO_SEG", "180") or "180")
+    zk_ventana_dup_seg = int(_getenv("ZK_VENTANA_DUP_SEG", "60") or "60")
+    entrega_reintentos = int(_getenv("ENTREGA_REINTENTOS", "5") or "5")
+    entrega_plazo_seg = float(_getenv("ENTREGA_PLAZO_SEG", "300") or "300")
+    daemon_reporte_min = float(_getenv("DAEMON_REPORTE_MIN", "5") or "5")
+    daemon_conciliar_min = float(_getenv("DAEMON_CONCILIAR_MIN", "10") or "10")
+
     if app_mode == "PROD":
         missing = []
-        if not zk_mac:
-            missing.append("ZK_MAC")
-        if not zk_net_prefix:
+        if not zk_devices:
+            missing.append("ZK_MAC o ZK_DEVICES")
+        if any(not d.net_prefix for d in zk_devices):
             missing.append("ZK_NET_PREFIX")
         if not zktime_db_path:
             missing.append("ZKTIME_DB_PATH")
@@ -50,10 +112,28 @@ def load_settings() -> Settings:
     return Settings(
         app_mode=app_mode,
         local_out=local_out,
+        state_dir=state_dir,
         tesoreria_out=tesoreria_out,
         dias_atras=dias_atras,
         margen_dias_quincena=margen,
+        guardar_eventos_limpios=guardar_eventos_limpios,
+        split_engine=split_engine,
+        motor_calculo=motor_calculo,
+        payroll_workers=payroll_workers,
+        perfil_calculo=perfil_calculo,
+        perfiles_turno=perfiles_turno,
         zk_mac=zk_mac,
         zk_net_prefix=zk_net_prefix,
         zktime_db_path=zktime_db_path,
+        zk_discovery_workers=zk_discovery_workers,
+        zk_cache_ttl_horas=zk_cache_ttl_horas,
+        zk_devices=zk_devices,
+        zk_timeout=zk_timeout,
+        zk_reintentos=zk_reintentos,
+        zk_plazo_seg=zk_plazo_seg,
+        zk_ventana_dup_seg=zk_ventana_dup_seg,
+        entrega_reintentos=entrega_reintentos,
+        entrega_plazo_seg=entrega_plazo_seg,
+        daemon_reporte_min=daemon_reporte_min,
+        daemon_conciliar_min=daemon_conciliar_min,
     )
@@ -0,0 +1,371 @@
+"""
+Modo servicio (--daemon): marcaciones en vivo y totales siempre al día.
+
+Por cada reloj un hilo (CapturaReloj) mantiene la conexión abierta y
+consume el stream de live_capture de pyzk. Al conectar, al reconectar tras
+un corte y cada DAEMON_CONCILIAR_MIN compara los registros del reloj con
+los que ya vio; si no coinciden descarga el log para cubrir el hueco
+(backfill). Un corte se reintenta con espera exponencial.
+
+Un solo hilo consumidor (Daemon.ejecutar) es dueño del almacén (EventStore,
+SQLite) y del acumulador (streaming.AcumuladorStream): guarda cada
+marcación nueva, actualiza el turno abierto y los totales por día de ese
+empleado, y cada DAEMON_REPORTE_MIN reescribe el resumen de las quincenas
+en curso desde esos totales, sin recalcular. Las horas siguen las reglas
+del motor stream (por día real, con descansos).
+"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from . import payroll
+from .event_store import EventStore
+from .excel_out import export_resumen_xlsx
+from .paths import ensure_dir, safe_join
+from .payroll import DAY, Periodo, make_event, periodo_desde_fecha
+from .streaming import AcumuladorStream
+from .zkteco_prod import conectar_reloj, fila_marcacion, localizar_reloj
+from .zktime_db import cargar_empleados
+
+class CapturaReloj(threading.Thread):
+    """
+    Conexión permanente a un reloj. Pone en la cola:
+    - ("lote", device, atts, registros) tras descargar el log (backfill)
+    - ("vivo", device, att, registros) por cada marcación en vivo
+    - ("error", device, mensaje) al perder la conexión
+    """
+
+    def __init__(self, dev, conectar: Callable, cola: queue.Queue, parar: threading.Event,
+                 registros: Optional[int], conciliar_seg: float, timeout_vivo: int = 5,
+                 espera_max: float = 60.0):
+        super().__init__(name=f"captura-{dev.nombre}", daemon=True)
+        self.dev = dev
+        self.conectar = conectar
+        self.cola = cola
+        self.parar = parar
+        self.registros = registros  # registros que debería tener el reloj
+        self.conciliar_seg = conciliar_seg
+        self.timeout_vivo = timeout_vivo
+        self.espera_max = espera_max
+
+    def run(self) -> None:
+        espera = 1.0
+        while not self.parar.is_set():
+            conn = None
+            try:
+                conn = self.conectar(self.dev)
+                espera = 1.0
+                while not self.parar.is_set():
+                    self._sincronizar(conn)
+                    self._en_vivo(conn)
+            except Exception as e:
+                self.cola.put(("error", self.dev.nombre, str(e)))
+                self.parar.wait(espera)
+                espera = min(espera * 2, self.espera_max)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.disconnect()
+                    except Exception:
+                        pass
+
+    def _sincronizar(self, conn) -> None:
+        """Backfill: si el reloj tiene otra cantidad de registros, baja el log."""
+        conn.read_sizes()
+        total = conn.records
+        if self.registros is not None and total == self.registros:
+            return
+        # el reloj queda bloqueado sólo durante la transferencia
+        conn.disable_device()
+        try:
+            atts = conn.get_attendance() or []
+        finally:
+            conn.enable_device()
+        self.registros = total
+        self.cola.put(("lote", self.dev.nombre, atts, total))
+
+    def _en_vivo(self, conn) -> None:
+        """Marcaciones en vivo hasta la próxima conciliación (o parar)."""
+        hasta = time.monotonic() + self.conciliar_seg
+        conn.end_live_capture = False
+        for att in conn.live_capture(new_timeout=self.timeout_vivo):
+            if att is not None:
+                self.registros = (self.registros or 0) + 1
+                self.cola.put(("vivo", self.dev.nombre, att, self.registros))
+            if self.parar.is_set() or time.monotonic() >= hasta:
+                # live_capture termina en el próximo ciclo y deja el reloj como estaba
+                conn.end_live_capture = True
+
+def _periodo_anterior(p: Periodo) -> Periodo:
+    y, m, q = p
+    if q == 2:
+        return y, m, 1
+    return (y - 1, 12, 2) if m == 1 else (y, m - 1, 2)
+
+def conectador(settings) -> Callable:
+    """conectar(dev) -> conexión pyzk, resolviendo la IP como la corrida batch."""
+    cache_ip_path = os.path.join(settings.state_dir, "zk_ip_cache.json")
+
+    def conectar(dev):
+        ip = localizar_reloj(dev.mac, dev.net_prefix, cache_path=cache_ip_path,
+                             ttl_horas=settings.zk_cache_ttl_horas,
+                             workers=settings.zk_discovery_workers, log=print)
+        if not ip:
+            raise RuntimeError("no se encontró en la red")
+        return conectar_reloj(ip, timeout=settings.zk_timeout)
+    return conectar
+
+class Daemon:
+    """
+    Consumidor: almacén + acumulador incremental + reporte de quincenas en
+    curso. conectar(dev), nombres(pins) y hoy() son inyectables (pruebas
+    contra un reloj falso, sin red ni base de ZKTime).
+    """
+
+    def __init__(self, settings, conectar: Optional[Callable] = None, metricas=None,
+                 perfiles=None, nombres: Optional[Callable] = None,
+                 hoy: Callable[[], date] = date.today, timeout_vivo: int = 5):
+        self.settings = settings
+        self.conectar = conectar or conectador(settings)
+        self.metricas = metricas
+        self.perfiles = perfiles
+        self._nombres = nombres
+        self.hoy = hoy
+        self.timeout_vivo = timeout_vivo
+        self.cola: queue.Queue = queue.Queue()
+        self.parar = threading.Event()
+        self.acc = AcumuladorStream(perfiles)
+        self.store: Optional[EventStore] = None
+        self._ultima: Dict[str, Tuple[int, str, str]] = {}  # pin -> (ts, estado, device) consumida
+        self._desde_lote: Dict[str, datetime] = {}  # device -> timestamp más nuevo de la última descarga
+        self._dia_inicio = 0
+        self._sucio = False
+
+    # -------------------------
+    # ventana: quincena en curso y la anterior
+    # -------------------------
+
+    def periodos(self) -> List[Periodo]:
+        actual = periodo_desde_fecha(self.hoy())
+        return [_periodo_anterior(actual), actual]
+
+    def _inicio_ventana(self) -> int:
+        lo, _, _ = payroll._quincena_range(*self.periodos()[0], self.settings.margen_dias_quincena)
+        return payroll._day_of_date(lo)
+
+    def _contar(self, nombre: str, n: int = 1) -> None:
+        if self.metricas:
+            self.metricas.contar(nombre, n)
+
+    # -------------------------
+    # consumo
+    # -------------------------
+
+    def _alimentar(self, pin: str, ts: datetime, estado: str, device: str) -> None:
+        """Marcación nueva de un empleado al acumulador (mismo filtro que fusionar_eventos)."""
+        crudo = payroll._to_epoch(ts)  # sin redondeo, como compara fusionar_eventos
+        if crudo // DAY < self._dia_inicio:
+            return
+        ev = make_event(pin, ts, estado, pin=pin)
+        prev = self._ultima.get(pin)
+        if prev is not None:
+            p_ts, p_estado, p_dev = prev
+            if (p_estado == ev.estado and p_dev != device
+                    and 0 <= crudo - p_ts <= self.settings.zk_ventana_dup_seg):
+                return  # duplicada en otro reloj
+            if crudo < p_ts:
+                # llegó tarde (otro reloj, reloj atrasado): se rehace el empleado
+                self._reconstruir(pin)
+                return
+        self._ultima[pin] = (crudo, ev.estado, device)
+        self.acc.agregar(ev)
+        self._sucio = True
+
+    def _reconstruir(self, pin: str) -> None:
+        self.acc.reiniciar(pin)
+        self._ultima.pop(pin, None)
+        desde = datetime.combine(payroll._date_of_day(self._dia_inicio), datetime.min.time())
+        for ev in self.store.eventos(desde=desde, pin=pin):
+            self._alimentar(pin, ev["timestamp"], ev["estado"], ev["device"])
+        self._contar("reconstrucciones")
+
+    def _guardar_vivo(self, vivos: list) -> None:
+        """
+        Marcaciones en vivo acumuladas en la cola: una transacción por reloj
+        (no un commit por marcación) y al acumulador en orden de llegada.
+        """
+        entraron = set()  # clave del almacén (pin, ts, status, punch)
+        for device in {dev for dev, _, _ in vivos}:
+            filas = [fila for dev, fila, _ in vivos if dev == device]
+            nuevas: list = []
+            self.store.agregar(device, filas, max(r for dev, _, r in vivos if dev == device),
+                               insertadas=nuevas)
+            entraron.update(f[:4] for f in nuevas)
+        for device, fila, _ in vivos:
+            if fila[:4] in entraron:
+                self._alimentar(str(fila[0]), fila[1], fila[4], device)
+        self._contar("marcaciones_vivo", len(vivos))
+
+    def _procesar(self, msgs: list) -> None:
+        vivos = []
+        for msg in msgs:
+            tipo, device = msg[0], msg[1]
+            if tipo == "vivo":
+                vivos.append((device, fila_marcacion(msg[2]), msg[3]))
+                continue
+            if vivos:
+                self._guardar_vivo(vivos)
+                vivos = []
+            if tipo == "lote":
+                self._backfill(device, msg[2], msg[3])
+            else:
+                print(f"[WARN] Reloj {device}: {msg[2]} (se reconecta)")
+                self._contar("reconexiones")
+        if vivos:
+            self._guardar_vivo(vivos)
+
+    def _backfill(self, device: str, atts, registros: int) -> None:
+        # desde la última descarga (no desde la marca de agua: las marcaciones
+        # en vivo la adelantan y un hueco entre descarga y captura se perdería)
+        desde = self._desde_lote.get(device)
+        filas = sorted((fila_marcacion(a) for a in atts if desde is None or a.timestamp >= desde),
+                       key=lambda f: f[1])
+        nuevas: list = []
+        self.store.agregar(device, filas, registros, insertadas=nuevas)
+        if filas:
+            self._desde_lote[device] = filas[-1][1]
+        por_pin: Dict[str, list] = {}
+        for pin, ts, _status, _punch, estado in nuevas:
+            por_pin.setdefault(str(pin), []).append((ts, estado))
+        for pin, marcas in por_pin.items():
+            prev = self._ultima.get(pin)
+            if prev is not None and payroll._to_epoch(marcas[0][0]) < prev[0]:
+                self._reconstruir(pin)  # el hueco quedó detrás: una vez por empleado
+                continue
+            for ts, estado in marcas:
+                self._alimentar(pin, ts, estado, device)
+        self._contar("marcaciones_backfill", len(nuevas))
+
+    def _tomar(self, timeout: float) -> list:
+        """Lo que haya en la cola (espera hasta timeout por el primero)."""
+        try:
+            msgs = [self.cola.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                msgs.append(self.cola.get_nowait())
+            except queue.Empty:
+                return msgs
+
+    def _arrancar(self) -> List[CapturaReloj]:
+        """Carga la ventana desde el almacén y arranca un hilo por reloj."""
+        self._dia_inicio = self._inicio_ventana()
+        desde = datetime.combine(payroll._date_of_day(self._dia_inicio), datetime.min.time())
+        for ev in self.store.eventos(desde=desde):
+            self._alimentar(ev["pin"], ev["timestamp"], ev["estado"], ev["device"])
+
+        capturas = []
+        for dev in self.settings.zk_devices:
+            wm, registros = self.store.estado_sync(dev.nombre)
+            if wm is not None:
+                self._desde_lote[dev.nombre] = wm
+            c = CapturaReloj(dev, self.conectar, self.cola, self.parar, registros=registros,
+                             conciliar_seg=self.settings.daemon_conciliar_min * 60,
+                             timeout_vivo=self.timeout_vivo)
+            c.start()
+            capturas.append(c)
+        return capturas
+
+    def ejecutar(self) -> None:
+        """Corre hasta que se llame a detener() (o Ctrl+C). Bloquea este hilo."""
+        reporte_seg = self.settings.daemon_reporte_min * 60
+        self.store = EventStore(os.path.join(self.settings.state_dir, "eventos.db"))
+        capturas: List[CapturaReloj] = []
+        try:
+            try:
+                capturas = self._arrancar()
+                proximo = time.monotonic() + reporte_seg
+                while not self.parar.is_set():
+                    self._procesar(self._tomar(timeout=1))
+                    if time.monotonic() >= proximo:
+                        self._mantenimiento()
+                        proximo = time.monotonic() + reporte_seg
+            except KeyboardInterrupt:
+                print("[DAEMON] Detenido")
+            self.parar.set()
+            for c in capturas:
+                c.join(timeout=self.timeout_vivo + 1)
+            # lo que los relojes alcanzaron a mandar antes de parar
+            self._procesar(self._tomar(timeout=0))
+            self._mantenimiento()
+        finally:
+            self.parar.set()
+            self.store.close()
+
+    def detener(self) -> None:
+        self.parar.set()
+
+    # -------------------------
+    # reportes
+    # -------------------------
+
+    def _mantenimiento(self) -> None:
+        """Avanza la ventana si cambió la quincena y reescribe los resúmenes."""
+        inicio = self._inicio_ventana()
+        if inicio > self._dia_inicio:
+            self._dia_inicio = inicio
+            self.acc.podar(inicio)
+        if self._sucio:
+            self.escribir_reportes()
+            self._sucio = False
+        if self.metricas:
+            self.metricas.guardar(safe_join(self.settings.local_out, f"Metricas_{self.metricas.tag}.json"))
+
+    def _nombres_empleados(self) -> Dict[str, str]:
+        pins = set(self.acc.diario)
+        if self._nombres is not None:
+            empleados = self._nombres(pins)
+        else:
+            empleados = cargar_empleados(self.settings.zktime_db_path, pins=pins,
+                                         cache_dir=self.settings.state_dir)
+        return {pin: empleados.get(pin, f"PIN {pin}") for pin in pins}
+
+    def reporte(self, periodo: Periodo, nombres: Optional[Dict[str, str]] = None):
+        """(quincena_rows, diario_rows, rango) de la quincena, desde los totales en memoria."""
+        lo, hi, rango = payroll._quincena_range(*periodo, 0)
+        quincena_rows, diario_rows = self.acc.filas(payroll._day_of_date(lo), payroll._day_of_date(hi),
+                                                    nombres or self._nombres_empleados())
+        return quincena_rows, diario_rows, rango
+
+    def escribir_reportes(self) -> List[str]:
+        ensure_dir(self.settings.local_out)
+        nombres = self._nombres_empleados()
+        salidas = []
+        for periodo in self.periodos():
+            y, m, q = periodo
+            with (self.metricas.etapa("excel_resumen") if self.metricas else nullcontext()):
+                quincena_rows, diario_rows, _ = self.reporte(periodo, nombres)
+                final = safe_join(self.settings.local_out, f"Resumen_Horas_{y}-{m:02d}-Q{q}_EN_CURSO.xlsx")
+                # se escribe aparte y se renombra: quien lo abra nunca ve uno a medias
+                tmp = safe_join(self.settings.local_out, f".Resumen_Horas_{y}-{m:02d}-Q{q}_EN_CURSO.tmp.xlsx")
+                export_resumen_xlsx(tmp, quincena_rows, diario_rows,
+                                    payroll.escribir_hoja_resumen, payroll.escribir_hoja_diario)
+                os.replace(tmp, final)
+            salidas.append(final)
+        self._contar("reportes")
+        return salidas
+
+def run_daemon(settings, metricas=None, perfiles=None) -> None:
+    if not settings.zk_devices:
+        raise RuntimeError("El modo daemon necesita ZK_MAC o ZK_DEVICES.")
+    d = Daemon(settings, metricas=metricas, perfiles=perfiles)
+    print(f"[DAEMON] {len(settings.zk_devices)} reloj(es); resumen en curso cada "
+          f"{settings.daemon_reporte_min:g} min en {settings.local_out}")
+    d.ejecutar()
@@ -0,0 +1,205 @@
+import hashlib
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+
+from .paths import ensure_dir, safe_join
+
+def sha256_archivo(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+def _temporal(destino_dir: str, nombre: str) -> str:
+    # nombre fijo por artefacto: una copia abandonada la pisa el próximo intento
+    return os.path.join(destino_dir, f".{nombre}.tmp")
+
+def publicar(origen: str, destino_dir: str, sha256: str) -> str:
+    """
+    Copia origen a destino_dir de forma atómica: escribe un temporal en la
+    misma carpeta, verifica el checksum leyéndolo de vuelta y recién ahí lo
+    renombra. Nadie ve nunca un reporte a medio escribir.
+    """
+    ensure_dir(destino_dir)
+    final = safe_join(destino_dir, os.path.basename(origen))
+    tmp = _temporal(destino_dir, os.path.basename(origen))
+    try:
+        shutil.copy2(origen, tmp)
+        if sha256_archivo(tmp) != sha256:
+            raise RuntimeError("checksum distinto tras copiar")
+        os.replace(tmp, final)
+    finally:
+        if os.path.exists(tmp):
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+    return final
+
+class Entregas:
+    """
+    Cola de entrega de artefactos a tesorería, atendida por un hilo.
+
+    Cada artefacto encolado queda primero en un outbox persistente (JSON);
+    sale de ahí sólo cuando se publicó y verificó. Lo que no se pudo
+    entregar (share caído, plazo vencido) se reintenta en la siguiente
+    corrida al llamar a iniciar().
+    """
+
+    def __init__(self, destino_dir: str, outbox_path: str, reintentos: int = 5,
+                 backoff: float = 2.0, metricas=None, publicar_fn=publicar):
+        self.destino_dir = destino_dir
+        self.outbox_path = outbox_path
+        self.reintentos = max(1, reintentos)
+        self.backoff = backoff
+        self.metricas = metricas
+        self._publicar = publicar_fn
+        self._cola: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._hilo: threading.Thread | None = None
+        self._cerrando = threading.Event()
+        self.outbox: dict[str, dict] = self._leer_outbox()
+
+    # -------------------------
+    # outbox
+    # -------------------------
+
+    def _leer_outbox(self) -> dict:
+        try:
+            with open(self.outbox_path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _guardar_outbox(self) -> None:
+        # llamar con self._lock tomado
+        ensure_dir(os.path.dirname(self.outbox_path))
+        tmp = self.outbox_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.outbox, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.outbox_path)
+
+    # -------------------------
+    # API
+    # -------------------------
+
+    def iniciar(self) -> None:
+        """
+        Arranca el hilo y reencola lo pendiente de corridas anteriores.
+        Borra de la carpeta destino los temporales de copias abandonadas
+        (plazo vencido en cerrar) que ya no tienen entrega pendiente.
+        """
+        with self._lock:
+            pendientes = list(self.outbox)
+        self._limpiar_temporales({os.path.basename(p) for p in pendientes})
+        for path in pendientes:
+            self._cola.put(path)
+        self._hilo = threading.Thread(target=self._trabajar, name="entregas", daemon=True)
+        self._hilo.start()
+
+    def encolar(self, path_local: str) -> None:
+        item = {"sha256": sha256_archivo(path_local), "intentos": 0, "error": None,
+                "encolado": time.time()}
+        with self._lock:
+            self.outbox[path_local] = item
+            self._guardar_outbox()
+        self._cola.put(path_local)
+
+    def cerrar(self, plazo_seg: float | None = None) -> dict[str, dict]:
+        """
+        Espera a que la cola se vacíe (hasta plazo_seg) y detiene el hilo.
+        Devuelve lo que sigue pendiente en el outbox.
+        """
+        fin = None if plazo_seg is None else time.monotonic() + plazo_seg
+        while self._cola.unfinished_tasks:
+            if fin is not None and time.monotonic() >= fin:
+                break
+            time.sleep(0.05)
+        self._cerrando.set()
+        self._cola.put(None)
+        if self._hilo is not None:
+            # si venció el plazo con una copia en curso no se la espera:
+            # el hilo es daemon y el ítem sigue en el outbox
+            self._hilo.join(timeout=1)
+        with self._lock:
+            return dict(self.outbox)
+
+    def _limpiar_temporales(self, pendientes: set[str]) -> None:
+        try:
+            nombres = os.listdir(self.destino_dir)
+        except OSError:
+            return  # share caído: se intenta en la próxima corrida
+        for n in nombres:
+            if n.startswith(".") and n.endswith(".tmp") and n[1:-4] not in pendientes:
+                try:
+                    os.remove(os.path.join(self.destino_dir, n))
+                except OSError:
+                    pass
+
+    # -------------------------
+    # hilo
+    # -------------------------
+
+    def _trabajar(self) -> None:
+        while True:
+            path = self._cola.get()
+            try:
+                if path is None or self._cerrando.is_set():
+                    return
+                self._entregar(path)
+            finally:
+                self._cola.task_done()
+
+    def _entregar(self, path: str) -> None:
+        with self._lock:
+            item = self.outbox.get(path)
+        if item is None:
+            return  # ya entregado (encolado dos veces)
+
+        if not os.path.exists(path):
+            print(f"[WARN] Entrega descartada, ya no existe: {path}")
+            self._sacar(path, item)
+            return
+
+        for n in range(self.reintentos):
+            if self._cerrando.is_set():
+                return
+            # se publica lo que se encoló: si el archivo local cambió desde
+            # entonces no es el artefacto que se pidió entregar
+            if sha256_archivo(path) != item["sha256"]:
+                print(f"[WARN] Entrega descartada, {os.path.basename(path)} cambió después de encolarlo "
+                      f"(checksum distinto al del outbox)")
+                self._sacar(path, item)
+                return
+            try:
+                if self.metricas:
+                    with self.metricas.etapa("entrega"):
+                        self._publicar(path, self.destino_dir, item["sha256"])
+                    self.metricas.contar("entregas_ok")
+                else:
+                    self._publicar(path, self.destino_dir, item["sha256"])
+                self._sacar(path, item)
+                return
+            except Exception as e:
+                with self._lock:
+                    item["intentos"] += 1
+                    item["error"] = str(e)
+                    self._guardar_outbox()
+                if n + 1 < self.reintentos:
+                    self._cerrando.wait(self.backoff * 2 ** n)
+
+        print(f"[WARN] No se pudo entregar {os.path.basename(path)} a tesorería: {item['error']} "
+              f"(queda en el outbox para la próxima corrida)")
+
+    def _sacar(self, path: str, item: dict) -> None:
+        # sólo si nadie lo volvió a encolar mientras tanto (otro ítem, otro sha)
+        with self._lock:
+            if self.outbox.get(path) is item:
+                del self.outbox[path]
+                self._guardar_outbox()
@@ -0,0 +1,92 @@
+import json
+import os
+import re
+import socket
+import subprocess
+import threading
+import time
+
+from .paths import ensure_dir
+
+ZK_PORT = 4370
+
+# varios relojes pueden localizarse en paralelo y comparten el archivo de cache
+_cache_lock = threading.Lock()
+
+_RE_IP = re.compile(r"\b(\d{1,3}(?:\.\d{1,3}){3})\b")
+_RE_MAC = re.compile(r"\b([0-9a-fA-F]{2}(?:[-:][0-9a-fA-F]{2}){5})\b")
+
+def normalizar_mac(mac: str) -> str:
+    # arp en Windows usa "aa-bb-..", en Linux "aa:bb:.."
+    return (mac or "").lower().strip().replace(":", "-")
+
+def parsear_tabla_vecinos(texto: str) -> dict[str, str]:
+    """
+    Parsea la salida de `arp -a`, `ip neigh` o /proc/net/arp.
+    Devuelve {mac_normalizada: ip}. Ignora entradas incompletas (00-00-..).
+    """
+    tabla = {}
+    for linea in texto.splitlines():
+        m_ip = _RE_IP.search(linea)
+        m_mac = _RE_MAC.search(linea)
+        if not m_ip or not m_mac:
+            continue
+        mac = normalizar_mac(m_mac.group(1))
+        if mac == "00-00-00-00-00-00":
+            continue
+        tabla[mac] = m_ip.group(1)
+    return tabla
+
+def leer_tabla_vecinos() -> dict[str, str]:
+    """
+    Lee la tabla ARP completa en una sola llamada:
+    /proc/net/arp en Linux, `arp -a` en el resto.
+    """
+    if os.path.exists("/proc/net/arp"):
+        with open("/proc/net/arp", encoding="ascii", errors="ignore") as f:
+            return parsear_tabla_vecinos(f.read())
+    try:
+        res = subprocess.run(["arp", "-a"], capture_output=True, text=True, errors="ignore")
+    except OSError:
+        return {}
+    return parsear_tabla_vecinos(res.stdout or "")
+
+def puerto_abierto(ip: str, port: int = ZK_PORT, timeout: float = 1.0) -> bool:
+    try:
+        with socket.create_connection((ip, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+# -------------------------
+# Cache MAC -> IP en disco
+# -------------------------
+
+def _leer_json(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def cache_ip(cache_path: str, mac: str, ttl_horas: float) -> str | None:
+    """Devuelve la última IP conocida para mac si no ha vencido el TTL."""
+    item = _leer_json(cache_path).get(normalizar_mac(mac))
+    if not item:
+        return None
+    edad = time.time() - float(item.get("ts", 0))
+    if edad > ttl_horas * 3600:
+        return None
+    return item.get("ip")
+
+def guardar_cache_ip(cache_path: str, mac: str, ip: str) -> None:
+    with _cache_lock:
+        data = _leer_json(cache_path)
+        data[normalizar_mac(mac)] = {"ip": ip, "ts": time.time()}
+
+        ensure_dir(os.path.dirname(cache_path))
+        tmp = cache_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, cache_path)
@@ -0,0 +1,130 @@
+import os
+import sqlite3
+from datetime import datetime
+
+from .paths import ensure_dir
+
+_TS_FMT = "%Y-%m-%d %H:%M:%S"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS marcaciones (
+    pin       TEXT    NOT NULL,
+    ts        TEXT    NOT NULL,
+    status    INTEGER NOT NULL,
+    punch     INTEGER NOT NULL,
+    estado    TEXT    NOT NULL,
+    device    TEXT    NOT NULL,
+    PRIMARY KEY (pin, ts, status, punch)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_marcaciones_ts ON marcaciones (ts);
+CREATE TABLE IF NOT EXISTS sync (
+    device    TEXT PRIMARY KEY,
+    watermark TEXT,
+    registros INTEGER
+);
+"""
+
+class EventStore:
+    """
+    Almacén local (SQLite) de marcaciones descargadas del reloj.
+    Clave (pin, timestamp, status, punch): reinsertar es idempotente.
+    Por dispositivo guarda la marca de agua (último timestamp) y el
+    número de registros que tenía el reloj en la última sincronización.
+    """
+
+    def __init__(self, path: str):
+        ensure_dir(os.path.dirname(path))
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def estado_sync(self, device: str) -> tuple[datetime | None, int | None]:
+        """Devuelve (watermark, registros_en_reloj) de la última sincronización."""
+        row = self.conn.execute(
+            "SELECT watermark, registros FROM sync WHERE device = ?", (device,)
+        ).fetchone()
+        if not row:
+            return None, None
+        wm = datetime.strptime(row[0], _TS_FMT) if row[0] else None
+        return wm, row[1]
+
+    def agregar(self, device: str, registros, total_reloj: int | None = None,
+                insertadas: list | None = None) -> int:
+        """
+        registros: iterable de (pin, timestamp, status, punch, estado).
+        Inserta sólo los nuevos y avanza la marca de agua. Devuelve cuántos entraron.
+        insertadas: si se pasa una lista, se le agregan los registros que
+        entraron (se insertan de a uno; para lotes chicos, p.ej. el daemon).
+        """
+        wm_prev, _ = self.estado_sync(device)
+        wm = wm_prev
+        originales = []
+        filas = []
+        for r in registros:
+            pin, ts, status, punch, estado = r
+            originales.append(r)
+            filas.append((str(pin), ts.strftime(_TS_FMT), int(status), int(punch), estado, device))
+            if wm is None or ts > wm:
+                wm = ts
+
+        sql = ("INSERT OR IGNORE INTO marcaciones (pin, ts, status, punch, estado, device) "
+               "VALUES (?, ?, ?, ?, ?, ?)")
+        with self.conn:
+            antes = self.conn.total_changes
+            if insertadas is None:
+                self.conn.executemany(sql, filas)
+            else:
+                for r, fila in zip(originales, filas):
+                    if self.conn.execute(sql, fila).rowcount:
+                        insertadas.append(r)
+            nuevos = self.conn.total_changes - antes
+            self.conn.execute(
+                "INSERT INTO sync (device, watermark, registros) VALUES (?, ?, ?) "
+                "ON CONFLICT(device) DO UPDATE SET watermark = excluded.watermark, "
+                "registros = COALESCE(excluded.registros, sync.registros)",
+                (device, wm.strftime(_TS_FMT) if wm else None, total_reloj),
+            )
+        return nuevos
+
+    def dispositivos(self) -> list[str]:
+        """Relojes con marcaciones en el almacén."""
+        return [d for (d,) in self.conn.execute("SELECT DISTINCT device FROM marcaciones ORDER BY device")]
+
+    def eventos(self, desde: datetime | None = None, hasta: datetime | None = None,
+                pin: str | None = None, device: str | None = None) -> list[dict]:
+        """
+        Marcaciones en [desde, hasta] ordenadas por timestamp, con el mismo
+        formato que descargar_eventos_zkteco. pin: sólo las de ese empleado;
+        device: sólo las de ese reloj.
+        """
+        sql = "SELECT pin, ts, estado, device FROM marcaciones"
+        cond, args = [], []
+        if pin is not None:
+            cond.append("pin = ?")
+            args.append(str(pin))
+        if device is not None:
+            cond.append("device = ?")
+            args.append(device)
+        if desde:
+            cond.append("ts >= ?")
+            args.append(desde.strftime(_TS_FMT))
+        if hasta:
+            cond.append("ts <= ?")
+            args.append(hasta.strftime(_TS_FMT))
+        if cond:
+            sql += " WHERE " + " AND ".join(cond)
+        sql += " ORDER BY ts, pin"
+
+        return [
+            {"pin": pin, "timestamp": datetime.strptime(ts, _TS_FMT), "estado": estado, "device": device}
+            for pin, ts, estado, device in self.conn.execute(sql, args)
+        ]
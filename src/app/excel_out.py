@@ -1,36 +1,67 @@
+from typing import Iterable, Iterator
+
 from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment, Font, PatternFill
-from datetime import datetime
+from openpyxl.utils import get_column_letter
+
+# Todos los writers usan Workbook(write_only=True): las filas se serializan
+# al vuelo y la memoria no crece con el número de filas.
+
+def header_cells(ws, titles: list[str]) -> list[WriteOnlyCell]:
+    """Encabezado (negrita, fondo gris, centrado) para una hoja write_only."""
+    fill = PatternFill("solid", fgColor="DDDDDD")
+    font = Font(bold=True)
+    align = Alignment(horizontal="center", vertical="center")
 
-def export_eventos_xlsx(path_out: str, rows: list[tuple]):
+    cells = []
+    for t in titles:
+        cell = WriteOnlyCell(ws, value=t)
+        cell.fill = fill
+        cell.font = font
+        cell.alignment = align
+        cells.append(cell)
+    return cells
+
+def autosize(ws, max_cols: int):
+    # en write_only los anchos deben fijarse antes de escribir filas
+    for col in range(1, max_cols + 1):
+        letter = get_column_letter(col)
+        ws.column_dimensions[letter].width = 18
+
+def export_eventos_xlsx(path_out: str, rows: Iterable[tuple]):
     """
-    rows: (pin, empleado, fecha, hora, estado)
+    rows: (pin, empleado, fecha, hora, estado). Acepta cualquier iterable.
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Eventos"
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Eventos")
 
-    ws.append(["ID", "Empleado", "Fecha", "Hora", "Estado"])
+    ws.append(header_cells(ws, ["ID", "Empleado", "Fecha", "Hora", "Estado"]))
     for r in rows:
         ws.append(list(r))
 
-    # estilo simple
-    for cell in ws[1]:
-        cell.font = Font(bold=True)
-        cell.fill = PatternFill("solid", fgColor="DDDDDD")
-        cell.alignment = Alignment(horizontal="center")
+    wb.save(path_out)
 
+def export_clean_xlsx(path_out: str, rows: Iterable[tuple]) -> str:
+    """
+    rows: (Nombre, Fecha, Hora, Estado). Formato que lee payroll.read_clean_events.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("EventosLimpios")
+    ws.append(["Nombre", "Fecha", "Hora", "Estado"])
+    for r in rows:
+        ws.append(list(r))
     wb.save(path_out)
+    return path_out
 
-def export_resumen_xlsx(path_out: str, quincena_rows: list[list], diario_rows: list[list],
+def export_resumen_xlsx(path_out: str, quincena_rows: Iterable[list], diario_rows: Iterable[list],
                         write_resumen, write_diario):
     """
     write_resumen(ws, quincena_rows) y write_diario(ws, diario_rows) los provee payroll.py
     (aquí no duplicamos lógica).
     """
-    wb = Workbook()
-    ws1 = wb.active
-    ws1.title = "Resumen_quincena"
+    wb = Workbook(write_only=True)
+    ws1 = wb.create_sheet("Resumen_quincena")
     write_resumen(ws1, quincena_rows)
 
     ws2 = wb.create_sheet("Detalle_diario")
@@ -38,21 +69,25 @@ def export_resumen_xlsx(path_out: str, quincena_rows: list[list], diario_rows: l
 
     wb.save(path_out)
 
-def load_demo_events(path_xlsx: str) -> list[dict]:
+def load_demo_events(path_xlsx: str) -> Iterator[dict]:
     """
     Lee data/sample_events.xlsx con columnas:
     Nombre | Fecha | Hora | Estado
+
+    Generador sobre un workbook read_only: no carga la hoja completa.
     """
-    wb = load_workbook(path_xlsx)
-    ws = wb.active
-    header = [str(c.value).strip() if c.value else "" for c in next(ws.iter_rows(min_row=1, max_row=1))]
-    idx = {h: i for i, h in enumerate(header)}
-
-    out = []
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        nombre = row[idx["Nombre"]]
-        fecha = row[idx["Fecha"]]
-        hora = row[idx["Hora"]]
-        estado = row[idx["Estado"]]
-        out.append({"nombre": nombre, "fecha": fecha, "hora": hora, "estado": estado})
-    return out
+    wb = load_workbook(path_xlsx, read_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [str(v).strip() if v else "" for v in next(rows, ())]
+        idx = {h: i for i, h in enumerate(header)}
+        cols = [idx["Nombre"], idx["Fecha"], idx["Hora"], idx["Estado"]]
+        width = max(cols) + 1
+
+        for row in rows:
+            if len(row) < width:
+                row = tuple(row) + (None,) * (width - len(row))
+            nombre, fecha, hora, estado = (row[i] for i in cols)
+            yield {"nombre": nombre, "fecha": fecha, "hora": hora, "estado": estado}
+    finally:
+        wb.close()
@@ -1,137 +1,356 @@
+import argparse
 import os
-import shutil
-from datetime import datetime
-from openpyxl import Workbook
+from datetime import date, datetime, timedelta
 
 from .config import load_settings
 from .paths import ensure_dir, safe_join
-from .excel_out import export_eventos_xlsx, export_resumen_xlsx, load_demo_events
-from .timeparse import parse_date_generic, parse_time_generic
-from .payroll import calcular_horas_desde_excel, escribir_hoja_resumen, escribir_hoja_diario
+from .excel_out import export_eventos_xlsx, export_resumen_xlsx, export_clean_xlsx, load_demo_events
+from .timeparse import make_date_parser, make_time_parser
+from .payroll import (calcular_horas_periodos, make_event, escribir_hoja_resumen, escribir_hoja_diario,
+                      periodo_desde_fecha, periodos_en_rango, ventana_periodos, campos_generales,
+                      iter_archive_events)
+from .perfiles import cargar_perfiles
 
 # PROD
-from .zkteco_prod import obtener_ip_por_mac, descargar_eventos_zkteco
+from .zkteco_prod import localizar_reloj, descargar_eventos_multi
 from .zktime_db import cargar_empleados
+from .event_store import EventStore
+from .archive import EventArchive
+from .pipeline import Pipeline
+from .delivery import Entregas
+from .metrics import Metricas
+from .streaming import calcular_horas_stream
+from .daemon import run_daemon
 
 def _crear_excel_limpio_desde_rows(rows_limpias: list[tuple], out_path: str) -> str:
     """
     rows_limpias: (Nombre, Fecha, Hora, Estado)
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "EventosLimpios"
-    ws.append(["Nombre", "Fecha", "Hora", "Estado"])
-    for r in rows_limpias:
-        ws.append(list(r))
-    wb.save(out_path)
-    return out_path
-
-def run_demo(settings):
+    return export_clean_xlsx(out_path, rows_limpias)
+
+def _resumen_name(prefijo: str, tag: str, periodo, con_periodo: bool) -> str:
+    # con_periodo: quincenas pedidas (--periodo/--desde/--hasta); la
+    # autodetectada va sin fecha en el nombre, como siempre
+    if not con_periodo:
+        return f"{prefijo}_{tag}.xlsx"
+    y, m, q = periodo
+    return f"{prefijo}_{y}-{m:02d}-Q{q}_{tag}.xlsx"
+
+def _cargar_perfiles(settings):
+    """Perfiles de turno compilados una vez por corrida (None = reglas generales)."""
+    if not settings.perfiles_turno:
+        return None
+    perfiles = cargar_perfiles(settings.perfiles_turno, campos_generales())
+    print(f"[INFO] Perfiles de turno: {len(perfiles.perfiles)} perfiles, {len(perfiles)} empleados asignados")
+    return perfiles
+
+def run_demo(settings, periodos=None, metricas=None):
+    metricas = metricas or Metricas("DEMO")
     ensure_dir(settings.local_out)
+    perfiles = _cargar_perfiles(settings)
 
     demo_path = os.path.join("data", "sample_events.xlsx")
-    items = load_demo_events(demo_path)
 
     # convertir a (Nombre, Fecha(date), Hora(time), Estado)
     rows_limpias = []
-    for it in items:
-        nombre = str(it["nombre"]).strip()
-        fecha = parse_date_generic(it["fecha"])
-        hora = parse_time_generic(it["hora"])
-        estado = str(it["estado"]).strip()
-        if nombre and fecha and hora and estado:
-            rows_limpias.append((nombre, fecha, hora, estado))
-
-    tag = datetime.now().strftime("%Y%m%d_%H%M%S")
-    path_clean = os.path.join(settings.local_out, f"Eventos_Limpios_DEMO_{tag}.xlsx")
-    _crear_excel_limpio_desde_rows(rows_limpias, path_clean)
-
-    # quincena: por defecto, detecta mes actual y quincena 1
-    now = datetime.now()
-    year, month, quincena = now.year, now.month, 1
-
-    quincena_rows, diario_rows, _rango = calcular_horas_desde_excel(
-        path_clean, year, month, quincena, settings.margen_dias_quincena
-    )
-
-    out_res = os.path.join(settings.local_out, f"Resumen_Horas_DEMO_{tag}.xlsx")
-    export_resumen_xlsx(out_res, quincena_rows, diario_rows, escribir_hoja_resumen, escribir_hoja_diario)
-    print(f"[DEMO] Generado: {out_res}")
-
-def run_prod(settings):
-    if not (settings.zk_mac and settings.zk_net_prefix and settings.zktime_db_path):
-        raise RuntimeError("Faltan variables PROD (ZK_MAC, ZK_NET_PREFIX, ZKTIME_DB_PATH).")
+    eventos = []
+    with metricas.etapa("lectura"):
+        parse_fecha = make_date_parser()
+        parse_hora = make_time_parser()
+        for it in load_demo_events(demo_path):
+            nombre = str(it["nombre"]).strip()
+            fecha = parse_fecha(it["fecha"])
+            hora = parse_hora(it["hora"])
+            estado = str(it["estado"]).strip()
+            if nombre and fecha and hora and estado:
+                rows_limpias.append((nombre, fecha, hora, estado))
+                eventos.append(make_event(nombre, datetime.combine(fecha, hora), estado))
+    metricas.contar("eventos_leidos", len(eventos))
+
+    tag = metricas.tag
+    if settings.guardar_eventos_limpios:
+        path_clean = os.path.join(settings.local_out, f"Eventos_Limpios_DEMO_{tag}.xlsx")
+        with metricas.etapa("excel_limpio"):
+            _crear_excel_limpio_desde_rows(rows_limpias, path_clean)
+        metricas.contar("filas_escritas", len(rows_limpias))
+
+    # quincena: por defecto, la de la fecha de hoy
+    con_periodo = bool(periodos)
+    periodos = periodos or [periodo_desde_fecha(date.today())]
+
+    resultados = _calcular(settings, eventos, periodos, metricas, perfiles=perfiles)
+
+    for periodo, (quincena_rows, diario_rows, _rango) in resultados.items():
+        out_res = os.path.join(settings.local_out,
+                               _resumen_name("Resumen_Horas_DEMO", tag, periodo, con_periodo))
+        with metricas.etapa("excel_resumen"):
+            export_resumen_xlsx(out_res, quincena_rows, diario_rows, escribir_hoja_resumen, escribir_hoja_diario)
+        metricas.contar("filas_escritas", len(quincena_rows) + len(diario_rows))
+        print(f"[DEMO] Generado: {out_res}")
+
+def _calcular(settings, eventos, periodos, metricas, perfiles=None):
+    """Etapa de cálculo, con cProfile si PROFILE_CALCULO está activo."""
+    perfil = None
+    if settings.perfil_calculo:
+        perfil = os.path.join(settings.local_out, f"Perfil_Calculo_{metricas.tag}.pstats")
 
+    stats = {}
+    with metricas.etapa("calculo", perfil_path=perfil):
+        if settings.motor_calculo == "stream":
+            # una pasada en orden de timestamp; no usa workers
+            resultados = calcular_horas_stream(
+                sorted(eventos, key=lambda e: e.ts), periodos, settings.margen_dias_quincena, stats=stats,
+                perfiles=perfiles,
+            )
+        elif settings.motor_calculo == "intervalos":
+            resultados = calcular_horas_periodos(
+                eventos, periodos, settings.margen_dias_quincena, settings.split_engine,
+                settings.payroll_workers, stats=stats, perfiles=perfiles,
+            )
+        else:
+            raise ValueError(f"Motor de cálculo desconocido: {settings.motor_calculo}")
+    for k, v in stats.items():
+        metricas.contar(k, v)
+    if perfil:
+        print(f"[INFO] Perfil del cálculo: {perfil}")
+    return resultados
+
+def run_prod(settings, periodos=None, metricas=None, descargar=True):
+    if not (settings.zk_devices and settings.zktime_db_path):
+        raise RuntimeError("Faltan variables PROD (ZK_MAC o ZK_DEVICES, ZK_NET_PREFIX, ZKTIME_DB_PATH).")
+
+    metricas = metricas or Metricas("PROD")
     ensure_dir(settings.local_out)
-    ensure_dir(settings.tesoreria_out)
+    perfiles = _cargar_perfiles(settings)
 
-    ip = obtener_ip_por_mac(settings.zk_mac, settings.zk_net_prefix)
-    if not ip:
-        raise RuntimeError("No se encontró el reloj en la red.")
+    cache_ip_path = os.path.join(settings.state_dir, "zk_ip_cache.json")
 
-    empleados = cargar_empleados(settings.zktime_db_path)
-    eventos = descargar_eventos_zkteco(ip, settings.dias_atras)
+    # quincena: por defecto, la de la fecha de hoy
+    con_periodo = bool(periodos)
+    periodos = periodos or [periodo_desde_fecha(date.today())]
+    primer_dia, _ = ventana_periodos(periodos, settings.margen_dias_quincena)
+    desde = min(datetime.now() - timedelta(days=settings.dias_atras),
+                datetime.combine(primer_dia, datetime.min.time()))
 
-    # construir rows para Excel eventos
-    rows_eventos = []
-    rows_limpias = []
-    for ev in eventos:
-        pin = ev["pin"]
-        ts = ev["timestamp"]
-        estado = ev["estado"]
-        empleado = empleados.get(pin, f"PIN {pin}")
+    def localizar(dev):
+        # corre en los hilos de descargar_eventos_multi: la etapa acumula por reloj
+        with metricas.etapa("descubrimiento"):
+            return localizar_reloj(
+                dev.mac, dev.net_prefix,
+                cache_path=cache_ip_path,
+                ttl_horas=settings.zk_cache_ttl_horas,
+                workers=settings.zk_discovery_workers,
+                log=print,
+            )
 
-        fecha = ts.date()
-        hora = ts.time()
+    archivo = EventArchive(os.path.join(settings.state_dir, "eventos.bin"))
+    pins_conocidos = list(archivo.pins)
+    tag = metricas.tag
 
-        rows_eventos.append((pin, empleado, fecha.strftime("%Y-%m-%d"), hora.strftime("%H:%M:%S"), estado))
-        rows_limpias.append((empleado, fecha, hora, estado))
+    # ---- etapas (cada una corre en un hilo; ver pipeline.Pipeline) ----
 
-    tag = datetime.now().strftime("%Y%m%d_%H%M%S")
+    def obtener_eventos():
+        if not descargar:
+            # reproceso: sólo se mapea el archivo binario (registros, no dicts),
+            # sin relojes ni Excel intermedio
+            ultimo_dia = ventana_periodos(periodos, settings.margen_dias_quincena)[1]
+            with metricas.etapa("archivo"):
+                recs = archivo.leer(datetime.combine(primer_dia, datetime.min.time()),
+                                    datetime.combine(ultimo_dia, datetime.max.time()))
+            metricas.contar("eventos_archivo", len(recs))
+            return recs
 
-    # 1) Excel eventos
-    eventos_name = f"Eventos_{tag}.xlsx"
-    eventos_local = safe_join(settings.local_out, eventos_name)
-    export_eventos_xlsx(eventos_local, rows_eventos)
+        with metricas.etapa("descarga"), EventStore(os.path.join(settings.state_dir, "eventos.db")) as store:
+            eventos, cobertura = descargar_eventos_multi(
+                settings.zk_devices, settings.dias_atras, store, localizar,
+                timeout=settings.zk_timeout,
+                reintentos=settings.zk_reintentos,
+                plazo_seg=settings.zk_plazo_seg,
+                ventana_dup_seg=settings.zk_ventana_dup_seg,
+                desde=desde,
+            )
+        metricas.contar("eventos_descargados", len(eventos))
 
-    # copia a tesorería
-    try:
-        shutil.copy2(eventos_local, safe_join(settings.tesoreria_out, eventos_name))
-    except Exception as e:
-        print(f"[WARN] No se pudo copiar eventos a tesorería: {e}")
+        fallidos = {n: c for n, c in cobertura.items() if c not in ("ok", "sin cambios")}
+        metricas.contar("relojes_ok", len(cobertura) - len(fallidos))
+        metricas.contar("relojes_fallidos", len(fallidos))
+        if len(fallidos) == len(cobertura):
+            raise RuntimeError(f"No se pudo leer ningún reloj: {fallidos}")
+        if fallidos:
+            print(f"[WARN] Cobertura parcial ({len(cobertura) - len(fallidos)}/{len(cobertura)} relojes): "
+                  + "; ".join(f"{n}: {c}" for n, c in fallidos.items()))
+
+        with metricas.etapa("archivo"):
+            metricas.contar("eventos_archivados", archivo.agregar(eventos))
+        return eventos
+
+    def precargar_empleados():
+        # mientras se descarga: los PIN ya vistos en el archivo calientan el
+        # snapshot, y después sólo faltan los PIN nuevos
+        if pins_conocidos:
+            with metricas.etapa("empleados_precarga"):
+                cargar_empleados(settings.zktime_db_path, pins=pins_conocidos, cache_dir=settings.state_dir)
+
+    def obtener_empleados(eventos, _precarga):
+        # sólo los PIN que aparecen en las marcaciones; snapshot local por mtime/tamaño
+        with metricas.etapa("empleados"):
+            if descargar:
+                pins = {ev["pin"] for ev in eventos}
+            else:
+                pins = {archivo.pins[p] for p in set(eventos["pin"].tolist())}
+            empleados = cargar_empleados(settings.zktime_db_path, pins=pins, cache_dir=settings.state_dir)
+        metricas.contar("empleados", len(empleados))
+        return empleados
 
-    # 2) Excel limpio temporal
-    clean_path = safe_join(settings.local_out, f"Eventos_Limpios_{tag}.xlsx")
-    _crear_excel_limpio_desde_rows(rows_limpias, clean_path)
+    def preparar(eventos, empleados):
+        if not descargar:
+            # reproceso: Event directo de los registros; no hay Excel de eventos
+            with metricas.etapa("preparacion"):
+                eventos_calc = list(iter_archive_events(eventos, archivo.pins, nombres=empleados))
+            return [], [], eventos_calc
 
-    # 3) Resumen quincena
-    now = datetime.now()
-    year, month, quincena = now.year, now.month, 1  # aquí puedes definir quincena por fecha
-    quincena_rows, diario_rows, _rango = calcular_horas_desde_excel(
-        clean_path, year, month, quincena, settings.margen_dias_quincena
-    )
+        # construir rows para Excel eventos
+        rows_eventos = []
+        rows_limpias = []
+        eventos_calc = []
+        with metricas.etapa("preparacion"):
+            for ev in eventos:
+                pin = ev["pin"]
+                ts = ev["timestamp"]
+                estado = ev["estado"]
+                empleado = empleados.get(pin, f"PIN {pin}")
 
-    resumen_name = f"Resumen_Horas_{tag}.xlsx"
-    resumen_local = safe_join(settings.local_out, resumen_name)
+                fecha = ts.date()
+                hora = ts.time()
 
-    export_resumen_xlsx(resumen_local, quincena_rows, diario_rows, escribir_hoja_resumen, escribir_hoja_diario)
+                rows_eventos.append((pin, empleado, fecha.strftime("%Y-%m-%d"), hora.strftime("%H:%M:%S"), estado))
+                rows_limpias.append((empleado, fecha, hora, estado))
+                eventos_calc.append(make_event(empleado, ts, estado, pin=pin))
+        return rows_eventos, rows_limpias, eventos_calc
+
+    def excel_eventos(prep):
+        rows_eventos = prep[0]
+        eventos_name = f"Eventos_{tag}.xlsx"
+        eventos_local = safe_join(settings.local_out, eventos_name)
+        with metricas.etapa("excel_eventos"):
+            export_eventos_xlsx(eventos_local, rows_eventos)
+        metricas.contar("filas_escritas", len(rows_eventos))
+
+        # a tesorería en segundo plano
+        entregas.encolar(eventos_local)
+
+    def excel_limpio(prep):
+        # sólo para depuración
+        rows_limpias = prep[1]
+        clean_path = safe_join(settings.local_out, f"Eventos_Limpios_{tag}.xlsx")
+        with metricas.etapa("excel_limpio"):
+            _crear_excel_limpio_desde_rows(rows_limpias, clean_path)
+        metricas.contar("filas_escritas", len(rows_limpias))
+
+    def calcular(prep):
+        return _calcular(settings, prep[2], periodos, metricas, perfiles=perfiles)
+
+    def resumen(periodo):
+        def escribir(resultados):
+            quincena_rows, diario_rows, _rango = resultados[periodo]
+            resumen_name = _resumen_name("Resumen_Horas", tag, periodo, con_periodo)
+            resumen_local = safe_join(settings.local_out, resumen_name)
+
+            with metricas.etapa("excel_resumen"):
+                export_resumen_xlsx(resumen_local, quincena_rows, diario_rows,
+                                    escribir_hoja_resumen, escribir_hoja_diario)
+            metricas.contar("filas_escritas", len(quincena_rows) + len(diario_rows))
+            entregas.encolar(resumen_local)
+        return escribir
+
+    # ---- dependencias: el Excel de eventos se escribe mientras se calcula ----
+    p = Pipeline()
+    p.etapa("eventos", obtener_eventos)
+    p.etapa("empleados_precarga", precargar_empleados)
+    p.etapa("empleados", obtener_empleados, depende=("eventos", "empleados_precarga"))
+    p.etapa("preparacion", preparar, depende=("eventos", "empleados"))
+    if descargar:
+        # al reprocesar los eventos ya se exportaron y entregaron en su corrida
+        p.etapa("excel_eventos", excel_eventos, depende=("preparacion",))
+        if settings.guardar_eventos_limpios:
+            p.etapa("excel_limpio", excel_limpio, depende=("preparacion",))
+    p.etapa("calculo", calcular, depende=("preparacion",))
+    for periodo in periodos:
+        y, m, q = periodo
+        p.etapa(f"resumen_{y}-{m:02d}-{q}", resumen(periodo), depende=("calculo",))
+    # entregas a tesorería: un hilo publica mientras sigue la corrida;
+    # lo que quede pendiente (o falle) se retoma en la próxima desde el outbox
+    entregas = Entregas(settings.tesoreria_out, os.path.join(settings.state_dir, "outbox.json"),
+                        reintentos=settings.entrega_reintentos, metricas=metricas)
+    entregas.iniciar()
     try:
-        shutil.copy2(resumen_local, safe_join(settings.tesoreria_out, resumen_name))
-    except Exception as e:
-        print(f"[WARN] No se pudo copiar resumen a tesorería: {e}")
+        p.ejecutar()
+    finally:
+        pendientes = entregas.cerrar(settings.entrega_plazo_seg)
+        metricas.contar("entregas_pendientes", len(pendientes))
+        if pendientes:
+            print(f"[WARN] {len(pendientes)} archivo(s) sin entregar a tesorería; se reintentan en la próxima corrida: "
+                  + ", ".join(os.path.basename(x) for x in pendientes))
 
     print("[PROD] OK")
 
-def main():
+def _periodo_arg(v: str):
+    """YYYY-MM-Q, p.ej. 2025-12-2"""
+    try:
+        y, m, q = (int(x) for x in v.split("-"))
+        if not (1 <= m <= 12 and q in (1, 2)):
+            raise ValueError
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"periodo inválido '{v}' (formato YYYY-MM-Q, Q=1|2)")
+    return y, m, q
+
+def _parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Resumen de horas por quincena (DEMO / PROD).")
+    ap.add_argument("--periodo", type=_periodo_arg, action="append", default=[],
+                    help="quincena YYYY-MM-Q; se puede repetir")
+    ap.add_argument("--desde", type=_periodo_arg, help="primera quincena de un rango YYYY-MM-Q")
+    ap.add_argument("--hasta", type=_periodo_arg, help="última quincena de un rango YYYY-MM-Q")
+    ap.add_argument("--sin-descarga", action="store_true",
+                    help="PROD: calcular desde el archivo local de marcaciones, sin leer los relojes")
+    ap.add_argument("--daemon", action="store_true",
+                    help="PROD: quedar conectado a los relojes y mantener el resumen de la quincena en curso")
+    args = ap.parse_args(argv)
+
+    periodos = list(args.periodo)
+    if args.desde or args.hasta:
+        hoy = periodo_desde_fecha(date.today())
+        periodos += periodos_en_rango(args.desde or hoy, args.hasta or hoy)
+    # sin argumentos: autodetección por fecha de corrida
+    return sorted(set(periodos)), args
+
+def main(argv=None):
+    periodos, args = _parse_args(argv)
     settings = load_settings()
     mode = settings.app_mode.upper()
 
-    if mode == "DEMO":
-        run_demo(settings)
-    elif mode == "PROD":
-        run_prod(settings)
-    else:
+    if mode not in ("DEMO", "PROD"):
         raise RuntimeError("APP_MODE debe ser DEMO o PROD.")
 
+    # métricas de la corrida: se guardan aunque falle, junto a los Excel
+    if args.daemon and mode != "PROD":
+        raise RuntimeError("--daemon sólo aplica en APP_MODE=PROD.")
+
+    metricas = Metricas(mode)
+    try:
+        if args.daemon:
+            run_daemon(settings, metricas, _cargar_perfiles(settings))
+        elif mode == "DEMO":
+            run_demo(settings, periodos, metricas)
+        else:
+            run_prod(settings, periodos, metricas, descargar=not args.sin_descarga)
+    except Exception as e:
+        metricas.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        try:
+            metricas.guardar(safe_join(settings.local_out, f"Metricas_{metricas.tag}.json"))
+        except OSError as e:
+            print(f"[WARN] No se pudieron guardar las métricas: {e}")
+
 if __name__ == "__main__":
     main()
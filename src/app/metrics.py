@@ -0,0 +1,80 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from .paths import ensure_dir
+
+class Metricas:
+    """
+    Tiempos por etapa y contadores de una corrida. Una etapa que se repite
+    (p.ej. descubrimiento por reloj) acumula sus tiempos y cuenta las veces.
+    Se puede usar desde varios hilos: las etapas corren en paralelo (ver
+    pipeline.Pipeline), así que su cpu_s es el del hilo que la mide
+    (time.thread_time; no incluye hilos ni procesos que lance la etapa) y
+    el CPU de todo el proceso va aparte, en cpu_s de la corrida.
+    """
+
+    def __init__(self, modo: str):
+        self.modo = modo
+        self.inicio = datetime.now()
+        self.tag = self.inicio.strftime("%Y%m%d_%H%M%S")  # mismo tag que los Excel de la corrida
+        self.error: str | None = None
+        self.etapas: dict[str, dict] = {}
+        self.contadores: dict[str, int] = {}
+        self._cpu0 = time.process_time()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def etapa(self, nombre: str, perfil_path: str | None = None):
+        """
+        Mide el bloque. Con perfil_path, además lo corre bajo cProfile y
+        guarda el .pstats en esa ruta (ábralo con `python -m pstats`).
+        """
+        perfil = cProfile.Profile() if perfil_path else None
+        t0, c0 = time.perf_counter(), time.thread_time()
+        if perfil:
+            perfil.enable()
+        try:
+            yield self
+        finally:
+            if perfil:
+                perfil.disable()
+            wall, cpu = time.perf_counter() - t0, time.thread_time() - c0
+            with self._lock:
+                e = self.etapas.setdefault(nombre, {"wall_s": 0.0, "cpu_s": 0.0, "veces": 0})
+                e["wall_s"] += wall
+                e["cpu_s"] += cpu
+                e["veces"] += 1
+            if perfil:
+                ensure_dir(os.path.dirname(perfil_path))
+                perfil.dump_stats(perfil_path)
+
+    def contar(self, nombre: str, n: int = 1) -> None:
+        with self._lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    def como_dict(self) -> dict:
+        with self._lock:
+            etapas = {
+                k: {"wall_s": round(v["wall_s"], 4), "cpu_s": round(v["cpu_s"], 4), "veces": v["veces"]}
+                for k, v in self.etapas.items()
+            }
+            return {
+                "modo": self.modo,
+                "inicio": self.inicio.isoformat(timespec="seconds"),
+                "duracion_s": round((datetime.now() - self.inicio).total_seconds(), 4),
+                "cpu_s": round(time.process_time() - self._cpu0, 4),
+                "etapas": etapas,
+                "contadores": dict(self.contadores),
+                "error": self.error,
+            }
+
+    def guardar(self, path: str) -> str:
+        ensure_dir(os.path.dirname(path))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.como_dict(), f, indent=2, ensure_ascii=False)
+        return path
@@ -1,14 +1,19 @@
 from __future__ import annotations
 
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
+from itertools import repeat
 from datetime import datetime, date, time as dtime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional
 
 from openpyxl import load_workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils import get_column_letter
 
-from .timeparse import parse_date_generic, parse_time_generic
+from . import calendario
+from .excel_out import autosize, header_cells
+from .perfiles import FESTIVO, Perfil, Perfiles, compilar
+from .timeparse import make_date_parser, make_time_parser
 
 
 # -------------------------
@@ -17,6 +22,8 @@ from .timeparse import parse_date_generic, parse_time_generic
 
 # Base "normal" por día (0=Lunes ... 6=Domingo)
 BASE_POR_DIA = {0: 8.25, 1: 8.25, 2: 8.25, 3: 8.25, 4: 8.25, 5: 4.00, 6: 0.00}
+# Base de un festivo (calendario.FESTIVO), caiga el día de la semana que caiga
+BASE_FESTIVO = 0.00
 
 # Ventanas de horas (puedes ajustar si tu empresa lo maneja distinto)
 DIUR_START = dtime(6, 0)
@@ -33,128 +40,145 @@ ROUND_MINUTES = 0  # 15 por ejemplo
 # -------------------------
 # Helpers tiempo / redondeo
 # -------------------------
+#
+# El núcleo trabaja en segundos enteros desde 1970-01-01 00:00 (hora local
+# naive, sin zona) y en ordinales de día (ts // DAY). Las horas (float) sólo
+# aparecen al construir las filas del reporte.
 
-def _round_dt_to_minutes(dt: datetime, minutes: int) -> datetime:
-    """Redondea dt al múltiplo de 'minutes'. Si minutes=0, no toca."""
-    if minutes <= 0:
-        return dt
-    discard = timedelta(
-        minutes=dt.minute % minutes,
-        seconds=dt.second,
-        microseconds=dt.microsecond
-    )
-    dt = dt - discard
-    # redondeo hacia abajo (conservador)
-    return dt
+DAY = 86400
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
 
-def _hours_between(a: datetime, b: datetime) -> float:
-    if b <= a:
-        return 0.0
-    return (b - a).total_seconds() / 3600.0
+def _to_epoch(dt: datetime) -> int:
+    return (dt - _EPOCH) // timedelta(seconds=1)
 
-def _is_sunday(d: date) -> bool:
-    return d.weekday() == 6
+def _from_epoch(ts: int) -> datetime:
+    return _EPOCH + timedelta(seconds=ts)
 
-def _clamp_dt(dt: datetime, start: datetime, end: datetime) -> datetime:
-    if dt < start:
-        return start
-    if dt > end:
-        return end
-    return dt
+def _day_of(ts: int) -> int:
+    return ts // DAY
 
-def _daterange(d1: date, d2: date):
-    cur = d1
-    while cur <= d2:
-        yield cur
-        cur = cur + timedelta(days=1)
+def _date_of_day(day: int) -> date:
+    return date.fromordinal(day + _EPOCH_ORDINAL)
 
-def _to_datetime(d: date, t: dtime) -> datetime:
-    return datetime.combine(d, t)
+def _day_of_date(d: date) -> int:
+    return d.toordinal() - _EPOCH_ORDINAL
 
+def _weekday_of_day(day: int) -> int:
+    # 1970-01-01 fue jueves (3)
+    return (day + 3) % 7
 
-# -------------------------
-# Split por tipos de hora
-# -------------------------
-
-def split_hours_types_same_day(day: date, start_dt: datetime, end_dt: datetime) -> Tuple[float, float, float]:
-    """
-    Divide un intervalo dentro de un mismo día en:
-    - diurnas (06:00-19:00)
-    - nocturnas (19:00-24:00 y 00:00-06:00)
-    - dominicales (todas las horas si es domingo)
-    """
-    if end_dt <= start_dt:
-        return 0.0, 0.0, 0.0
+def _base_secs_dia(day: int, perfil: Optional[Perfil] = None) -> int:
+    """Base normal del día en segundos, según su tipo en el calendario."""
+    base = (perfil or perfil_general()).base
+    if calendario.tipo_dia(day) == calendario.FESTIVO:
+        return base[FESTIVO]
+    return base[_weekday_of_day(day)]
 
-    # Si es domingo, todo cuenta como dominical (y además se puede dividir si quieres).
-    # Aquí lo dejamos como "dominicales = total", diurnas/nocturnas = 0 para no duplicar.
-    if _is_sunday(day):
-        return 0.0, 0.0, _hours_between(start_dt, end_dt)
+def _secs_of(t: dtime) -> int:
+    return t.hour * 3600 + t.minute * 60 + t.second
 
-    day_start = _to_datetime(day, dtime(0, 0))
-    day_end = _to_datetime(day, dtime(23, 59, 59))
+def _round_ts_to_minutes(ts: int, minutes: int) -> int:
+    """Redondea ts hacia abajo al múltiplo de 'minutes' dentro de la hora. Si minutes=0, no toca."""
+    if minutes <= 0:
+        return ts
+    # redondeo hacia abajo (conservador)
+    return ts - ((ts // 60) % 60 % minutes) * 60 - ts % 60
 
-    # Segmentos
-    diur_a = _to_datetime(day, DIUR_START)
-    diur_b = _to_datetime(day, DIUR_END)
+def _hours(secs: int) -> float:
+    return secs / 3600.0
 
-    # nocturna tramo 1: 00:00-06:00
-    noct1_a = day_start
-    noct1_b = _to_datetime(day, NOCT_END)
 
-    # nocturna tramo 2: 19:00-24:00
-    noct2_a = _to_datetime(day, NOCT_START)
-    noct2_b = day_end
+# -------------------------
+# Perfil general (constantes de arriba)
+# -------------------------
 
-    # Clampea al día
-    s = _clamp_dt(start_dt, day_start, day_end)
-    e = _clamp_dt(end_dt, day_start, day_end)
+def campos_generales() -> dict:
+    """Argumentos de perfiles.compilar() con los parámetros globales actuales."""
+    return dict(base_por_dia=BASE_POR_DIA, base_festivo=BASE_FESTIVO,
+                diurnas=(DIUR_START, DIUR_END), nocturnas=(NOCT_START, NOCT_END))
 
-    # diurnas
-    diur_s = max(s, diur_a)
-    diur_e = min(e, diur_b)
-    diurnas = _hours_between(diur_s, diur_e)
+@lru_cache(maxsize=8)
+def _perfil_general(base, base_festivo, diur_start, diur_end, noct_start, noct_end) -> Perfil:
+    return compilar("general", dict(base), base_festivo, (diur_start, diur_end), (noct_start, noct_end))
 
-    # nocturnas tramo 1
-    n1_s = max(s, noct1_a)
-    n1_e = min(e, noct1_b)
-    noct1 = _hours_between(n1_s, n1_e)
+def perfil_general() -> Perfil:
+    """Perfil compilado de las constantes globales (se recompila si cambian)."""
+    return _perfil_general(tuple(BASE_POR_DIA.items()), BASE_FESTIVO,
+                           DIUR_START, DIUR_END, NOCT_START, NOCT_END)
 
-    # nocturnas tramo 2
-    n2_s = max(s, noct2_a)
-    n2_e = min(e, noct2_b)
-    noct2 = _hours_between(n2_s, n2_e)
+def _perfiles_o_general(perfiles: Optional[Perfiles]) -> Perfiles:
+    return perfiles if perfiles is not None else Perfiles(perfil_general())
 
-    nocturnas = noct1 + noct2
-    dominicales = 0.0
 
-    return diurnas, nocturnas, dominicales
+# -------------------------
+# Split por tipos de hora
+# -------------------------
 
-def split_hours_types_any_span(start_dt: datetime, end_dt: datetime) -> Tuple[float, float, float]:
+def _split_day_secs(day: int, s: int, e: int, perfil: Optional[Perfil] = None) -> Tuple[int, int, int]:
     """
-    Divide cualquier intervalo (puede cruzar medianoche) en diurnas/nocturnas/dominicales
-    día por día.
+    Split de [s, e) ya recortado al día 'day' (ordinal). Devuelve segundos
+    (diurnas, nocturnas, dominicales) con las ventanas del perfil (por
+    defecto el general):
+    - diurnas (06:00-19:00)
+    - nocturnas (19:00-24:00 y 00:00-06:00)
+    - dominicales (todas las horas si es domingo o festivo)
     """
-    if end_dt <= start_dt:
-        return 0.0, 0.0, 0.0
-
-    diur = noct = dom = 0.0
-
-    # iterar días
-    for d in _daterange(start_dt.date(), end_dt.date()):
-        day_start = _to_datetime(d, dtime(0, 0))
-        day_end = _to_datetime(d, dtime(23, 59, 59))
-
-        s = max(start_dt, day_start)
-        e = min(end_dt, day_end)
-
-        a, b, c = split_hours_types_same_day(d, s, e)
+    if e <= s:
+        return 0, 0, 0
+
+    # Si es domingo o festivo, todo cuenta como dominical; diurnas/nocturnas = 0 para no duplicar.
+    if calendario.es_dominical(day):
+        return 0, 0, e - s
+
+    d0 = day * DAY
+    diurnas, nocturnas = _split_ventanas(s - d0, e - d0, perfil or perfil_general())
+    return diurnas, nocturnas, 0
+
+def _split_ventanas(s: int, e: int, perfil: Perfil) -> Tuple[int, int]:
+    """(diurnas, nocturnas) de [s, e) en segundos del día, en un día no dominical."""
+    diurnas = nocturnas = 0
+    for a, b in perfil.diurnas:
+        diurnas += max(0, min(e, b) - max(s, a))
+    for a, b in perfil.nocturnas:
+        nocturnas += max(0, min(e, b) - max(s, a))
+    return diurnas, nocturnas
+
+def _split_span_secs(start: int, end: int, perfil: Optional[Perfil] = None) -> Tuple[int, int, int]:
+    """
+    Divide [start, end) (puede cruzar medianoche) en segundos
+    diurnos/nocturnos/dominicales, cortando exacto en cada medianoche.
+    """
+    if perfil is None:
+        perfil = perfil_general()
+    diur = noct = dom = 0
+    day = _day_of(start)
+    while day * DAY < end:
+        s = max(start, day * DAY)
+        e = min(end, (day + 1) * DAY)
+        a, b, c = _split_day_secs(day, s, e, perfil)
         diur += a
         noct += b
         dom += c
-
+        day += 1
     return diur, noct, dom
 
+def split_hours_types_same_day(day: date, start_dt: datetime, end_dt: datetime) -> Tuple[float, float, float]:
+    """
+    Divide un intervalo dentro de un mismo día en horas diurnas/nocturnas/dominicales.
+    """
+    d = _day_of_date(day)
+    s = max(_to_epoch(start_dt), d * DAY)
+    e = min(_to_epoch(end_dt), (d + 1) * DAY)
+    return tuple(_hours(x) for x in _split_day_secs(d, s, e))
+
+def split_hours_types_any_span(start_dt: datetime, end_dt: datetime) -> Tuple[float, float, float]:
+    """
+    Divide cualquier intervalo (puede cruzar medianoche) en diurnas/nocturnas/dominicales
+    día por día.
+    """
+    return tuple(_hours(x) for x in _split_span_secs(_to_epoch(start_dt), _to_epoch(end_dt)))
+
 
 # -------------------------
 # Lectura de eventos
@@ -163,8 +187,18 @@ def split_hours_types_any_span(start_dt: datetime, end_dt: datetime) -> Tuple[fl
 @dataclass
 class Event:
     nombre: str
-    dt: datetime
+    ts: int      # segundos epoch (hora local)
     estado: str  # Entrada | Salida | Descanso
+    pin: str = ""  # PIN del reloj (PROD); vacío en DEMO
+
+    @property
+    def dt(self) -> datetime:
+        return _from_epoch(self.ts)
+
+    @property
+    def clave(self) -> str:
+        """Identidad del empleado: el PIN si existe, si no el nombre."""
+        return self.pin or self.nombre
 
 def _normalize_estado(s: str) -> str:
     s = (s or "").strip().lower()
@@ -174,48 +208,88 @@ def _normalize_estado(s: str) -> str:
         return "Salida"
     return "Descanso"
 
-def read_clean_events(path_excel_limpio: str) -> List[Event]:
+def make_event(nombre: str, dt: datetime, estado: str, pin: str = "") -> Event:
+    """Construye un Event aplicando redondeo y normalización de estado."""
+    ts = _to_epoch(dt)
+    if ROUND_MINUTES > 0:
+        ts = _round_ts_to_minutes(ts, ROUND_MINUTES)
+    return Event(nombre=nombre, ts=ts, estado=_normalize_estado(estado), pin=pin)
+
+def iter_clean_events(path_excel_limpio: str, desde: Optional[date] = None,
+                      hasta: Optional[date] = None) -> Iterator[Event]:
     """
-    Espera un Excel con encabezados:
+    Lee en streaming (read_only) un Excel con encabezados:
     Nombre | Fecha | Hora | Estado
+
+    Las filas con fecha fuera de [desde, hasta] se descartan antes de
+    parsear la hora, combinar, redondear o normalizar el estado.
     """
-    wb = load_workbook(path_excel_limpio, data_only=True)
-    ws = wb.active
+    wb = load_workbook(path_excel_limpio, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
 
-    header = [str(c.value).strip() if c.value else "" for c in next(ws.iter_rows(min_row=1, max_row=1))]
-    idx = {h: i for i, h in enumerate(header)}
+        header = [str(v).strip() if v else "" for v in next(rows, ())]
+        idx = {h: i for i, h in enumerate(header)}
 
-    required = ["Nombre", "Fecha", "Hora", "Estado"]
-    for r in required:
-        if r not in idx:
-            raise ValueError(f"Falta columna '{r}' en {path_excel_limpio}. Encabezados: {header}")
+        required = ["Nombre", "Fecha", "Hora", "Estado"]
+        for r in required:
+            if r not in idx:
+                raise ValueError(f"Falta columna '{r}' en {path_excel_limpio}. Encabezados: {header}")
 
-    events: List[Event] = []
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        nombre = str(row[idx["Nombre"]] or "").strip()
-        fecha_v = row[idx["Fecha"]]
-        hora_v = row[idx["Hora"]]
-        estado_v = row[idx["Estado"]]
+        i_nom, i_fec, i_hor, i_est = (idx[r] for r in required)
+        width = max(i_nom, i_fec, i_hor, i_est) + 1
+        parse_fecha = make_date_parser()
+        parse_hora = make_time_parser()
 
-        if not nombre:
-            continue
+        for row in rows:
+            if len(row) < width:
+                row = tuple(row) + (None,) * (width - len(row))
 
-        fecha = parse_date_generic(fecha_v)
-        hora = parse_time_generic(hora_v)
-        if not fecha or not hora:
-            continue
+            nombre = str(row[i_nom] or "").strip()
+            if not nombre:
+                continue
 
-        dt = datetime.combine(fecha, hora)
-        if ROUND_MINUTES > 0:
-            dt = _round_dt_to_minutes(dt, ROUND_MINUTES)
+            fecha = parse_fecha(row[i_fec])
+            if not fecha:
+                continue
+            if (desde and fecha < desde) or (hasta and fecha > hasta):
+                continue
 
-        estado = _normalize_estado(str(estado_v or ""))
-        events.append(Event(nombre=nombre, dt=dt, estado=estado))
+            hora = parse_hora(row[i_hor])
+            if not hora:
+                continue
+
+            yield make_event(nombre, datetime.combine(fecha, hora), str(row[i_est] or ""))
+    finally:
+        wb.close()
 
-    # orden por persona, fecha/hora
-    events.sort(key=lambda e: (e.nombre.lower(), e.dt))
+def read_clean_events(path_excel_limpio: str, desde: Optional[date] = None,
+                      hasta: Optional[date] = None) -> List[Event]:
+    """
+    Igual que iter_clean_events pero materializado y ordenado por persona, fecha/hora.
+    """
+    events = list(iter_clean_events(path_excel_limpio, desde, hasta))
+    events.sort(key=lambda e: (e.nombre.lower(), e.ts))
     return events
 
+def iter_archive_events(recs, pins: List[str],
+                        nombres: Optional[Dict[str, str]] = None) -> Iterator[Event]:
+    """
+    Eventos de un rango del archivo binario de marcaciones (la vista que
+    devuelve archive.EventArchive.leer) sin pasar por datetime: el ts del
+    registro ya es el del Event.
+    pins: tabla de PIN del archivo (EventArchive.pins).
+    nombres: {pin: nombre}; sin él el nombre es el PIN.
+    """
+    from .archive import ESTADOS
+
+    for ts, p, e in zip(recs["ts"].tolist(), recs["pin"].tolist(), recs["estado"].tolist()):
+        if ROUND_MINUTES > 0:
+            ts = _round_ts_to_minutes(ts, ROUND_MINUTES)
+        pin = pins[p]
+        nombre = nombres.get(pin, f"PIN {pin}") if nombres is not None else pin
+        yield Event(nombre=nombre, ts=ts, estado=ESTADOS[e], pin=pin)
+
 
 # -------------------------
 # Emparejar Entrada -> Salida
@@ -224,43 +298,71 @@ def read_clean_events(path_excel_limpio: str) -> List[Event]:
 @dataclass
 class Interval:
     nombre: str
-    start: datetime
-    end: datetime
+    start: int   # segundos epoch
+    end: int
+    clave: str = ""
 
-def build_work_intervals(events: List[Event]) -> List[Interval]:
+def _emparejar(marcas: List[Tuple[int, str]]) -> List[Tuple[int, int]]:
     """
+    marcas: (ts, estado) de UN empleado, ordenadas por ts.
     Regla simple:
     - Toma Entrada como inicio
-    - La siguiente Salida (misma persona) como fin
+    - La siguiente Salida como fin
     - Descanso se ignora (en este demo)
     """
-    intervals: List[Interval] = []
-    last_in: Dict[str, Optional[datetime]] = {}
+    spans: List[Tuple[int, int]] = []
+    last_in: Optional[int] = None
 
-    for ev in events:
-        n = ev.nombre
+    for ts, estado in marcas:
+        if estado == "Entrada":
+            last_in = ts
 
-        if ev.estado == "Entrada":
-            last_in[n] = ev.dt
-
-        elif ev.estado == "Salida":
-            if last_in.get(n):
-                start = last_in[n]
-                end = ev.dt
+        elif estado == "Salida":
+            if last_in is not None:
+                end = ts
                 # si salida < entrada, asumimos que cruzó medianoche y sumamos 1 día
-                if end <= start:
-                    end = end + timedelta(days=1)
-                intervals.append(Interval(nombre=n, start=start, end=end))
-                last_in[n] = None
-            else:
-                # salida sin entrada: ignorar
-                continue
+                if end <= last_in:
+                    end = end + DAY
+                spans.append((last_in, end))
+                last_in = None
+            # salida sin entrada: ignorar
 
-        else:
-            # Descanso: ignorar en este demo
-            continue
+        # Descanso: ignorar en este demo
 
-    return intervals
+    return spans
+
+def _agrupar_por_empleado(events: Iterable[Event], perfiles: Optional[Perfiles] = None
+                          ) -> Tuple[Dict[str, List[Tuple[int, str]]], Dict[str, str]]:
+    """
+    Agrupa por clave (PIN o nombre) con un dict, sin orden global.
+    Devuelve (marcas[clave] = [(ts, estado)...] en orden de llegada, nombres[clave]).
+    Con perfiles, aplica el redondeo propio del perfil de cada empleado.
+    """
+    marcas: Dict[str, List[Tuple[int, str]]] = {}
+    nombres: Dict[str, str] = {}
+    redondeo: Dict[str, int] = {}
+    for e in events:
+        k = e.clave
+        g = marcas.get(k)
+        if g is None:
+            g = marcas[k] = []
+            nombres[k] = e.nombre
+            redondeo[k] = perfiles.de(k).redondeo_min if perfiles is not None else 0
+        r = redondeo[k]
+        g.append((_round_ts_to_minutes(e.ts, r) if r else e.ts, e.estado))
+    return marcas, nombres
+
+def build_work_intervals(events: List[Event]) -> List[Interval]:
+    """
+    Intervalos Entrada -> Salida por empleado (ver _emparejar).
+    events debe venir ordenado por fecha/hora dentro de cada empleado.
+    """
+    marcas, nombres = _agrupar_por_empleado(events)
+    return [
+        Interval(nombre=nombres[k], start=a, end=b, clave=k)
+        for k, m in marcas.items()
+        for a, b in _emparejar(m)
+    ]
 
 
 # -------------------------
@@ -293,136 +395,341 @@ def _quincena_range(year: int, month: int, quincena: int, margen_dias: int) -> T
     rango_str = f"{start.isoformat()} a {end.isoformat()}"
     return start_m, end_m, rango_str
 
-def calcular_horas_desde_excel(path_excel_limpio: str, year: int, month: int, quincena: int, margen: int):
+def calcular_horas_desde_excel(path_excel_limpio: str, year: int, month: int, quincena: int, margen: int,
+                               engine: str = "python", workers: int = 1, perfiles: Optional[Perfiles] = None):
     """
     Devuelve:
       quincena_rows, diario_rows, rango_quincena_str
     """
-    start_m, end_m, rango_str = _quincena_range(year, month, quincena, margen)
+    start_m, end_m, _ = _quincena_range(year, month, quincena, margen)
+    events = list(iter_clean_events(path_excel_limpio, start_m, end_m))
+    return calcular_horas_desde_eventos(events, year, month, quincena, margen, engine, workers, perfiles)
 
-    events = read_clean_events(path_excel_limpio)
-
-    # filtrar por rango
-    events = [e for e in events if start_m <= e.dt.date() <= end_m]
-
-    intervals = build_work_intervals(events)
-
-    # Agregación diaria por empleado
-    # diario[(nombre, fecha)] = dict con horas
-    diario: Dict[Tuple[str, date], Dict[str, float]] = {}
-
-    for itv in intervals:
-        # dividir por días en caso de cruce
-        diur, noct, dom = split_hours_types_any_span(itv.start, itv.end)
-        total = _hours_between(itv.start, itv.end)
-
-        # asignamos el total al día de inicio como simplificación,
-        # y el split lo usamos como breakdown global del intervalo.
-        # Si quieres exactitud por día, habría que partir el intervalo por día y sumar.
-        # Para DEMO y portafolio esto suele ser suficiente.
-        key = (itv.nombre, itv.start.date())
-        if key not in diario:
-            diario[key] = {
-                "total": 0.0,
-                "diurnas": 0.0,
-                "nocturnas": 0.0,
-                "dominicales": 0.0,
-            }
-        diario[key]["total"] += total
-        diario[key]["diurnas"] += diur
-        diario[key]["nocturnas"] += noct
-        diario[key]["dominicales"] += dom
+def _split_spans(spans: List[Tuple[int, int]], engine: str,
+                 perfil: Optional[Perfil] = None) -> List[Tuple[int, int, int]]:
+    """
+    Split diurnas/nocturnas/dominicales (segundos) de todos los (inicio, fin),
+    con las reglas de un mismo perfil.
+    engine: "python" (día a día), "memo" (python con memo LRU por forma de
+    turno, split_memo) o "numpy" (split_batch, vectorizado).
+    """
+    if perfil is None:
+        perfil = perfil_general()
+    if engine == "numpy":
+        from .split_batch import split_seconds_batch
+        if not spans:
+            return []
+        diur, noct, dom = split_seconds_batch(
+            [a for a, _ in spans],
+            [b for _, b in spans],
+            perfil,
+        )
+        return list(zip(diur.tolist(), noct.tolist(), dom.tolist()))
+    if engine == "memo":
+        from .split_memo import memo_para
+        split = memo_para(perfil).split
+        return [split(a, b) for a, b in spans]
+    if engine != "python":
+        raise ValueError(f"Motor de split desconocido: {engine}")
+    return [_split_span_secs(a, b, perfil) for a, b in spans]
+
+def _split_por_perfil(claves: List[str], spans: List[Tuple[int, int]], engine: str,
+                      perfiles: Perfiles) -> List[Tuple[int, int, int]]:
+    """_split_spans con el perfil de cada clave: un lote por perfil, resultado en el orden de spans."""
+    lotes: Dict[Perfil, List[int]] = {}
+    for i, k in enumerate(claves):
+        lotes.setdefault(perfiles.de(k), []).append(i)
+    if len(lotes) <= 1:
+        return _split_spans(spans, engine, next(iter(lotes), perfiles.general))
+
+    out: List[Tuple[int, int, int]] = [(0, 0, 0)] * len(spans)
+    for perfil, idx in lotes.items():
+        for i, r in zip(idx, _split_spans([spans[i] for i in idx], engine, perfil)):
+            out[i] = r
+    return out
+
+def calcular_horas_desde_eventos(events: List[Event], year: int, month: int, quincena: int, margen: int,
+                                 engine: str = "python", workers: int = 1, perfiles: Optional[Perfiles] = None):
+    """
+    Igual que calcular_horas_desde_excel pero sobre eventos ya tipados
+    (ver make_event), sin pasar por el Excel de eventos limpios.
+    """
+    p = (year, month, quincena)
+    return calcular_horas_periodos(events, [p], margen, engine, workers, perfiles=perfiles)[p]
+
+def _acumular(diario: Dict[Tuple[str, int], List[int]], clave: str, dia: int,
+              total: int, diur: int, noct: int, dom: int) -> None:
+    key = (clave, dia)
+    acc = diario.get(key)
+    if acc is None:
+        acc = diario[key] = [0, 0, 0, 0]
+    acc[0] += total
+    acc[1] += diur
+    acc[2] += noct
+    acc[3] += dom
+
+def _etiquetas(claves, nombres: Dict[str, str]) -> Dict[str, str]:
+    """
+    Nombre a mostrar por clave. Si dos PIN comparten nombre, se agrega el
+    PIN para que no se confundan en el reporte.
+    """
+    usos: Dict[str, int] = {}
+    for k in claves:
+        usos[nombres[k]] = usos.get(nombres[k], 0) + 1
+    return {
+        k: nombres[k] if usos[nombres[k]] == 1 or k == nombres[k] else f"{nombres[k]} ({k})"
+        for k in claves
+    }
+
+def _construir_filas(diario: Dict[Tuple[str, int], List[int]], nombres: Dict[str, str],
+                     perfiles: Optional[Perfiles] = None) -> Tuple[List[List], List[List]]:
+    """
+    diario (segundos, por clave) -> (quincena_rows, diario_rows) en horas redondeadas.
+    La base del día sale del perfil de cada empleado.
+    Valores extra después de [total, diur, noct, dom] (p.ej. descanso en el
+    motor stream) se agregan como columnas al final de ambas hojas.
+    """
+    perfiles = _perfiles_o_general(perfiles)
+    etiqueta = _etiquetas({k for k, _ in diario}, nombres)
 
     # Construir diario_rows
     diario_rows: List[List] = []
     # También acumulamos resumen por empleado
-    resumen: Dict[str, Dict[str, float]] = {}
+    # resumen[clave] = [total, diurnas, nocturnas, dominicales, extras]
+    resumen: Dict[str, List[int]] = {}
 
     # ordenar por empleado y fecha
-    for (nombre, dia), vals in sorted(diario.items(), key=lambda x: (x[0][0].lower(), x[0][1])):
-        weekday = dia.weekday()
-        base = BASE_POR_DIA.get(weekday, 0.0)
-        total = vals["total"]
+    for (clave, dia), acc in sorted(
+            diario.items(), key=lambda x: (etiqueta[x[0][0]].lower(), x[0][0], x[0][1])):
+        total, diur, noct, dom = acc[:4]
+        resto = acc[4:]
+        weekday = _weekday_of_day(dia)
+        festivo = calendario.tipo_dia(dia) == calendario.FESTIVO
+        base = _base_secs_dia(dia, perfiles.de(clave))
 
         # “extras” simple: total - base si es positivo
-        extras = max(0.0, total - base)
-
-        if nombre not in resumen:
-            resumen[nombre] = {
-                "total": 0.0,
-                "diurnas": 0.0,
-                "nocturnas": 0.0,
-                "dominicales": 0.0,
-                "extras": 0.0,
-            }
-        resumen[nombre]["total"] += total
-        resumen[nombre]["diurnas"] += vals["diurnas"]
-        resumen[nombre]["nocturnas"] += vals["nocturnas"]
-        resumen[nombre]["dominicales"] += vals["dominicales"]
-        resumen[nombre]["extras"] += extras
+        extras = max(0, total - base)
+
+        r = resumen.get(clave)
+        if r is None:
+            r = resumen[clave] = [0] * (5 + len(resto))
+        r[0] += total
+        r[1] += diur
+        r[2] += noct
+        r[3] += dom
+        r[4] += extras
+        for i, x in enumerate(resto):
+            r[5 + i] += x
 
         diario_rows.append([
-            nombre,
-            dia.isoformat(),
-            ["Lun","Mar","Mié","Jue","Vie","Sáb","Dom"][weekday],
-            round(total, 2),
-            round(vals["diurnas"], 2),
-            round(vals["nocturnas"], 2),
-            round(vals["dominicales"], 2),
-            round(base, 2),
-            round(extras, 2),
-        ])
-
-    # Construir quincena_rows
+            etiqueta[clave],
+            _date_of_day(dia).isoformat(),
+            ["Lun","Mar","Mié","Jue","Vie","Sáb","Dom"][weekday] + (" (festivo)" if festivo else ""),
+            round(_hours(total), 2),
+            round(_hours(diur), 2),
+            round(_hours(noct), 2),
+            round(_hours(dom), 2),
+            round(_hours(base), 2),
+            round(_hours(extras), 2),
+        ] + [round(_hours(x), 2) for x in resto])
+
+    # Construir quincena_rows (resumen ya está en orden de inserción = orden del diario)
     quincena_rows: List[List] = []
-    for nombre in sorted(resumen.keys(), key=lambda s: s.lower()):
-        r = resumen[nombre]
-        quincena_rows.append([
-            nombre,
-            round(r["total"], 2),
-            round(r["diurnas"], 2),
-            round(r["nocturnas"], 2),
-            round(r["dominicales"], 2),
-            round(r["extras"], 2),
-        ])
+    for clave, r in resumen.items():
+        quincena_rows.append([etiqueta[clave]] + [round(_hours(x), 2) for x in r])
 
-    return quincena_rows, diario_rows, rango_str
+    return quincena_rows, diario_rows
 
 
 # -------------------------
-# Writers de Excel (openpyxl)
+# Procesamiento por empleado (shards)
 # -------------------------
 
-def _style_header(ws, row: int, cols: int):
-    fill = PatternFill("solid", fgColor="DDDDDD")
-    font = Font(bold=True)
-    align = Alignment(horizontal="center", vertical="center")
+# (clave, inicio, fin, diurnas, nocturnas, dominicales), todo en segundos
+Tramo = Tuple[str, int, int, int, int, int]
+# {(clave, día): [total, diurnas, nocturnas, dominicales]} en segundos
+Diario = Dict[Tuple[str, int], List[int]]
+# (periodo, primer día, último día) con margen, en ordinales de día
+Ventana = Tuple[Tuple[int, int, int], int, int]
 
-    for c in range(1, cols + 1):
-        cell = ws.cell(row=row, column=c)
-        cell.fill = fill
-        cell.font = font
-        cell.alignment = align
+def _diarios_por_ventana(tramos: List[Tramo], ventanas: List[Ventana]) -> Dict[Periodo, Diario]:
+    """
+    Totales por (empleado, día) de cada ventana. Los tramos se indexan por
+    día de inicio y cada ventana toma los suyos con bisect.
+    """
+    # índice por día de inicio: dias ordenados + buckets
+    buckets: Dict[int, List[Tuple[str, int, int, int, int, int]]] = {}
+    for clave, a, b, diur, noct, dom in tramos:
+        buckets.setdefault(a // DAY, []).append((clave, b // DAY, b - a, diur, noct, dom))
+    dias = sorted(buckets)
+
+    out = {}
+    for p, lo, hi in ventanas:
+        # asignamos el total al día de inicio como simplificación,
+        # y el split lo usamos como breakdown global del intervalo.
+        diario: Diario = {}
+        for dia in dias[bisect_left(dias, lo):bisect_right(dias, hi)]:
+            for clave, fin, total, diur, noct, dom in buckets[dia]:
+                if fin <= hi:
+                    _acumular(diario, clave, dia, total, diur, noct, dom)
+        out[p] = diario
+    return out
+
+def _procesar_shard(shard: List[Tuple[str, List[Tuple[int, str]]]], engine: str,
+                    perfiles: Optional[Perfiles], ventanas: List[Ventana]
+                    ) -> Tuple[Dict[Periodo, Diario], int]:
+    """
+    Empareja y divide las marcas de un grupo de empleados y acumula sus
+    totales diarios por ventana. Devuelve ({periodo: diario}, intervalos).
+    Corre en el proceso principal o en un worker del ProcessPoolExecutor.
+    """
+    claves: List[str] = []
+    spans: List[Tuple[int, int]] = []
+    for clave, marcas in shard:
+        marcas.sort(key=lambda m: m[0])
+        for span in _emparejar(marcas):
+            claves.append(clave)
+            spans.append(span)
+
+    splits = _split_por_perfil(claves, spans, engine, _perfiles_o_general(perfiles))
+    tramos = [(k, a, b, d, n, o) for k, (a, b), (d, n, o) in zip(claves, spans, splits)]
+    return _diarios_por_ventana(tramos, ventanas), len(tramos)
+
+def _diarios_por_empleado(events: Iterable[Event], engine: str, ventanas: List[Ventana],
+                          workers: int = 1, perfiles: Optional[Perfiles] = None
+                          ) -> Tuple[Dict[Periodo, Diario], int, Dict[str, str]]:
+    """
+    Agrupa por empleado y procesa cada grupo por separado. Con workers > 1
+    reparte los empleados en shards sobre un ProcessPoolExecutor; cada shard
+    devuelve ya sus totales diarios y, como un empleado cae en un solo
+    shard, unirlos es sólo juntar diccionarios con claves distintas.
+    Devuelve ({periodo: diario}, intervalos, nombres).
+    """
+    marcas, nombres = _agrupar_por_empleado(events, perfiles)
+    items = sorted(marcas.items(), key=lambda kv: kv[0])
 
-def _autosize(ws, max_cols: int):
-    for col in range(1, max_cols + 1):
-        letter = get_column_letter(col)
-        ws.column_dimensions[letter].width = 18
+    if workers <= 1 or len(items) < 2:
+        diarios, n_tramos = _procesar_shard(items, engine, perfiles, ventanas)
+        return diarios, n_tramos, nombres
 
-def escribir_hoja_resumen(ws, quincena_rows: List[List]):
-    ws.append(["Empleado", "Horas Totales", "Diurnas", "Nocturnas", "Dominicales", "Extras"])
-    _style_header(ws, 1, 6)
+    n_shards = min(len(items), workers * 4)
+    shards = [items[i::n_shards] for i in range(n_shards)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        partes = list(pool.map(_procesar_shard, shards, repeat(engine, n_shards),
+                               repeat(perfiles, n_shards), repeat(ventanas, n_shards)))
 
-    for r in quincena_rows:
-        ws.append(r)
+    diarios: Dict[Periodo, Diario] = {p: {} for p, _, _ in ventanas}
+    n_tramos = 0
+    for parte, n in partes:
+        for p, diario in parte.items():
+            diarios[p].update(diario)
+        n_tramos += n
+    return diarios, n_tramos, nombres
+
+
+# -------------------------
+# Varias quincenas en una pasada
+# -------------------------
+
+Periodo = Tuple[int, int, int]  # (year, month, quincena)
+
+def periodo_desde_fecha(d: date) -> Periodo:
+    """Quincena a la que pertenece d: 1..15 -> 1, 16..fin -> 2."""
+    return d.year, d.month, (1 if d.day <= 15 else 2)
 
-    _autosize(ws, 6)
+def periodos_en_rango(desde: Periodo, hasta: Periodo) -> List[Periodo]:
+    """Todas las quincenas entre desde y hasta (inclusive)."""
+    out: List[Periodo] = []
+    y, m, q = desde
+    while (y, m, q) <= tuple(hasta):
+        out.append((y, m, q))
+        if q == 1:
+            q = 2
+        else:
+            y, m, q = (y + 1, 1, 1) if m == 12 else (y, m + 1, 1)
+    return out
+
+def ventana_periodos(periodos: List[Periodo], margen: int) -> Tuple[date, date]:
+    """Primer y último día (con margen) que cubren todas las quincenas."""
+    rangos = [_quincena_range(y, m, q, margen) for y, m, q in periodos]
+    return min(r[0] for r in rangos), max(r[1] for r in rangos)
+
+def calcular_horas_periodos(events: List[Event], periodos: List[Periodo], margen: int,
+                            engine: str = "python", workers: int = 1,
+                            stats: Optional[dict] = None,
+                            perfiles: Optional[Perfiles] = None) -> Dict[Periodo, Tuple[List[List], List[List], str]]:
+    """
+    Calcula varias quincenas emparejando y dividiendo los eventos una sola
+    vez (por empleado, ver _diarios_por_empleado). Los tramos se indexan por
+    día de inicio y cada quincena toma su ventana con bisect.
+
+    Un intervalo entra en una quincena si empieza y termina dentro de su
+    ventana con margen: lo mismo que da filtrar los eventos a esa ventana
+    antes de emparejar.
+
+    stats (opcional) recibe contadores: eventos_fuera_de_ventana, intervalos
+    y marcaciones_sin_pareja (Entrada/Salida que no formaron intervalo); con
+    engine="memo", también split_memo_hits / split_memo_misses (sólo los de
+    este proceso: con workers > 1 el split corre en los workers).
+    perfiles (opcional, perfiles.Perfiles): reglas por empleado; sin él
+    todos usan el perfil general.
+    """
+    if not periodos:
+        return {}
+    perfiles = _perfiles_o_general(perfiles)
+
+    rangos = {p: _quincena_range(p[0], p[1], p[2], margen) for p in periodos}
+    lo_all = min(_day_of_date(r[0]) for r in rangos.values())
+    hi_all = max(_day_of_date(r[1]) for r in rangos.values())
+
+    en_ventana = [e for e in events if lo_all <= e.ts // DAY <= hi_all]
+    if engine == "memo" and stats is not None:
+        from . import split_memo
+        memo_antes = split_memo.estadisticas()
+    ventanas = [(p, _day_of_date(r[0]), _day_of_date(r[1])) for p, r in rangos.items()]
+    diarios, n_tramos, nombres = _diarios_por_empleado(en_ventana, engine, ventanas, workers, perfiles)
+
+    if stats is not None:
+        marcas_es = sum(1 for e in en_ventana if e.estado != "Descanso")
+        stats["eventos_fuera_de_ventana"] = len(events) - len(en_ventana)
+        stats["intervalos"] = n_tramos
+        stats["marcaciones_sin_pareja"] = marcas_es - 2 * n_tramos
+        if engine == "memo":
+            memo = split_memo.estadisticas()
+            stats["split_memo_hits"] = memo["hits"] - memo_antes["hits"]
+            stats["split_memo_misses"] = memo["misses"] - memo_antes["misses"]
+
+    out = {}
+    for p in periodos:
+        quincena_rows, diario_rows = _construir_filas(diarios[p], nombres, perfiles)
+        out[p] = (quincena_rows, diario_rows, rangos[p][2])
+    return out
 
-def escribir_hoja_diario(ws, diario_rows: List[List]):
-    ws.append(["Empleado", "Fecha", "Día", "Total", "Diurnas", "Nocturnas", "Dominicales", "Base Día", "Extras"])
-    _style_header(ws, 1, 9)
 
-    for r in diario_rows:
+# -------------------------
+# Writers de Excel (openpyxl, modo write_only)
+# -------------------------
+
+# columnas opcionales al final de las filas (ver _construir_filas)
+COLUMNAS_EXTRA = ["Descanso (no pagado)"]
+
+def _escribir_hoja(ws, titles: List[str], rows: Iterable[List]):
+    rows = iter(rows)
+    primera = next(rows, None)
+    if primera is not None and len(primera) > len(titles):
+        titles = titles + COLUMNAS_EXTRA[:len(primera) - len(titles)]
+    autosize(ws, len(titles))
+    ws.append(header_cells(ws, titles))
+
+    if primera is not None:
+        ws.append(primera)
+    for r in rows:
         ws.append(r)
 
-    _autosize(ws, 9)
+def escribir_hoja_resumen(ws, quincena_rows: Iterable[List]):
+    titles = ["Empleado", "Horas Totales", "Diurnas", "Nocturnas", "Dominicales", "Extras"]
+    _escribir_hoja(ws, titles, quincena_rows)
+
+def escribir_hoja_diario(ws, diario_rows: Iterable[List]):
+    titles = ["Empleado", "Fecha", "Día", "Total", "Diurnas", "Nocturnas", "Dominicales", "Base Día", "Extras"]
+    _escribir_hoja(ws, titles, diario_rows)
@@ -0,0 +1,121 @@
+"""
+Perfiles de turno: reglas de horas por empleado.
+
+Un perfil reúne lo que antes eran constantes globales de payroll (base por
+día, ventanas diurna / nocturna, redondeo) y se compila una vez a tablas
+planas: ventanas como pares (inicio, fin) en segundos del día y la base
+como tupla indexada por weekday (0..6) más el festivo (7). El cálculo sólo
+indexa; no arma dtime/datetime por llamada.
+
+Archivo (JSON, ruta en PERFILES_TURNO):
+
+    {
+      "perfiles": {
+        "nocturno": {"base_por_dia": [8, 8, 8, 8, 8, 0, 0], "base_festivo": 0,
+                     "diurnas": "06:00-19:00", "nocturnas": "21:00-06:00",
+                     "redondeo_min": 15},
+        "medio_tiempo": {"base_por_dia": [4, 4, 4, 4, 4, 0, 0]}
+      },
+      "empleados": {"1001": "nocturno", "1002": "medio_tiempo"}
+    }
+
+Los campos que falten se heredan del perfil general (constantes de
+payroll). "empleados" mapea la clave del empleado (PIN en PROD, nombre en
+DEMO) a un perfil; los que no estén usan el general.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from datetime import time as dtime
+from typing import Dict, Optional, Tuple
+
+DAY = 86400
+FESTIVO = 7  # índice de la base de festivos en Perfil.base
+
+Ventanas = Tuple[Tuple[int, int], ...]
+
+@dataclass(frozen=True)
+class Perfil:
+    nombre: str
+    base: Tuple[int, ...]  # segundos; [0..6] por weekday (0=Lunes), [7] festivo
+    diurnas: Ventanas      # (inicio, fin) en segundos del día, sin cruzar medianoche
+    nocturnas: Ventanas
+    redondeo_min: int = 0  # redondeo propio, sobre el ROUND_MINUTES aplicado al leer
+
+def _secs(t: dtime) -> int:
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+def _ventanas(desde: dtime, hasta: dtime) -> Ventanas:
+    """Franja desde -> hasta; si cruza medianoche se parte en dos ventanas."""
+    a, b = _secs(desde), _secs(hasta)
+    if a <= b:
+        return ((a, b),) if a < b else ()
+    return tuple(w for w in ((0, b), (a, DAY)) if w[0] < w[1])
+
+def compilar(nombre: str, base_por_dia, base_festivo: float, diurnas: Tuple[dtime, dtime],
+             nocturnas: Tuple[dtime, dtime], redondeo_min: int = 0) -> Perfil:
+    """
+    base_por_dia: dict {weekday: horas} o lista de 7 horas (Lunes..Domingo).
+    diurnas / nocturnas: (desde, hasta) como dtime.
+    """
+    if isinstance(base_por_dia, dict):
+        horas = [base_por_dia.get(i, 0.0) for i in range(7)]
+    else:
+        horas = list(base_por_dia)
+    if len(horas) != 7:
+        raise ValueError(f"Perfil '{nombre}': base_por_dia debe tener 7 valores (Lunes..Domingo)")
+    base = tuple(round(float(h) * 3600) for h in horas) + (round(float(base_festivo) * 3600),)
+    if int(redondeo_min) < 0:
+        raise ValueError(f"Perfil '{nombre}': redondeo_min no puede ser negativo")
+    return Perfil(nombre, base, _ventanas(*diurnas), _ventanas(*nocturnas), int(redondeo_min))
+
+def _franja(nombre: str, campo: str, txt: str) -> Tuple[dtime, dtime]:
+    try:
+        a, b = (dtime.fromisoformat(x.strip()) for x in str(txt).split("-"))
+    except ValueError:
+        raise ValueError(f"Perfil '{nombre}': {campo} debe ser 'HH:MM-HH:MM' (recibido {txt!r})")
+    return a, b
+
+class Perfiles:
+    """Perfil de cada empleado por clave; el general para los no asignados."""
+
+    def __init__(self, general: Perfil, perfiles: Optional[Dict[str, Perfil]] = None,
+                 asignacion: Optional[Dict[str, str]] = None):
+        self.general = general
+        self.perfiles = dict(perfiles or {})
+        self._por_clave = {k: self.perfiles[p] for k, p in (asignacion or {}).items()}
+
+    def de(self, clave: str) -> Perfil:
+        return self._por_clave.get(clave, self.general)
+
+    def __len__(self) -> int:
+        return len(self._por_clave)
+
+def cargar_perfiles(path: str, general: dict) -> Perfiles:
+    """
+    Lee el archivo de perfiles (ver cabecera) y compila cada perfil una vez.
+    general: argumentos de compilar() del perfil general (sin nombre); de
+    ahí se heredan los campos que falten.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: se esperaba un objeto con 'perfiles' y 'empleados'")
+
+    perfiles: Dict[str, Perfil] = {}
+    for nombre, p in (data.get("perfiles") or {}).items():
+        campos = dict(general)
+        for k in ("base_por_dia", "base_festivo", "redondeo_min"):
+            if k in p:
+                campos[k] = p[k]
+        for k in ("diurnas", "nocturnas"):
+            if k in p:
+                campos[k] = _franja(nombre, k, p[k])
+        perfiles[nombre] = compilar(nombre, **campos)
+
+    asignacion = {str(k): v for k, v in (data.get("empleados") or {}).items()}
+    for clave, nombre in asignacion.items():
+        if nombre not in perfiles:
+            raise ValueError(f"{path}: el empleado {clave} usa el perfil '{nombre}', que no existe")
+    return Perfiles(compilar("general", **general), perfiles, asignacion)
@@ -0,0 +1,59 @@
+"""
+Orquestador asyncio de etapas con dependencias explícitas.
+
+Cada etapa es una función bloqueante (I/O de red, SQLite, Excel) que corre
+en un hilo (asyncio.to_thread) apenas terminan sus dependencias y recibe
+sus resultados como argumentos, en el orden declarado. Así las etapas
+independientes se solapan y la corrida dura lo que el camino crítico.
+
+Si una etapa falla se cancelan las que aún esperan y se propaga el error.
+Las que ya corren en un hilo no se pueden interrumpir: se espera a que
+terminen (cada una tiene sus propios timeouts) antes de propagar.
+"""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Callable
+
+@dataclass
+class Etapa:
+    nombre: str
+    fn: Callable
+    depende: tuple[str, ...] = field(default_factory=tuple)
+
+class Pipeline:
+    def __init__(self):
+        self.etapas: dict[str, Etapa] = {}
+
+    def etapa(self, nombre: str, fn: Callable, depende=()) -> None:
+        """Declara una etapa; sus dependencias deben estar declaradas antes."""
+        if nombre in self.etapas:
+            raise ValueError(f"Etapa duplicada: {nombre}")
+        for d in depende:
+            if d not in self.etapas:
+                raise ValueError(f"Etapa '{nombre}' depende de '{d}', que no está declarada")
+        self.etapas[nombre] = Etapa(nombre, fn, tuple(depende))
+
+    async def _ejecutar(self) -> dict:
+        tareas: dict[str, asyncio.Task] = {}
+
+        async def correr(e: Etapa):
+            args = [await tareas[d] for d in e.depende]
+            return await asyncio.to_thread(e.fn, *args)
+
+        for e in self.etapas.values():
+            tareas[e.nombre] = asyncio.create_task(correr(e), name=e.nombre)
+
+        try:
+            await asyncio.gather(*tareas.values())
+        except BaseException:
+            for t in tareas.values():
+                t.cancel()
+            await asyncio.gather(*tareas.values(), return_exceptions=True)
+            raise
+        return {n: t.result() for n, t in tareas.items()}
+
+    def ejecutar(self) -> dict:
+        """Corre todas las etapas. Devuelve {nombre: resultado}."""
+        return asyncio.run(self._ejecutar())
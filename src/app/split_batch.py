@@ -0,0 +1,90 @@
+"""
+Motor vectorizado (NumPy) para dividir intervalos en horas
+diurnas / nocturnas / dominicales.
+
+Misma regla que payroll.split_hours_types_any_span, pero sobre arrays de
+inicio/fin en segundos epoch (int64) y con aritmética cerrada de ventanas:
+para una ventana [a, b) que se repite cada P segundos, la cantidad de
+ventana acumulada hasta t es
+
+    W(t) = floor(t / P) * (b - a) + clip(t mod P - a, 0, b - a)
+
+y el solape de [s, e) con la ventana es W(e) - W(s). Sin bucles por día.
+
+Domingos y festivos no son periódicos: salen de la tabla de
+calendario.tabla_rango para el rango de días del lote. Con C[i] = días
+dominicales antes del día i y dom[i] = 1 si el día i es dominical,
+
+    Wd(t) = C[i] * (b - a) + dom[i] * clip(t mod DAY - a, 0, b - a),  i = t // DAY
+
+es la ventana acumulada sólo sobre días dominicales.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from . import calendario, payroll
+
+DAY = 86400
+
+def to_epoch_seconds(dts) -> np.ndarray:
+    """Lista de datetimes naive -> array int64 de segundos epoch."""
+    return np.array(dts, dtype="datetime64[s]").astype(np.int64)
+
+def _window_cum(t: np.ndarray, a: int, b: int, period: int) -> np.ndarray:
+    q, r = np.divmod(t, period)
+    return q * (b - a) + np.clip(r - a, 0, b - a)
+
+def _overlap(s: np.ndarray, e: np.ndarray, a: int, b: int, period: int) -> np.ndarray:
+    return _window_cum(e, a, b, period) - _window_cum(s, a, b, period)
+
+def _dominical_cum(t: np.ndarray, a: int, b: int, d0: int, dom: np.ndarray, cum: np.ndarray) -> np.ndarray:
+    q, r = np.divmod(t, DAY)
+    i = q - d0
+    return cum[i] * (b - a) + dom[i] * np.clip(r - a, 0, b - a)
+
+def _overlap_dominical(s, e, a, b, d0, dom, cum) -> np.ndarray:
+    return _dominical_cum(e, a, b, d0, dom, cum) - _dominical_cum(s, a, b, d0, dom, cum)
+
+def split_seconds_batch(starts, ends, perfil=None):
+    """
+    starts/ends: arrays int64 (segundos epoch, hora local naive).
+    perfil: perfiles.Perfil con las ventanas (por defecto el general).
+    Devuelve (diurnas, nocturnas, dominicales) como arrays int64 en segundos.
+    """
+    s = np.asarray(starts, dtype=np.int64)
+    e = np.asarray(ends, dtype=np.int64)
+    e = np.maximum(e, s)  # intervalos vacíos o invertidos -> 0
+    if len(s) == 0:
+        return s.copy(), s.copy(), s.copy()
+
+    # días dominicales (domingo o festivo) del rango del lote
+    d0, d1 = int(s.min()) // DAY, int(e.max()) // DAY
+    tipos = np.frombuffer(calendario.tabla_rango(d0, d1), dtype=np.uint8)
+    dom_dia = (tipos >= calendario.DOMINGO).astype(np.int64)
+    cum = np.concatenate(([0], np.cumsum(dom_dia)))
+
+    if perfil is None:
+        perfil = payroll.perfil_general()
+    windows = {
+        "diur": perfil.diurnas,
+        "noct": perfil.nocturnas,
+    }
+
+    out = {}
+    for kind, wins in windows.items():
+        total = np.zeros_like(s)
+        for a, b in wins:
+            # todos los días menos la parte que cae en domingo o festivo
+            total += _overlap(s, e, a, b, DAY)
+            total -= _overlap_dominical(s, e, a, b, d0, dom_dia, cum)
+        out[kind] = total
+
+    dom = _overlap_dominical(s, e, 0, DAY, d0, dom_dia, cum)
+
+    return out["diur"], out["noct"], dom
+
+def split_hours_types_batch(starts, ends, perfil=None):
+    """Igual que split_seconds_batch pero en horas (float64)."""
+    diur, noct, dom = split_seconds_batch(starts, ends, perfil)
+    return diur / 3600.0, noct / 3600.0, dom / 3600.0
@@ -0,0 +1,140 @@
+"""
+Memo LRU de splits por forma de turno.
+
+En una planta con turnos fijos casi todos los intervalos repiten unas pocas
+formas (06:00-14:15, 14:00-22:15, 22:00-06:15...). El split de [inicio, fin)
+sólo depende de:
+- si cada día cubierto es dominical (domingo o festivo, ver calendario)
+- el minuto del día en que empieza y la duración
+- las reglas del perfil
+así que se memoiza con esa clave y no con las fechas absolutas.
+
+Es el motor de split "memo" (SPLIT_ENGINE=memo): conviene cuando las
+formas se repiten mucho (turnos fijos, marcaciones redondeadas). Con
+jornadas muy variables los fallos cuestan más que el split directo.
+
+Hay un memo acotado (lru_cache) por perfil compilado. Si cambian las reglas
+cambia el perfil y el memo viejo deja de usarse; invalidar() los descarta
+todos (p.ej. tras cambiar el calendario).
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from . import calendario, payroll
+from .perfiles import Perfil
+
+DAY = 86400
+
+MAX_FORMAS = 4096   # formas por perfil
+MAX_PERFILES = 32   # memos vivos (uno por perfil)
+
+Forma = Tuple[int, int, int, Tuple[int, int, int], Tuple[int, int, int]]
+
+class MemoSplit:
+    """
+    Split memoizado de un perfil. La clave es (dominicales de cada día
+    cubierto, minuto del día de inicio, duración en minutos): los segundos
+    sueltos de la marcación no entran. Se memoiza el split de los minutos
+    enteros más la clase del minuto de inicio y del de fin, y se corrige
+    linealmente (- segundos de inicio, + segundos de fin). Es exacto si las
+    ventanas del perfil empiezan y terminan en minuto entero; si no, la
+    clave usa segundos.
+    """
+
+    def __init__(self, perfil: Perfil, maxsize: Optional[int] = None):
+        self.perfil = perfil
+        self.unidad = 60 if all(a % 60 == 0 and b % 60 == 0
+                                for a, b in perfil.diurnas + perfil.nocturnas) else 1
+        self._forma = lru_cache(maxsize=maxsize or MAX_FORMAS)(self._calcular)
+
+    def _clase(self, dominicales: Tuple[bool, ...], t: int) -> Tuple[int, int, int]:
+        """(diurna, nocturna, dominical) del segundo t (relativo al día 0) como 0/1."""
+        i, sod = divmod(t, DAY)
+        if i < len(dominicales) and dominicales[i]:
+            return 0, 0, 1
+        return (int(any(a <= sod < b for a, b in self.perfil.diurnas)),
+                int(any(a <= sod < b for a, b in self.perfil.nocturnas)), 0)
+
+    def _calcular(self, dominicales: Tuple[bool, ...], inicio: int, duracion: int) -> Forma:
+        u = self.unidad
+        ini, fin = inicio * u, (inicio + duracion) * u
+        diur = noct = dom = 0
+        for i, es_dom in enumerate(dominicales):
+            s = max(ini - i * DAY, 0)
+            e = min(fin - i * DAY, DAY)
+            if e <= s:
+                continue
+            if es_dom:
+                dom += e - s
+            else:
+                d, n = payroll._split_ventanas(s, e, self.perfil)
+                diur += d
+                noct += n
+        return diur, noct, dom, self._clase(dominicales, ini), self._clase(dominicales, fin)
+
+    def split(self, start: int, end: int) -> Tuple[int, int, int]:
+        """Igual que payroll._split_span_secs(start, end, perfil)."""
+        if end <= start:
+            return 0, 0, 0
+        u = self.unidad
+        x, y = start % u, end % u
+        a, b = start - x, end - y
+        d0 = a // DAY
+        d1 = b // DAY
+        if d0 == d1:
+            dominicales = (calendario.es_dominical(d0),)
+        else:
+            dominicales = tuple(calendario.es_dominical(d) for d in range(d0, d1 + 1))
+        diur, noct, dom, ci, cf = self._forma(dominicales, (a - d0 * DAY) // u, (b - a) // u)
+        if x or y:
+            diur += y * cf[0] - x * ci[0]
+            noct += y * cf[1] - x * ci[1]
+            dom += y * cf[2] - x * ci[2]
+        return diur, noct, dom
+
+    def info(self) -> Dict[str, int]:
+        ci = self._forma.cache_info()
+        return {"hits": ci.hits, "misses": ci.misses, "formas": ci.currsize}
+
+_lock = threading.Lock()
+_memos: "OrderedDict[Perfil, MemoSplit]" = OrderedDict()
+# aciertos / fallos de memos ya descartados: estadisticas() nunca retrocede
+_retirados = {"hits": 0, "misses": 0}
+
+def _retirar(m: MemoSplit) -> None:
+    info = m.info()
+    _retirados["hits"] += info["hits"]
+    _retirados["misses"] += info["misses"]
+
+def memo_para(perfil: Perfil) -> MemoSplit:
+    """Memo del perfil (se crea la primera vez; los menos usados salen)."""
+    with _lock:
+        m = _memos.get(perfil)
+        if m is None:
+            m = _memos[perfil] = MemoSplit(perfil)
+            while len(_memos) > MAX_PERFILES:
+                _retirar(_memos.popitem(last=False)[1])
+        else:
+            _memos.move_to_end(perfil)
+        return m
+
+def estadisticas() -> Dict[str, int]:
+    """Aciertos / fallos acumulados en este proceso y formas en memoria."""
+    with _lock:
+        out = dict(_retirados, formas=0)
+        memos = list(_memos.values())
+    for m in memos:
+        for k, v in m.info().items():
+            out[k] += v
+    return out
+
+def invalidar() -> None:
+    """Descarta todos los memos (las estadísticas acumuladas se conservan)."""
+    with _lock:
+        for m in _memos.values():
+            _retirar(m)
+        _memos.clear()
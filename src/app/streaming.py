@@ -0,0 +1,249 @@
+"""
+Motor de cálculo en una sola pasada (MOTOR_CALCULO=stream).
+
+Consume las marcaciones en orden de timestamp (como salen del store o del
+archivo binario) y mantiene por empleado sólo su estado abierto: una
+máquina de estados (generador) que recibe cada marcación y devuelve el
+turno cuando se cierra. Cada turno se divide en el momento en sus días
+reales (cortando en medianoche) y se suma directo a los acumuladores por
+día; las filas por quincena salen de esos acumuladores al final.
+
+Diferencias con el cálculo por intervalos (payroll.calcular_horas_periodos):
+- las horas se acreditan al día en que ocurrieron, no al día de inicio
+- sólo se reportan días de la quincena; el margen sirve para emparejar
+  turnos que cruzan el borde, no agrega filas
+- Descanso ya no se ignora: dos marcaciones Descanso (salida / regreso)
+  abren y cierran una pausa no pagada que se descuenta del turno y se
+  reporta en la columna "Descanso (no pagado)". Un Descanso sin regreso
+  antes de la Salida no se descuenta (cuenta como marcación sin pareja)
+- una Entrada y una Salida con el mismo timestamp son un turno vacío (el
+  cálculo por intervalos lo toma como turno de 24 h)
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import payroll
+from .payroll import DAY, Event, Periodo
+from .perfiles import Perfil, Perfiles
+
+def _maquina_empleado():
+    """
+    Máquina de estados de UN empleado. send((ts, estado)) devuelve
+    (estado=None cierra el stream):
+    - ("turno", inicio, fin, pausas, descansos_sin_regreso) al cerrar un turno
+    - ("sin_pareja",) si la marcación no se pudo emparejar
+    - None si sólo cambió el estado
+    """
+    inicio: Optional[int] = None
+    pausa: Optional[int] = None
+    pausas: List[Tuple[int, int]] = []
+    salida = None
+
+    while True:
+        ts, estado = yield salida
+        salida = None
+
+        if estado is None:
+            # fin del stream: un turno abierto queda sin pareja
+            if inicio is not None:
+                salida = ("sin_pareja",)
+            continue
+
+        if estado == "Entrada":
+            if inicio is None:
+                inicio, pausas = ts, []
+            elif pausa is not None:
+                # regreso del descanso marcado como Entrada
+                pausas.append((pausa, ts))
+                pausa = None
+            else:
+                # Entrada repetida: la anterior queda sin pareja (misma regla que _emparejar)
+                salida = ("sin_pareja",)
+                inicio, pausas = ts, []
+
+        elif estado == "Salida":
+            if inicio is None:
+                salida = ("sin_pareja",)
+                continue
+            # un Descanso sin regreso no se descuenta: queda sin pareja
+            suelta = int(pausa is not None)
+            pausa = None
+            if ts > inicio:
+                salida = ("turno", inicio, ts, pausas, suelta)
+            elif suelta:
+                salida = ("sin_pareja",)
+            inicio, pausas = None, []
+
+        else:  # Descanso: alterna inicio / fin de pausa dentro de un turno
+            if inicio is None:
+                salida = ("sin_pareja",)
+            elif pausa is None:
+                pausa = ts
+            else:
+                pausas.append((pausa, ts))
+                pausa = None
+
+def _tramos_trabajo(inicio: int, fin: int, pausas: List[Tuple[int, int]]):
+    """[inicio, fin) menos las pausas (ordenadas, dentro del turno)."""
+    t = inicio
+    for a, b in pausas:
+        a, b = max(a, t), min(b, fin)
+        if a > t:
+            yield t, a
+        t = max(t, b)
+    if fin > t:
+        yield t, fin
+
+def _por_dia(a: int, b: int):
+    """Corta [a, b) en medianoche: (dia, s, e)."""
+    dia = a // DAY
+    while dia * DAY < b:
+        yield dia, max(a, dia * DAY), min(b, (dia + 1) * DAY)
+        dia += 1
+
+class AcumuladorStream:
+    """
+    Estado del motor stream alimentado de a una marcación: una máquina por
+    empleado y los totales por (empleado, día) en segundos:
+    [total, diurnas, nocturnas, dominicales, descanso].
+    Lo usan calcular_horas_stream (una pasada) y el modo daemon (en vivo).
+    """
+
+    def __init__(self, perfiles: Optional[Perfiles] = None, dias_validos=None):
+        self.perfiles = payroll._perfiles_o_general(perfiles)
+        self.dias_validos = dias_validos  # set de días a acreditar (None = todos)
+        self.diario: Dict[str, Dict[int, List[int]]] = {}
+        self.nombres: Dict[str, str] = {}
+        self.ultimo: Dict[str, int] = {}  # ts de la última marcación por empleado
+        self._maquinas: Dict[str, object] = {}
+        self._perfil: Dict[str, Perfil] = {}
+        self._turnos: Dict[str, int] = {}
+        self._sin_pareja: Dict[str, int] = {}
+
+    def _acc(self, clave: str, dia: int) -> List[int]:
+        dias = self.diario.get(clave)
+        if dias is None:
+            dias = self.diario[clave] = {}
+        a = dias.get(dia)
+        if a is None:
+            a = dias[dia] = [0, 0, 0, 0, 0]
+        return a
+
+    def agregar(self, e: Event) -> None:
+        """Consume una marcación (en orden de timestamp dentro del empleado)."""
+        clave = e.clave
+        m = self._maquinas.get(clave)
+        if m is None:
+            m = self._maquinas[clave] = _maquina_empleado()
+            next(m)
+            self.nombres[clave] = e.nombre
+            self._perfil[clave] = self.perfiles.de(clave)
+            self._turnos[clave] = self._sin_pareja[clave] = 0
+        self.ultimo[clave] = e.ts
+
+        perfil = self._perfil[clave]
+        ts = payroll._round_ts_to_minutes(e.ts, perfil.redondeo_min) if perfil.redondeo_min else e.ts
+        r = m.send((ts, e.estado))
+        if r is None:
+            return
+        if r[0] == "sin_pareja":
+            self._sin_pareja[clave] += 1
+            return
+
+        _, inicio, fin, pausas, sueltas = r
+        self._turnos[clave] += 1
+        self._sin_pareja[clave] += sueltas
+        validos = self.dias_validos
+        for a, b in _tramos_trabajo(inicio, fin, pausas):
+            for dia, s, t in _por_dia(a, b):
+                if validos is None or dia in validos:
+                    d, n, o = payroll._split_day_secs(dia, s, t, perfil)
+                    x = self._acc(clave, dia)
+                    x[0] += t - s
+                    x[1] += d
+                    x[2] += n
+                    x[3] += o
+        for a, b in pausas:
+            a, b = max(a, inicio), min(b, fin)
+            for dia, s, t in _por_dia(a, b):
+                if validos is None or dia in validos:
+                    self._acc(clave, dia)[4] += t - s
+
+    def cerrar(self) -> None:
+        """Fin del stream: los turnos abiertos quedan sin pareja."""
+        for clave, m in self._maquinas.items():
+            if m.send((None, None)) is not None:
+                self._sin_pareja[clave] += 1
+
+    def reiniciar(self, clave: str) -> None:
+        """Olvida todo lo de un empleado (para reconstruirlo desde el almacén)."""
+        for d in (self.diario, self.nombres, self.ultimo, self._maquinas,
+                  self._perfil, self._turnos, self._sin_pareja):
+            d.pop(clave, None)
+
+    def podar(self, dia_desde: int) -> None:
+        """Descarta los totales de días anteriores a dia_desde."""
+        for dias in self.diario.values():
+            for d in [d for d in dias if d < dia_desde]:
+                del dias[d]
+
+    def contadores(self) -> Tuple[int, int]:
+        """(turnos cerrados, marcaciones sin pareja)."""
+        return sum(self._turnos.values()), sum(self._sin_pareja.values())
+
+    def filas(self, dia_desde: int, dia_hasta: int,
+              nombres: Optional[Dict[str, str]] = None) -> Tuple[List[List], List[List]]:
+        """(quincena_rows, diario_rows) de los días [dia_desde, dia_hasta]."""
+        sub = {
+            (clave, d): v
+            for clave, dias in self.diario.items()
+            for d, v in dias.items()
+            if dia_desde <= d <= dia_hasta
+        }
+        return payroll._construir_filas(sub, nombres or self.nombres, self.perfiles)
+
+def calcular_horas_stream(events: Iterable[Event], periodos: List[Periodo], margen: int,
+                          stats: Optional[dict] = None,
+                          perfiles: Optional[Perfiles] = None) -> Dict[Periodo, Tuple[List[List], List[List], str]]:
+    """
+    Mismo contrato que payroll.calcular_horas_periodos. events debe venir
+    ordenado por timestamp (al menos dentro de cada empleado); puede ser un
+    generador (p.ej. payroll.iter_clean_events): no se materializa.
+    Las filas llevan una columna extra al final: descanso no pagado.
+    perfiles: reglas por empleado, como en calcular_horas_periodos.
+    """
+    if not periodos:
+        return {}
+
+    rangos = {p: payroll._quincena_range(p[0], p[1], p[2], margen) for p in periodos}
+    lo_m = min(payroll._day_of_date(r[0]) for r in rangos.values())
+    hi_m = max(payroll._day_of_date(r[1]) for r in rangos.values())
+
+    # días que se reportan: las quincenas sin margen
+    dias_periodo: Dict[Periodo, Tuple[int, int]] = {}
+    for p in periodos:
+        lo, hi, _ = payroll._quincena_range(p[0], p[1], p[2], 0)
+        dias_periodo[p] = (payroll._day_of_date(lo), payroll._day_of_date(hi))
+    validos = {d for lo, hi in dias_periodo.values() for d in range(lo, hi + 1)}
+
+    acc = AcumuladorStream(perfiles, validos)
+    fuera = 0
+    for e in events:
+        if not (lo_m <= e.ts // DAY <= hi_m):
+            fuera += 1
+            continue
+        acc.agregar(e)
+    acc.cerrar()
+
+    if stats is not None:
+        turnos, sin_pareja = acc.contadores()
+        stats["eventos_fuera_de_ventana"] = fuera
+        stats["intervalos"] = turnos
+        stats["marcaciones_sin_pareja"] = sin_pareja
+
+    out = {}
+    for p in periodos:
+        quincena_rows, diario_rows = acc.filas(*dias_periodo[p])
+        out[p] = (quincena_rows, diario_rows, rangos[p][2])
+    return out
@@ -1,3 +1,4 @@
+import re
 from datetime import datetime, date, time as dtime
 
 def parse_date_generic(v):
@@ -60,3 +61,103 @@ def parse_time_generic(v):
         return datetime.fromisoformat(s).time()
     except Exception:
         return None
+
+
+# -------------------------
+# Parsers por columna (fast path)
+# -------------------------
+#
+# En una columna todos los valores suelen venir en el mismo formato. El
+# parser detecta el formato ganador con el primer texto que ve y desde ahí
+# usa una rutina especializada (regex precompilada, sin excepciones ni
+# replace en cadena). Si la rutina falla en un valor se prueban las otras
+# rutinas (columna con formatos mezclados; la que acierta pasa a ser la
+# primera) y sólo si ninguna sirve el valor pasa por el parser genérico,
+# así que el resultado es siempre el mismo.
+
+_RE_DMY = re.compile(r"\s*(\d{1,2})/(\d{1,2})/(\d{4})(?:\s|$)")
+_RE_YMD = re.compile(r"\s*(\d{4})-(\d{1,2})-(\d{1,2})(?:\s|$)")
+_RE_HMS = re.compile(r"\s*(\d{1,2}):(\d{1,2})(?::(\d{1,2}))?\s*$")
+_RE_HMS_12 = re.compile(r"\s*(\d{1,2}):(\d{1,2})(?::(\d{1,2}))? ([ap])(?:\. m\.|\.m\.|m)\s*$", re.IGNORECASE)
+
+def _date_dmy(s: str):
+    m = _RE_DMY.match(s)
+    if not m:
+        return None
+    try:
+        return date(int(m.group(3)), int(m.group(2)), int(m.group(1)))
+    except ValueError:
+        return None
+
+def _date_ymd(s: str):
+    m = _RE_YMD.match(s)
+    if not m:
+        return None
+    try:
+        return date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+    except ValueError:
+        return None
+
+def _time_24(s: str):
+    m = _RE_HMS.match(s)
+    if not m:
+        return None
+    try:
+        return dtime(int(m.group(1)), int(m.group(2)), int(m.group(3) or 0))
+    except ValueError:
+        return None
+
+def _time_12(s: str):
+    m = _RE_HMS_12.match(s)
+    if not m:
+        return None
+    h = int(m.group(1))
+    if not 1 <= h <= 12:
+        return None
+    h = h % 12 + (12 if m.group(4).lower() == "p" else 0)
+    try:
+        return dtime(h, int(m.group(2)), int(m.group(3) or 0))
+    except ValueError:
+        return None
+
+def _no_fast(s: str):
+    return None
+
+def _column_parser(fast_candidates, generic):
+    fast = None
+
+    def parse(v):
+        nonlocal fast
+        if not isinstance(v, str):
+            # objetos date/time, números y None ya son baratos en el genérico
+            return generic(v)
+        if fast is None:
+            fast = next((f for f in fast_candidates if f(v) is not None), _no_fast)
+        r = fast(v)
+        if r is not None:
+            return r
+        for f in fast_candidates:
+            if f is not fast:
+                r = f(v)
+                if r is not None:
+                    fast = f
+                    return r
+        return generic(v)
+
+    return parse
+
+def make_date_parser():
+    """Parser de fechas con detección de formato por columna (ver parse_date_generic)."""
+    return _column_parser((_date_dmy, _date_ymd), parse_date_generic)
+
+def make_time_parser():
+    """Parser de horas con detección de formato por columna (ver parse_time_generic)."""
+    return _column_parser((_time_24, _time_12), parse_time_generic)
+
+def parse_dates(values) -> list:
+    """parse_date_generic sobre una columna completa, con fast path."""
+    return list(map(make_date_parser(), values))
+
+def parse_times(values) -> list:
+    """parse_time_generic sobre una columna completa, con fast path."""
+    return list(map(make_time_parser(), values))
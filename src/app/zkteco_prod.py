@@ -1,37 +1,184 @@
+import heapq
+import os
+import queue
 import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from zk import ZK
 from .events import estado_desde_status
+from .discovery import (ZK_PORT, normalizar_mac, leer_tabla_vecinos, puerto_abierto,
+                        cache_ip, guardar_cache_ip)
 
-def obtener_ip_por_mac(mac_reloj: str, net_prefix: str) -> str | None:
-    mac_target = mac_reloj.lower().strip()
-    for i in range(1, 255):
-        ip = f"{net_prefix}{i}"
+PING_TIMEOUT_MS = 80
 
-        subprocess.run(["ping", "-n", "1", "-w", "80", ip],
-                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+def _ping(ip: str) -> None:
+    if os.name == "nt":
+        cmd = ["ping", "-n", "1", "-w", str(PING_TIMEOUT_MS), ip]
+    else:
+        cmd = ["ping", "-c", "1", "-W", str(max(1, PING_TIMEOUT_MS // 1000)), ip]
+    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
-        res = subprocess.run(["arp", "-a", ip],
-                             capture_output=True, text=True, errors="ignore")
+def _arp(ip: str) -> str:
+    res = subprocess.run(["arp", "-a", ip],
+                         capture_output=True, text=True, errors="ignore")
+    return res.stdout or ""
 
-        if mac_target in (res.stdout or "").lower():
+def _sondear(ip: str, mac_target: str, ping, arp) -> tuple[str, bool, float]:
+    """
+    Ping + arp de un host. Devuelve (ip, coincide, latencia_seg).
+    """
+    t0 = time.perf_counter()
+    ping(ip)
+    salida = arp(ip)
+    latencia = time.perf_counter() - t0
+    return ip, mac_target in normalizar_mac(salida), latencia
+
+def obtener_ip_por_mac(mac_reloj: str, net_prefix: str, workers: int = 64,
+                       ping=_ping, arp=_arp, log=None) -> str | None:
+    """
+    Barre net_prefix 1..254 en paralelo (pool de hilos) y devuelve la IP cuyo
+    arp coincide con mac_reloj. Al primer acierto cancela los sondeos pendientes.
+
+    ping(ip) / arp(ip) -> str son inyectables (para pruebas sin red).
+    log(msg) recibe la latencia de cada host si se indica.
+    """
+    mac_target = normalizar_mac(mac_reloj)
+    ips = [f"{net_prefix}{i}" for i in range(1, 255)]
+
+    pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        futuros = [pool.submit(_sondear, ip, mac_target, ping, arp) for ip in ips]
+        for fut in as_completed(futuros):
+            ip, coincide, latencia = fut.result()
+            if log:
+                log(f"[DISCOVERY] {ip} {latencia * 1000:.0f} ms{' <- MAC' if coincide else ''}")
+            if coincide:
+                return ip
+        return None
+    finally:
+        # no espera a los pings en curso: los pendientes se cancelan
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def localizar_reloj(mac_reloj: str, net_prefix: str, cache_path: str | None = None,
+                    ttl_horas: float = 720, workers: int = 64, log=None) -> str | None:
+    """
+    Busca la IP del reloj de más barato a más caro:
+    1) última IP conocida (cache en disco) confirmada con un connect al 4370
+    2) tabla ARP completa leída en una sola llamada
+    3) barrido paralelo de la subred (obtener_ip_por_mac)
+    log(msg) se pasa al barrido (latencia por host); main y el daemon usan print.
+    """
+    if cache_path:
+        ip = cache_ip(cache_path, mac_reloj, ttl_horas)
+        if ip and puerto_abierto(ip):
             return ip
-    return None
 
-def descargar_eventos_zkteco(ip: str, dias_atras: int) -> list[dict]:
+    ip = leer_tabla_vecinos().get(normalizar_mac(mac_reloj))
+    if ip and not (ip.startswith(net_prefix) and puerto_abierto(ip)):
+        ip = None
+
+    if not ip:
+        ip = obtener_ip_por_mac(mac_reloj, net_prefix, workers=workers, log=log)
+
+    if ip and cache_path:
+        guardar_cache_ip(cache_path, mac_reloj, ip)
+    return ip
+
+def conectar_reloj(ip: str, timeout: int = 5, force_udp: bool = False):
     """
-    Devuelve lista de dicts:
-    { "pin": "123", "timestamp": datetime, "estado": "Entrada/Salida/Descanso" }
+    Conexión pyzk abierta al reloj (el llamador hace disconnect). Sin el
+    ping de pyzk: localizar_reloj ya confirmó la IP (connect al 4370 o
+    ping + arp) y ese ping es un proceso más por intento.
+    """
+    zk = ZK(ip, port=ZK_PORT, timeout=timeout, password=0, force_udp=force_udp, ommit_ping=True)
+    return zk.connect()
+
+def _leer_reloj(ip: str, registros_prev: int | None, timeout: int = 5,
+                force_udp: bool = False) -> tuple[list | None, int | None]:
+    """
+    Conecta y descarga el log del reloj. Devuelve (atts, registros_en_reloj);
+    atts=None si el reloj tiene los mismos registros que registros_prev.
+    Sólo red: no toca el almacén local (se puede llamar desde otros hilos).
     """
-    zk = ZK(ip, port=4370, timeout=5, password=0, force_udp=False, ommit_ping=False)
     conn = None
     try:
-        conn = zk.connect()
+        conn = conectar_reloj(ip, timeout=timeout, force_udp=force_udp)
+
+        conn.read_sizes()
+        total_reloj = conn.records
+        if registros_prev is not None and total_reloj == registros_prev:
+            return None, total_reloj  # sin novedades en el reloj
+
+        # el reloj queda bloqueado sólo durante la transferencia
         conn.disable_device()
+        try:
+            atts = conn.get_attendance() or []
+        finally:
+            conn.enable_device()
+        return atts, total_reloj
+    finally:
+        if conn:
+            try:
+                conn.disconnect()
+            except Exception:
+                pass
 
-        desde = datetime.now() - timedelta(days=dias_atras)
-        atts = conn.get_attendance() or []
+def _leer_reloj_con_reintentos(ip: str, registros_prev: int | None, timeout: int = 5,
+                               reintentos: int = 3, backoff: float = 2.0):
+    """
+    _leer_reloj con reintentos: en cada intento prueba TCP y luego UDP;
+    entre intentos espera backoff * 2**n segundos.
+    """
+    ultimo_error = None
+    for n in range(max(1, reintentos)):
+        for force_udp in (False, True):
+            try:
+                return _leer_reloj(ip, registros_prev, timeout=timeout, force_udp=force_udp)
+            except Exception as e:
+                ultimo_error = e
+        if n + 1 < reintentos:
+            time.sleep(backoff * 2 ** n)
+    raise RuntimeError(f"{ip}: {ultimo_error}")
+
+def fila_marcacion(a) -> tuple:
+    """Attendance de pyzk -> (pin, timestamp, status, punch, estado) para EventStore.agregar."""
+    return (a.user_id, a.timestamp, getattr(a, "status", 0) or 0, getattr(a, "punch", 0) or 0,
+            estado_desde_status(getattr(a, "status", None), getattr(a, "punch", None)))
+
+def _guardar_en_store(store, device: str, atts, total_reloj: int | None) -> int:
+    """
+    Inserta en el store los registros que el reloj agregó desde la última
+    sincronización. El log del reloj sólo crece: lo nuevo son las
+    posiciones a partir de la cantidad ya vista, sin importar su timestamp
+    (una marcación tardía o con la hora corregida queda antes de la marca
+    de agua y no debe perderse). Si el log se achicó (se borró en el reloj)
+    se inserta todo; INSERT OR IGNORE descarta lo repetido.
+    """
+    atts = atts or []
+    _, registros_prev = store.estado_sync(device)
+    if registros_prev is not None and registros_prev <= len(atts):
+        atts = atts[registros_prev:]
+    return store.agregar(device, (fila_marcacion(a) for a in atts), total_reloj)
+
+def descargar_eventos_zkteco(ip: str, dias_atras: int, store=None, device: str = "default",
+                             timeout: int = 5, force_udp: bool = False) -> list[dict]:
+    """
+    Devuelve lista de dicts:
+    { "pin": "123", "timestamp": datetime, "estado": "Entrada/Salida/Descanso", "device": ... }
 
+    Con store (EventStore) la sincronización es incremental: si el reloj tiene
+    los mismos registros que en la última corrida no se descarga nada, y de lo
+    descargado sólo se procesan los registros nuevos del log (ver _guardar_en_store).
+    El resultado se lee del almacén local.
+    """
+    desde = datetime.now() - timedelta(days=dias_atras)
+
+    registros_prev = store.estado_sync(device)[1] if store is not None else None
+    atts, total_reloj = _leer_reloj(ip, registros_prev, timeout=timeout, force_udp=force_udp)
+
+    if store is None:
         eventos = []
         for a in atts:
             # a.user_id / a.timestamp / a.status / a.punch
@@ -41,15 +188,92 @@ def descargar_eventos_zkteco(ip: str, dias_atras: int) -> list[dict]:
                 "pin": str(a.user_id),
                 "timestamp": a.timestamp,
                 "estado": estado_desde_status(getattr(a, "status", None), getattr(a, "punch", None)),
+                "device": device,
             })
+        eventos.sort(key=lambda ev: ev["timestamp"])
         return eventos
-    finally:
-        if conn:
-            try:
-                conn.enable_device()
-            except Exception:
-                pass
-            try:
-                conn.disconnect()
-            except Exception:
-                pass
+
+    _guardar_en_store(store, device, atts, total_reloj)
+    return store.eventos(desde=desde)
+
+# -------------------------
+# Varios relojes
+# -------------------------
+
+def fusionar_eventos(streams, ventana_seg: int = 60) -> list[dict]:
+    """
+    Mezcla por timestamp varios streams ya ordenados (uno por reloj) y quita
+    marcaciones duplicadas entre relojes: mismo pin y mismo estado en otro
+    reloj dentro de ventana_seg segundos.
+    """
+    out = []
+    ultimo: dict[str, dict] = {}
+    for ev in heapq.merge(*streams, key=lambda e: e["timestamp"]):
+        prev = ultimo.get(ev["pin"])
+        if (prev is not None
+                and prev["estado"] == ev["estado"]
+                and prev.get("device") != ev.get("device")
+                and (ev["timestamp"] - prev["timestamp"]).total_seconds() <= ventana_seg):
+            continue
+        ultimo[ev["pin"]] = ev
+        out.append(ev)
+    return out
+
+def descargar_eventos_multi(dispositivos, dias_atras: int, store, localizar, timeout: int = 5,
+                            reintentos: int = 3, plazo_seg: float = 180,
+                            ventana_dup_seg: int = 60,
+                            desde: datetime | None = None) -> tuple[list[dict], dict[str, str]]:
+    """
+    Descarga en paralelo de varios relojes (config.ZkDevice).
+    localizar(dispositivo) -> ip | None resuelve la IP de cada uno.
+
+    Cada reloj corre en su propio hilo con un plazo total (plazo_seg); uno
+    lento o apagado no bloquea a los demás. Los hilos son daemon: uno que
+    venció el plazo se abandona y no retiene la salida del proceso.
+    Devuelve (eventos_fusionados, cobertura) donde
+    cobertura[nombre] = "ok" | "sin cambios" | descripción del fallo.
+
+    Lo descargado se guarda en el store y los eventos salen de ahí desde
+    `desde` (por defecto, hace dias_atras días), así que pueden cubrir
+    quincenas anteriores: un stream ordenado por timestamp por reloj,
+    mezclados con fusionar_eventos.
+    """
+    if desde is None:
+        desde = datetime.now() - timedelta(days=dias_atras)
+
+    resultados: queue.Queue = queue.Queue()
+
+    def tarea(dev, registros_prev):
+        try:
+            ip = localizar(dev)
+            if not ip:
+                raise RuntimeError("no se encontró en la red")
+            resultados.put((dev, _leer_reloj_con_reintentos(ip, registros_prev, timeout=timeout,
+                                                            reintentos=reintentos), None))
+        except Exception as e:
+            resultados.put((dev, None, e))
+
+    cobertura = {dev.nombre: "timeout" for dev in dispositivos}
+    # el store (SQLite) sólo se usa desde este hilo
+    for dev in dispositivos:
+        threading.Thread(target=tarea, args=(dev, store.estado_sync(dev.nombre)[1]),
+                         name=f"zk-{dev.nombre}", daemon=True).start()
+
+    fin = time.monotonic() + plazo_seg
+    for _ in dispositivos:
+        try:
+            dev, res, error = resultados.get(timeout=max(0.0, fin - time.monotonic()))
+        except queue.Empty:
+            break
+        if error is not None:
+            cobertura[dev.nombre] = f"error: {error}"
+            continue
+        atts, total_reloj = res
+        if atts is None:
+            cobertura[dev.nombre] = "sin cambios"
+        else:
+            _guardar_en_store(store, dev.nombre, atts, total_reloj)
+            cobertura[dev.nombre] = "ok"
+
+    streams = [store.eventos(desde=desde, device=d) for d in store.dispositivos()]
+    return fusionar_eventos(streams, ventana_dup_seg), cobertura
@@ -1,12 +1,135 @@
+import json
+import os
 import sqlite3
+from urllib.parse import quote
 
-def cargar_empleados(db_path: str) -> dict[str, str]:
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
-    cur.execute("SELECT emp_pin, emp_firstname, emp_lastname FROM hr_employee")
-    empleados = {
-        str(row[0]): f"{(row[1] or '').strip()} {(row[2] or '').strip()}".strip()
-        for row in cur.fetchall()
-    }
-    conn.close()
-    return empleados
+from .paths import ensure_dir
+
+# límite conservador de parámetros por consulta (SQLite antiguos: 999)
+_MAX_PARAMS = 500
+
+# snapshot en memoria para procesos largos: {db_path: (huella, completo, empleados)}
+_memo: dict[str, tuple[dict, bool, dict]] = {}
+
+def _huella(db_path: str) -> dict:
+    """
+    mtime + tamaño del archivo (y del -wal, si la base está en modo WAL):
+    si no cambian, el directorio tampoco.
+    """
+    st = os.stat(db_path)
+    huella = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+    try:
+        wal = os.stat(db_path + "-wal")
+        huella.update(wal_mtime_ns=wal.st_mtime_ns, wal_size=wal.st_size)
+    except OSError:
+        pass
+    return huella
+
+def _conectar_ro(db_path: str, immutable: bool = True) -> sqlite3.Connection:
+    """
+    Abre la base de ZKTime en sólo lectura. Con immutable=1 SQLite no toma
+    locks ni lee el journal (tampoco el -wal: _consultar no lo usa si hay
+    uno). La URI va sin autoridad ("file:" + ruta escapada): con
+    Path.as_uri() una ruta UNC de carpeta compartida queda como
+    file://srv/... y SQLite la rechaza.
+    """
+    ruta = os.path.abspath(db_path)
+    # "//ruta" se leería como file://autoridad/...: la autoridad vacía lo evita
+    uri = "file:" + ("//" if ruta.startswith("/") else "") + quote(ruta)
+    return sqlite3.connect(uri + "?mode=ro" + ("&immutable=1" if immutable else ""), uri=True)
+
+def _nombre(first, last) -> str:
+    return f"{(first or '').strip()} {(last or '').strip()}".strip()
+
+def _consultar(db_path: str, pins: list[str] | None) -> dict[str, str]:
+    sql = "SELECT emp_pin, emp_firstname, emp_lastname FROM hr_employee"
+    # con un -wal presente, immutable leería la base sin los cambios del WAL
+    immutable = not os.path.exists(db_path + "-wal")
+    try:
+        conn = _conectar_ro(db_path, immutable)
+        try:
+            return _ejecutar(conn, sql, pins)
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError:
+        # immutable puede leer una página a medio escribir si ZKTime está
+        # guardando justo ahora: reintenta con locks normales
+        conn = _conectar_ro(db_path, immutable=False)
+        try:
+            return _ejecutar(conn, sql, pins)
+        finally:
+            conn.close()
+
+def _ejecutar(conn: sqlite3.Connection, sql: str, pins: list[str] | None) -> dict[str, str]:
+    if pins is None:
+        return {str(pin): _nombre(f, l) for pin, f, l in conn.execute(sql)}
+
+    out = {}
+    for i in range(0, len(pins), _MAX_PARAMS):
+        lote = pins[i:i + _MAX_PARAMS]
+        marcas = ",".join("?" * len(lote))
+        for pin, f, l in conn.execute(f"{sql} WHERE emp_pin IN ({marcas})", lote):
+            out[str(pin)] = _nombre(f, l)
+    return out
+
+def _leer_snapshot(path: str) -> tuple[dict | None, bool, dict]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return data["huella"], bool(data["completo"]), data["empleados"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None, False, {}
+
+def _guardar_snapshot(path: str, huella: dict, completo: bool, empleados: dict) -> None:
+    ensure_dir(os.path.dirname(path))
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"huella": huella, "completo": completo, "empleados": empleados}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+def cargar_empleados(db_path: str, pins=None, cache_dir: str | None = None) -> dict[str, str]:
+    """
+    Devuelve {pin: "Nombre Apellido"} desde hr_employee de ZKTime.
+
+    pins: si se indica, sólo se consultan esos PIN (IN parametrizado) y el
+    resultado se limita a ellos.
+    cache_dir: guarda un snapshot (empleados_cache.json) invalidado por
+    mtime + tamaño de la base. Con la base sin cambios no se abre SQLite;
+    PIN ya consultados (aunque no existan) tampoco se vuelven a pedir.
+    """
+    huella = _huella(db_path)
+    snap_path = os.path.join(cache_dir, "empleados_cache.json") if cache_dir else None
+
+    memo = _memo.get(db_path)
+    if memo and memo[0] == huella:
+        h, completo, empleados = memo
+    elif snap_path:
+        h, completo, empleados = _leer_snapshot(snap_path)
+    else:
+        h, completo, empleados = None, False, {}
+
+    if h != huella:
+        completo, empleados = False, {}
+
+    pedidos = None if pins is None else sorted({str(p) for p in pins})
+    if pedidos is None:
+        faltan = None if not completo else []
+    else:
+        faltan = [] if completo else [p for p in pedidos if p not in empleados]
+
+    if faltan is None or faltan:
+        nuevos = _consultar(db_path, faltan)
+        if faltan is None:
+            empleados, completo = nuevos, True
+        else:
+            empleados = dict(empleados)
+            # los PIN pedidos que no existen quedan en None: no se reconsultan
+            empleados.update({p: nuevos.get(p) for p in faltan})
+        if snap_path:
+            _guardar_snapshot(snap_path, huella, completo, empleados)
+
+    _memo[db_path] = (huella, completo, empleados)
+
+    if pedidos is None:
+        return {p: n for p, n in empleados.items() if n is not None}
+    return {p: empleados[p] for p in pedidos if empleados.get(p) is not None}